@@ -1,22 +1,30 @@
+import importlib.util
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = "gemini-2.0-flash"
 
-llm = ChatGoogleGenerativeAI(
-    model=GEMINI_MODEL,
-    api_key=GEMINI_API_KEY
-)
+# Share the backend's LLM gateway (loaded by path: this package is also named `app`)
+_GATEWAY_PATH = Path(__file__).resolve().parents[2] / "backend" / "app" / "services" / "llm_gateway.py"
+_spec = importlib.util.spec_from_file_location("llm_gateway", _GATEWAY_PATH)
+llm_gateway = sys.modules.setdefault("llm_gateway", importlib.util.module_from_spec(_spec))
+if not hasattr(llm_gateway, "get_llm_gateway"):
+    _spec.loader.exec_module(llm_gateway)
+
+GEMINI_MODEL = llm_gateway.GEMINI_MODEL
+
+# The gateway's caps are per process: this chatbot gets its own concurrency budget, separate
+# from the backend's LLM_MAX_CONCURRENCY. Both draw on the same Gemini quota, so keep the sum
+# of the two below it (see references/ENV_SETUP.md).
+_config = llm_gateway.GatewayConfig.from_env()
+_config.max_concurrency = int(os.getenv("CHATBOT_LLM_MAX_CONCURRENCY", "2"))
+llm = llm_gateway.LLMGateway(llm_gateway.create_backend(), _config)
+llm_gateway.set_llm_gateway(llm)
 
 def generate_reply(prompt: str) -> str:
     """Return the Gemini model's reply for a given prompt."""
     if not prompt:
         return "error"
-    response = llm.invoke(prompt)
-    # AIMessage has a `.content` attribute with the text.
-    return response.content if hasattr(response, "content") else str(response)
-
-
+    return llm.generate(prompt, caller="chatbot").text
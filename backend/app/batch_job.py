@@ -0,0 +1,60 @@
+"""
+Shared skeleton for the batch jobs (score_growth_percentiles, evaluate_health_alerts).
+
+A job splits its work into one partition per worker and provides a work function
+that processes one partition chunk by chunk and returns a dict of stats; this module
+runs the partitions (in worker processes when workers > 1) and sums the stats.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+from app.db import engine
+
+
+def _reset_engine():
+    """Worker initializer: don't reuse connections inherited from the parent process"""
+    engine.dispose(close=False)
+
+
+def empty_stats(stat_keys: Iterable[str]) -> Dict[str, float]:
+    """Zeroed stats; keys ending in _s are timings in seconds, the rest are counts"""
+    return {key: 0.0 if key.endswith('_s') else 0 for key in stat_keys}
+
+
+@contextmanager
+def timed(stats: Dict[str, float], key: str):
+    """Add the time spent in the block to stats[key]"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats[key] += time.perf_counter() - started
+
+
+def run_partitions(work: Callable[..., Dict], partitions: Sequence[Any], workers: int,
+                   stat_keys: Iterable[str], *args) -> Dict[str, Any]:
+    """Call work(partition, *args) for every partition, in parallel when workers > 1, and sum the stats"""
+    if workers > 1 and len(partitions) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_reset_engine) as pool:
+            results = list(pool.map(work, partitions, *[[arg] * len(partitions) for arg in args]))
+    else:
+        results = [work(partition, *args) for partition in partitions]
+
+    totals: Dict[str, Any] = {key: sum(result[key] for result in results) for key in stat_keys}
+    totals['partitions'] = len(partitions)
+    return totals
+
+
+def add_worker_arguments(parser: argparse.ArgumentParser, chunk_size: int, chunk_help: str):
+    """--workers and --chunk-size options shared by every batch job"""
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    parser.add_argument('--chunk-size', type=int, default=chunk_size, help=chunk_help)
+
+
+def format_timings(totals: Dict[str, Any], phases: List[str]) -> str:
+    """One line with the summed worker time per phase and the wall-clock time"""
+    timings = ', '.join(f"{phase} {totals[f'{phase}_s']:.2f}s" for phase in phases)
+    return f"  {timings} (worker time); elapsed {totals['elapsed_s']:.2f}s"
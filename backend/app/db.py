@@ -8,7 +8,16 @@ password = os.getenv("SUPABASE_PASSWORD")
 host = os.getenv("SUPABASE_POOLER_URL")
 user = os.getenv("SUPABASE_USER")
 port = os.getenv("SUPABASE_PORT")
-DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/postgres"
+# psycopg 3 driver: it binds parameters server-side and can prepare repeated statements
+DATABASE_URL = f"postgresql+psycopg://{user}:{password}@{host}:{port}/postgres"
+
+# Server-side prepared statements are off by default: a transaction-mode pooler (e.g. the
+# Supabase pooler on port 6543) hands each transaction a different server connection, and
+# psycopg then fails with "prepared statement ... does not exist / already exists".
+# On a session-mode pooler or a direct connection, set DB_PREPARE_THRESHOLD (e.g. 2) to
+# prepare a statement after that many executions on a connection (see app/queries.py).
+prepare_threshold = os.getenv("DB_PREPARE_THRESHOLD", "off")
+PREPARE_THRESHOLD = None if prepare_threshold.lower() in ("off", "none", "") else int(prepare_threshold)
 
 if not DATABASE_URL:
     sys.exit("SUPABASE_POOLER_URL is not set!")
@@ -16,7 +25,7 @@ else:
     print("DATABASE_URL is set")
     print(DATABASE_URL)
 
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, echo=True, connect_args={"prepare_threshold": PREPARE_THRESHOLD})
 
 
 
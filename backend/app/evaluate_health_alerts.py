@@ -0,0 +1,85 @@
+"""
+Batch job: evaluate the health alert rules for every child and upsert the
+results into health_alerts. Meant to run nightly (e.g. from cron shortly after
+midnight Singapore time).
+
+Run from the backend directory:
+    python -m app.evaluate_health_alerts --workers 4 --chunk-size 500
+    python -m app.evaluate_health_alerts --date 2025-07-01
+"""
+import argparse
+import time
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.batch_job import add_worker_arguments, empty_stats, format_timings, run_partitions, timed
+from app.db import engine
+from app.services.health_alert_engine import load_alert_data, evaluate_alerts, replace_alerts
+from app.services.sleep_timeline import SLEEP_TIMEZONE
+
+# Tables read per chunk by load_alert_data, reported as rows scanned
+SCANNED_TABLES = ('meals', 'sleep', 'poops', 'symptoms', 'growth')
+STAT_KEYS = ('children', 'chunks', 'alerts', 'removed', 'read_s', 'evaluate_s', 'write_s') + SCANNED_TABLES
+
+
+def evaluate_partition(child_ids: List[int], analysis_date: date, chunk_size: int) -> Dict:
+    """Evaluate the children of one partition chunk by chunk: bulk load, evaluate column-wise, bulk upsert"""
+    stats = empty_stats(STAT_KEYS)
+
+    for start in range(0, len(child_ids), chunk_size):
+        chunk = child_ids[start:start + chunk_size]
+        with engine.begin() as conn:
+            with timed(stats, 'read_s'):
+                data = load_alert_data(conn, chunk, analysis_date)
+
+            with timed(stats, 'evaluate_s'):
+                alerts = evaluate_alerts(data, analysis_date)
+
+            with timed(stats, 'write_s'):
+                removed = replace_alerts(conn, chunk, analysis_date, alerts)
+
+        stats['children'] += len(data['children'])
+        stats['chunks'] += 1
+        stats['alerts'] += len(alerts)
+        stats['removed'] += len(removed)
+        for table in SCANNED_TABLES:
+            stats[table] += len(data[table])
+
+    return stats
+
+
+def partition_children(workers: int) -> List[List[int]]:
+    """Split every child id into one contiguous partition per worker"""
+    with engine.connect() as conn:
+        child_ids = [row[0] for row in conn.execute(text("SELECT id FROM child ORDER BY id"))]
+    return [part.tolist() for part in np.array_split(np.array(child_ids, dtype=np.int64), max(workers, 1)) if len(part)]
+
+
+def run(workers: int, chunk_size: int, analysis_date: Optional[date] = None) -> Dict:
+    """Evaluate alerts for all children, in parallel when workers > 1"""
+    started = time.perf_counter()
+    analysis_date = analysis_date or pd.Timestamp.now(tz=SLEEP_TIMEZONE).date()
+    totals = run_partitions(evaluate_partition, partition_children(workers), workers, STAT_KEYS,
+                            analysis_date, chunk_size)
+    totals['analysis_date'] = analysis_date.isoformat()
+    totals['elapsed_s'] = time.perf_counter() - started
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate health alert rules for every child")
+    add_worker_arguments(parser, chunk_size=500, chunk_help="Children loaded and evaluated per batch")
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help="Analysis date (YYYY-MM-DD); defaults to today in Singapore time")
+    args = parser.parse_args()
+
+    totals = run(args.workers, args.chunk_size, args.date)
+    print(f"Evaluated {totals['children']} children for {totals['analysis_date']} in {totals['chunks']} chunks "
+          f"across {totals['partitions']} partitions")
+    scanned = ', '.join(f"{table} {totals[table]}" for table in SCANNED_TABLES)
+    print(f"  scanned {sum(totals[table] for table in SCANNED_TABLES)} rows ({scanned}), emitted {totals['alerts']} alerts, "
+          f"removed {totals['removed']} that no longer apply")
+    print(format_timings(totals, ['read', 'evaluate', 'write']))
@@ -1,4 +1,4 @@
-from sqlmodel import SQLModel, Field, Column, DateTime, TEXT, JSON
+from sqlmodel import SQLModel, Field, Column, DateTime, TEXT, JSON, UniqueConstraint, Index, text
 from uuid import UUID, uuid4
 from datetime import datetime
 from typing import Dict, Any  # Add this import
@@ -49,6 +49,20 @@ class Growth_Benchmark(SQLModel, table = True):
     gender: str
 
 
+class Growth_Percentile(SQLModel, table = True):
+    """Stored WHO z-scores and percentiles for a growth record (written by score_growth_percentiles)"""
+    growth_id: int = Field(primary_key=True, foreign_key="growth.id", ondelete="CASCADE")  # Scores go with their record
+    child_id: int = Field(foreign_key="child.id", ondelete="CASCADE", index=True)
+    age_months: float
+    weight_z: float | None = None
+    weight_percentile: float | None = None
+    height_z: float | None = None
+    height_percentile: float | None = None
+    head_circumference_z: float | None = None
+    head_circumference_percentile: float | None = None
+    scored_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
 class Sleep_Time(SQLModel, table = True):
     id: int | None = Field(default=None, primary_key=True)  # Consistent style
     check_in: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
@@ -121,12 +135,17 @@ class ChatbotChat(SQLModel, table = True):
     child_id: int | None = Field(foreign_key="child.id", default=None)
     created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
     updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    archived_at: datetime | None = Field(sa_column=Column(DateTime(timezone=True)), default=None)  # Hidden from the chat list when set
 
 
 class ChatMessage(SQLModel, table = True):
     __tablename__ = "chat_messages"
+    # Serves paging through a chat's history and the last-message lookup in the chat list
+    __table_args__ = (
+        Index("ix_chat_messages_chat_created", "chat_id", "created_at", "id"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    chat_id: UUID = Field(foreign_key="chatbot_chats.id")
+    chat_id: UUID = Field(foreign_key="chatbot_chats.id", ondelete="CASCADE")  # Messages go with their chat
     message: str = Field(sa_column=Column(TEXT))
     sender: str
     created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
@@ -179,6 +198,16 @@ class Saved_Articles(SQLModel, table = True):
 
 class Health_Alerts(SQLModel, table=True):
     __tablename__ = "health_alerts"
+    # One alert per child, type and day; the conflict target for alert upserts
+    __table_args__ = (
+        UniqueConstraint("child_id", "alert_type", "analysis_date", name="uq_health_alerts_child_type_date"),
+        # Partial index covering only unread alerts, so badge counts never touch read or deleted rows
+        Index("ix_health_alerts_unread", "child_id", postgresql_where=text("NOT is_read AND NOT is_deleted")),
+        # Covering index for the keyset-paginated timeline; the summary view is answered from the index alone
+        Index("ix_health_alerts_timeline", "child_id", "created_at", "id",
+              postgresql_include=["alert_type", "title", "severity", "analysis_date", "is_read", "read_at"],
+              postgresql_where=text("NOT is_deleted")),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     child_id: int = Field(foreign_key="child.id")
     alert_type: str
@@ -0,0 +1,501 @@
+"""
+Named, parameterised SQL for the raw-SQL routers.
+
+Every statement is built once at import time with typed bound parameters, so the
+SQL text is identical for every child and period. When DB_PREPARE_THRESHOLD is set
+(see db.py), psycopg 3 prepares a statement on the server after that many executions
+on a connection and reuses its plan from then on.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+SQL_TYPES = {
+    int: Integer,
+    float: Float,
+    str: String,
+    bool: Boolean,
+    date: Date,
+    datetime: DateTime(timezone=True),
+    # Lists are id arrays (e.g. child_ids), matched with = ANY(...)
+    list: ARRAY(Integer),
+}
+
+# How values are normalised before binding; other types are passed through unchanged
+COERCE = {
+    int: int,
+    float: float,
+    str: str,
+    bool: bool,
+    list: lambda values: [int(value) for value in values],
+}
+
+
+class NamedQuery:
+    """A reusable SQL statement with typed bound parameters"""
+
+    def __init__(self, name: str, sql: str, parse_dates: Optional[List[str]] = None, **param_types: type):
+        self.name = name
+        self.sql = sql
+        self.parse_dates = parse_dates or []
+        self.param_types = param_types
+        self.statement = text(sql).bindparams(
+            *[bindparam(param, type_=SQL_TYPES[param_type]) for param, param_type in param_types.items()]
+        )
+
+    def params(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Check that every parameter is given and coerce it to its declared type (None stays NULL)"""
+        missing = set(self.param_types) - set(values)
+        unknown = set(values) - set(self.param_types)
+        if missing or unknown:
+            raise ValueError(f"Query {self.name}: missing {sorted(missing)}, unexpected {sorted(unknown)}")
+        return {
+            param: None if values[param] is None else COERCE.get(self.param_types[param], lambda value: value)(values[param])
+            for param in self.param_types
+        }
+
+    def frame(self, conn, **values) -> pd.DataFrame:
+        """Run the query and return the rows as a DataFrame"""
+        return pd.read_sql_query(self.statement, con=conn, params=self.params(values), parse_dates=self.parse_dates)
+
+    def execute(self, conn, **values):
+        """Run the query and return the SQLAlchemy result"""
+        return conn.execute(self.statement, self.params(values))
+
+
+# Growth
+
+GROWTH_BENCHMARK_VERSION = NamedQuery('growth_benchmark_version', """
+    SELECT md5(COALESCE(string_agg(
+        concat_ws(',', id, age_month, weight, height, head_circumference, gender), ';' ORDER BY id
+    ), ''))
+    FROM growth_benchmark
+""")
+
+GROWTH_BY_CHILD = NamedQuery('growth_by_child', """
+    SELECT
+        g.id,
+        g.child_id,
+        g.check_in,
+        g.weight,
+        g.height,
+        g.head_circumference,
+        g.note,
+        g.account_id,
+        COALESCE(a.name, 'Unknown') as account_name
+    FROM growth g
+    LEFT JOIN accounts a ON g.account_id = a.id
+    WHERE g.child_id = :child_id
+    AND g.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY g.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+GROWTH_FOR_BENCHMARKS = NamedQuery('growth_for_benchmarks', """
+    SELECT
+        id, child_id, check_in, weight, height, head_circumference, note
+    FROM growth
+    WHERE child_id = :child_id
+    AND check_in >= NOW() - make_interval(days => :days)
+    ORDER BY check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+GROWTH_TRENDS = NamedQuery('growth_trends', """
+    SELECT
+        check_in,
+        weight,
+        height,
+        head_circumference,
+        note
+    FROM growth
+    WHERE child_id = :child_id AND
+          check_in >= NOW() - make_interval(months => :months)
+    ORDER BY check_in ASC
+""", parse_dates=['check_in'], child_id=int, months=int)
+
+# months may be NULL for the whole history; the CAST gives the parameter a type when it is
+GROWTH_VELOCITY = NamedQuery('growth_velocity', """
+    SELECT
+        g.check_in,
+        g.weight,
+        g.height,
+        g.head_circumference,
+        c.birth_date,
+        c.gender
+    FROM growth g
+    JOIN child c ON c.id = g.child_id
+    WHERE g.child_id = :child_id AND
+          (CAST(:months AS integer) IS NULL OR
+           g.check_in >= NOW() - make_interval(months => CAST(:months AS integer)))
+    ORDER BY g.check_in ASC
+""", parse_dates=['check_in', 'birth_date'], child_id=int, months=int)
+
+LATEST_GROWTH = NamedQuery('latest_growth', """
+    SELECT check_in, weight, height, head_circumference
+    FROM growth
+    WHERE child_id = :child_id
+    ORDER BY check_in DESC
+    LIMIT 1
+""", parse_dates=['check_in'], child_id=int)
+
+# Children
+
+CHILD_BIRTH_AND_GENDER = NamedQuery('child_birth_and_gender', """
+    SELECT birth_date, gender FROM child WHERE id = :child_id
+""", child_id=int)
+
+CHILD_INFO = NamedQuery('child_info', """
+    SELECT id, name, birth_date, gender
+    FROM child
+    WHERE id = :child_id
+""", parse_dates=['birth_date'], child_id=int)
+
+# Sleep
+
+SLEEP_BY_CHILD = NamedQuery('sleep_by_child', """
+    SELECT
+        s.id,
+        s.child_id,
+        s.check_in,
+        s.start_time,
+        s.end_time,
+        s.note,
+        s.account_id,
+        COALESCE(a.name, 'Unknown') as account_name
+    FROM sleep_time s
+    LEFT JOIN accounts a ON s.account_id = a.id
+    WHERE s.child_id = :child_id
+    AND s.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY s.check_in DESC
+""", parse_dates=['check_in', 'start_time', 'end_time'], child_id=int, days=int)
+
+# Legacy /sleep/sleeptime: the 30-day window is anchored on the newest record of any child
+SLEEP_LEGACY_30_DAYS = NamedQuery('sleep_legacy_30_days', """
+    WITH date_range AS
+    (
+        SELECT
+            MAX(check_in) - INTERVAL '30 DAY' as start_date,
+            MAX(check_in) as end_date
+        FROM sleep_time
+    )
+
+    SELECT
+        child_id,
+        check_in,
+        start_time,
+        end_time
+    FROM    sleep_time
+    WHERE   child_id = :child_id AND
+            (check_in BETWEEN (SELECT start_date FROM date_range) AND
+            (SELECT end_date FROM date_range))
+    ORDER BY    check_in DESC
+""", parse_dates=['check_in', 'start_time', 'end_time'], child_id=int)
+
+# The window ends at the child's newest record so older histories still show a full period
+SLEEP_INTERVALS = NamedQuery('sleep_intervals', """
+    WITH date_range AS
+    (
+        SELECT MAX(check_in) AS end_date
+        FROM sleep_time
+        WHERE child_id = :child_id
+    )
+
+    SELECT
+        s.start_time,
+        s.end_time
+    FROM    sleep_time s, date_range d
+    WHERE   s.child_id = :child_id AND
+            s.check_in BETWEEN d.end_date - make_interval(days => :days) AND d.end_date
+""", parse_dates=['start_time', 'end_time'], child_id=int, days=int)
+
+LATEST_SLEEP = NamedQuery('latest_sleep', """
+    SELECT check_in, start_time, end_time
+    FROM sleep_time
+    WHERE child_id = :child_id
+    ORDER BY check_in DESC
+    LIMIT 1
+""", parse_dates=['check_in', 'start_time', 'end_time'], child_id=int)
+
+# Meals
+
+MEALS_BY_CHILD = NamedQuery('meals_by_child', """
+    SELECT
+        m.*,
+        mtc.time_category,
+        mc.category as meal_category_name,
+        COALESCE(a.name, 'Unknown') as account_name
+    FROM meal m
+    JOIN meal_time_category mtc ON m.meal_time_category = mtc.id
+    JOIN meal_category mc ON m.meal_category = mc.id
+    LEFT JOIN accounts a ON m.account_id = a.id
+    WHERE m.child_id = :child_id AND
+          m.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY m.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+MEAL_ANALYTICS = NamedQuery('meal_analytics', """
+    SELECT
+        m.check_in,
+        m.consumption_level,
+        m.meal_time_category,
+        m.meal_category,
+        mtc.time_category,
+        mc.category as meal_category_name
+    FROM meal m
+    JOIN meal_time_category mtc ON m.meal_time_category = mtc.id
+    JOIN meal_category mc ON m.meal_category = mc.id
+    WHERE m.child_id = :child_id AND
+          m.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY m.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+# Poop
+
+POOPS_BY_CHILD = NamedQuery('poops_by_child', """
+    SELECT
+        p.*,
+        pc.category as color_name,
+        pt.category as texture_name,
+        COALESCE(a.name, 'Unknown') as account_name
+    FROM poop p
+    JOIN poop_color pc ON p.color = pc.id
+    JOIN poop_texture pt ON p.texture = pt.id
+    LEFT JOIN accounts a ON p.account_id = a.id
+    WHERE p.child_id = :child_id AND
+        p.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY p.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+POOP_ANALYTICS = NamedQuery('poop_analytics', """
+    SELECT
+        p.check_in,
+        pc.category as color_name,
+        pt.category as consistency_name,
+        p.note
+    FROM poop p
+    JOIN poop_color pc ON p.color = pc.id
+    JOIN poop_texture pt ON p.texture = pt.id
+    WHERE p.child_id = :child_id AND
+          p.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY p.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+# Symptoms
+
+SYMPTOMS_BY_CHILD = NamedQuery('symptoms_by_child', """
+    SELECT
+        s.*,
+        COALESCE(a.name, 'Unknown') as account_name
+    FROM symptom s
+    LEFT JOIN accounts a ON s.account_id = a.id
+    WHERE s.child_id = :child_id AND
+          s.check_in >= NOW() - make_interval(days => :days)
+    ORDER BY s.check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+SYMPTOM_SUMMARY = NamedQuery('symptom_summary', """
+    SELECT
+        symptom,
+        COUNT(*) as count,
+        check_in
+    FROM symptom
+    WHERE child_id = :child_id AND
+          check_in >= NOW() - make_interval(days => :days)
+    GROUP BY symptom, check_in
+    ORDER BY check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+SYMPTOM_ANALYTICS = NamedQuery('symptom_analytics', """
+    SELECT
+        check_in,
+        symptom,
+        note
+    FROM symptom
+    WHERE child_id = :child_id AND
+          check_in >= NOW() - make_interval(days => :days)
+    ORDER BY check_in DESC
+""", parse_dates=['check_in'], child_id=int, days=int)
+
+RECENT_SYMPTOM_AND_POOP_COUNTS = NamedQuery('recent_symptom_and_poop_counts', """
+    SELECT
+        (SELECT COUNT(*) FROM symptom WHERE child_id = :child_id AND check_in >= NOW() - make_interval(days => :days)) as symptoms,
+        (SELECT COUNT(*) FROM poop WHERE child_id = :child_id AND check_in >= NOW() - make_interval(days => :days)) as poops
+""", child_id=int, days=int)
+
+# Alert engine windows: one query per table for a whole batch of children
+
+ALERT_CHILDREN = NamedQuery('alert_children', """
+    SELECT id AS child_id, name, birth_date, gender
+    FROM child
+    WHERE id = ANY(:child_ids)
+    ORDER BY id
+""", parse_dates=['birth_date'], child_ids=list)
+
+ALERT_MEALS = NamedQuery('alert_meals', """
+    SELECT child_id, check_in, consumption_level
+    FROM meal
+    WHERE child_id = ANY(:child_ids) AND
+          check_in >= :window_start AND check_in < :window_end
+""", parse_dates=['check_in'], child_ids=list, window_start=datetime, window_end=datetime)
+
+# Sleep is selected by overlap so sessions running into the window still count
+ALERT_SLEEP = NamedQuery('alert_sleep', """
+    SELECT child_id, start_time, end_time
+    FROM sleep_time
+    WHERE child_id = ANY(:child_ids) AND
+          end_time > :window_start AND start_time < :window_end
+""", parse_dates=['start_time', 'end_time'], child_ids=list, window_start=datetime, window_end=datetime)
+
+ALERT_POOPS = NamedQuery('alert_poops', """
+    SELECT p.child_id, p.check_in, pc.category AS color_name, pt.category AS texture_name
+    FROM poop p
+    LEFT JOIN poop_color pc ON p.color = pc.id
+    LEFT JOIN poop_texture pt ON p.texture = pt.id
+    WHERE p.child_id = ANY(:child_ids) AND
+          p.check_in >= :window_start AND p.check_in < :window_end
+""", parse_dates=['check_in'], child_ids=list, window_start=datetime, window_end=datetime)
+
+ALERT_SYMPTOMS = NamedQuery('alert_symptoms', """
+    SELECT child_id, check_in, symptom
+    FROM symptom
+    WHERE child_id = ANY(:child_ids) AND
+          check_in >= :window_start AND check_in < :window_end
+""", parse_dates=['check_in'], child_ids=list, window_start=datetime, window_end=datetime)
+
+ALERT_GROWTH = NamedQuery('alert_growth', """
+    SELECT g.child_id, g.check_in, g.weight, g.height, g.head_circumference,
+           p.weight_z, p.height_z, p.head_circumference_z
+    FROM growth g
+    LEFT JOIN growth_percentile p ON p.growth_id = g.id
+    WHERE g.child_id = ANY(:child_ids) AND
+          g.check_in >= :window_start AND g.check_in < :window_end
+    ORDER BY g.child_id, g.check_in
+""", parse_dates=['check_in'], child_ids=list, window_start=datetime, window_end=datetime)
+
+
+# Analytics dashboard
+
+# Latest growth, last sleep, 7-day check-in counts and unread alerts for every child of a carer.
+# Each CTE is scoped to the carer's children and grouped by child, so the cost is one round trip.
+_DASHBOARD_SQL = """
+    WITH kids AS
+    (
+        SELECT c.id, c.name, c.birth_date, c.gender
+        FROM child c
+        JOIN primary_care_giver p ON p.id = c.carer_id
+        WHERE {carer_filter}
+    ),
+    latest_growth AS
+    (
+        SELECT DISTINCT ON (child_id)
+            child_id, check_in, weight, height, head_circumference
+        FROM growth
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC
+    ),
+    last_sleep AS
+    (
+        SELECT DISTINCT ON (child_id)
+            child_id, start_time, end_time
+        FROM sleep_time
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, end_time DESC
+    ),
+    recent AS
+    (
+        SELECT
+            child_id,
+            COUNT(*) FILTER (WHERE record_type = 'growth') AS growth,
+            COUNT(*) FILTER (WHERE record_type = 'sleep') AS sleep,
+            COUNT(*) FILTER (WHERE record_type = 'meals') AS meals,
+            COUNT(*) FILTER (WHERE record_type = 'poop') AS poop,
+            COUNT(*) FILTER (WHERE record_type = 'symptoms') AS symptoms
+        FROM
+        (
+            SELECT child_id, 'growth' AS record_type FROM growth
+            WHERE child_id IN (SELECT id FROM kids) AND check_in >= NOW() - INTERVAL '7 DAY'
+            UNION ALL
+            SELECT child_id, 'sleep' FROM sleep_time
+            WHERE child_id IN (SELECT id FROM kids) AND check_in >= NOW() - INTERVAL '7 DAY'
+            UNION ALL
+            SELECT child_id, 'meals' FROM meal
+            WHERE child_id IN (SELECT id FROM kids) AND check_in >= NOW() - INTERVAL '7 DAY'
+            UNION ALL
+            SELECT child_id, 'poop' FROM poop
+            WHERE child_id IN (SELECT id FROM kids) AND check_in >= NOW() - INTERVAL '7 DAY'
+            UNION ALL
+            SELECT child_id, 'symptoms' FROM symptom
+            WHERE child_id IN (SELECT id FROM kids) AND check_in >= NOW() - INTERVAL '7 DAY'
+        ) records
+        GROUP BY child_id
+    ),
+    unread AS
+    (
+        SELECT child_id, COUNT(*) AS unread_alerts
+        FROM health_alerts
+        WHERE child_id IN (SELECT id FROM kids) AND is_read = FALSE AND is_deleted = FALSE
+        GROUP BY child_id
+    )
+
+    SELECT
+        k.id, k.name, k.birth_date, k.gender,
+        g.check_in AS growth_check_in, g.weight, g.height, g.head_circumference,
+        s.start_time AS sleep_start, s.end_time AS sleep_end,
+        COALESCE(r.growth, 0) AS growth_7d,
+        COALESCE(r.sleep, 0) AS sleep_7d,
+        COALESCE(r.meals, 0) AS meals_7d,
+        COALESCE(r.poop, 0) AS poop_7d,
+        COALESCE(r.symptoms, 0) AS symptoms_7d,
+        COALESCE(u.unread_alerts, 0) AS unread_alerts
+    FROM kids k
+    LEFT JOIN latest_growth g ON g.child_id = k.id
+    LEFT JOIN last_sleep s ON s.child_id = k.id
+    LEFT JOIN recent r ON r.child_id = k.id
+    LEFT JOIN unread u ON u.child_id = k.id
+    ORDER BY k.id
+"""
+
+DASHBOARD_PARSE_DATES = ['birth_date', 'growth_check_in', 'sleep_start', 'sleep_end']
+
+DASHBOARD_BY_CARER = NamedQuery('dashboard_by_carer', _DASHBOARD_SQL.format(carer_filter="c.carer_id = :carer_id"),
+                                parse_dates=DASHBOARD_PARSE_DATES, carer_id=int)
+
+DASHBOARD_BY_AUTH_USER = NamedQuery('dashboard_by_auth_user',
+                                    _DASHBOARD_SQL.format(carer_filter="p.auth_user_id = :auth_user_id"),
+                                    parse_dates=DASHBOARD_PARSE_DATES, auth_user_id=str)
+
+
+# Chat
+
+# Chat list with message count and a preview of the latest message, each looked up per chat on
+# ix_chat_messages_chat_created; a NULL child_id returns every chat of the owner, archived chats only on request
+CHATS_BY_OWNER = NamedQuery('chats_by_owner', """
+    SELECT
+        c.id,
+        c.title,
+        c.owner_id,
+        c.child_id,
+        c.created_at,
+        c.updated_at,
+        c.archived_at,
+        counts.message_count,
+        last_message.created_at AS last_message_at,
+        last_message.sender AS last_message_sender,
+        LEFT(last_message.message, 120) AS last_message_preview
+    FROM chatbot_chats c
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS message_count FROM chat_messages m WHERE m.chat_id = c.id
+    ) counts
+    LEFT JOIN LATERAL (
+        SELECT m.message, m.sender, m.created_at
+        FROM chat_messages m
+        WHERE m.chat_id = c.id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1
+    ) last_message ON TRUE
+    WHERE c.owner_id = :owner_id AND
+          (CAST(:child_id AS integer) IS NULL OR c.child_id = :child_id OR c.child_id IS NULL) AND
+          (:include_archived OR c.archived_at IS NULL)
+    ORDER BY c.updated_at DESC, c.id DESC
+""", owner_id=int, child_id=int, include_archived=bool)
@@ -2,109 +2,94 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func
 from app.db import engine, get_session
 from app.models import Child, Growth, Sleep_Time, Meal, Poop, Symptom
+from app import queries
+from app.services.growth_reference import get_growth_reference, age_in_months, normalize_sex, METRICS
+from app.services.growth_analytics import metric_velocity
+from app.services.downsampling import lttb_indices
+from app.services.sleep_timeline import SleepTimeline
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-import json
 
 router = APIRouter(
     prefix="/analytics",
     tags=["analytics"],
 )
 
+RECENT_RECORD_TYPES = ['growth', 'sleep', 'meals', 'poop', 'symptoms']
+
+
+def _iso(value) -> Optional[str]:
+    """ISO string in Singapore time, or None for a missing timestamp"""
+    return None if pd.isna(value) else value.tz_convert('Asia/Singapore').isoformat()
+
+
+def build_dashboard(query: queries.NamedQuery, **params) -> Dict[str, Any]:
+    """Run one of the grouped dashboard queries for one carer and shape the response"""
+    with engine.connect() as conn, conn.begin():
+        rows = query.frame(conn, **params)
+
+    if rows.empty:
+        raise HTTPException(status_code=404, detail="No children found for this user")
+
+    now = pd.Timestamp.now(tz='UTC')
+    rows['age_months'] = ((now - rows['birth_date']).dt.days // 30).astype(int)
+    counts_dict = {record_type: int(rows[f'{record_type}_7d'].sum()) for record_type in RECENT_RECORD_TYPES}
+
+    # Generate alerts
+    alerts = []
+    if counts_dict['growth'] == 0:
+        alerts.append("No growth measurements in 7 days")
+    if counts_dict['symptoms'] > 0:
+        alerts.append(f"{counts_dict['symptoms']} symptoms recorded recently")
+
+    children_list = []
+    for child in rows.itertuples(index=False):
+        children_list.append({
+            "id": int(child.id),
+            "name": child.name,
+            "birth_date": _iso(child.birth_date),
+            "gender": child.gender,
+            "age_months": int(child.age_months),
+            "latest_growth": None if pd.isna(child.growth_check_in) else {
+                "check_in": _iso(child.growth_check_in),
+                "weight": child.weight,
+                "height": child.height,
+                "head_circumference": child.head_circumference
+            },
+            "last_sleep": None if pd.isna(child.sleep_end) else {
+                "start_time": _iso(child.sleep_start),
+                "end_time": _iso(child.sleep_end)
+            },
+            "recent_records": {record_type: int(getattr(child, f'{record_type}_7d')) for record_type in RECENT_RECORD_TYPES},
+            "unread_alerts": int(child.unread_alerts)
+        })
+
+    return {
+        "child_count": len(rows),
+        "children": children_list,
+        "recent_records": counts_dict,
+        "unread_alerts": int(rows['unread_alerts'].sum()),
+        "alerts": alerts,
+        "last_updated": datetime.now().isoformat()
+    }
+
 @router.get('/dashboard/{user_id}')
 def get_dashboard_summary(user_id: int):
     """Get comprehensive dashboard summary for a user"""
-    with engine.connect() as conn, conn.begin():
-        # Get user's children
-        children_sql = f"""
-                        SELECT id, name, birth_date, gender, carer_id
-                        FROM child
-                        WHERE carer_id = {user_id}
-                    """
-        children_data = pd.read_sql_query(children_sql, parse_dates=['birth_date'], con=conn)
-        
-        if children_data.empty:
-            raise HTTPException(status_code=404, detail="No children found for this user")
-        
-        child_ids = children_data['id'].tolist()
-        child_ids_str = ','.join(map(str, child_ids))
-        
-        # Get recent record counts (last 7 days)
-        recent_counts_sql = f"""
-                            SELECT 
-                                'growth' as record_type, COUNT(*) as count
-                            FROM growth 
-                            WHERE child_id IN ({child_ids_str}) AND check_in >= NOW() - INTERVAL 7 DAY
-                            UNION ALL
-                            SELECT 
-                                'sleep' as record_type, COUNT(*) as count
-                            FROM sleep_time 
-                            WHERE child_id IN ({child_ids_str}) AND check_in >= NOW() - INTERVAL 7 DAY
-                            UNION ALL
-                            SELECT 
-                                'meals' as record_type, COUNT(*) as count
-                            FROM meal 
-                            WHERE child_id IN ({child_ids_str}) AND check_in >= NOW() - INTERVAL 7 DAY
-                            UNION ALL
-                            SELECT 
-                                'symptoms' as record_type, COUNT(*) as count
-                            FROM symptom 
-                            WHERE child_id IN ({child_ids_str}) AND check_in >= NOW() - INTERVAL 7 DAY
-                        """
-        recent_counts = pd.read_sql_query(recent_counts_sql, con=conn)
-        
-        # Process counts
-        counts_dict = dict(zip(recent_counts['record_type'], recent_counts['count']))
-        
-        # Generate alerts
-        alerts = []
-        if counts_dict.get('growth', 0) == 0:
-            alerts.append("No growth measurements in 7 days")
-        if counts_dict.get('symptoms', 0) > 0:
-            alerts.append(f"{counts_dict.get('symptoms', 0)} symptoms recorded recently")
-        
-        # Calculate ages
-        children_list = []
-        for _, child in children_data.iterrows():
-            age_months = int((datetime.now() - child['birth_date']).days / 30)
-            children_list.append({
-                "id": child['id'],
-                "name": child['name'],
-                "age_months": age_months
-            })
-        
-        return {
-            "child_count": len(children_data),
-            "children": children_list,
-            "recent_records": {
-                "growth": counts_dict.get('growth', 0),
-                "sleep": counts_dict.get('sleep', 0),
-                "meals": counts_dict.get('meals', 0),
-                "symptoms": counts_dict.get('symptoms', 0)
-            },
-            "alerts": alerts,
-            "last_updated": datetime.now().isoformat()
-        }
+    return build_dashboard(queries.DASHBOARD_BY_CARER, carer_id=user_id)
+
+@router.get('/dashboard/by-auth/{auth_user_id}')
+def get_dashboard_summary_by_auth(auth_user_id: str):
+    """Dashboard summary for the carer with this Supabase Auth user ID"""
+    return build_dashboard(queries.DASHBOARD_BY_AUTH_USER, auth_user_id=auth_user_id)
 
 @router.get('/growth-trends/{child_id}')
-def get_growth_trends(child_id: int, months: Optional[int] = 6):
+def get_growth_trends(child_id: int, months: Optional[int] = 6, max_points: Optional[int] = None):
     """Get growth trends for a specific child - matches your dashboard chart needs"""
     with engine.connect() as conn, conn.begin():
-        sql_text_growth = f"""
-                            SELECT 
-                                check_in,
-                                weight,
-                                height,
-                                head_circumference,
-                                note
-                            FROM growth
-                            WHERE child_id = {child_id} AND
-                                  check_in >= NOW() - INTERVAL '{months} MONTH'
-                            ORDER BY check_in ASC
-                        """
-        growth_data = pd.read_sql_query(sql_text_growth, parse_dates=['check_in'], con=conn)
+        growth_data = queries.GROWTH_TRENDS.frame(conn, child_id=child_id, months=months)
         
         if growth_data.empty:
             return {
@@ -117,86 +102,105 @@ def get_growth_trends(child_id: int, months: Optional[int] = 6):
         
         # Convert to Singapore timezone (matching your existing pattern)
         growth_data['check_in'] = growth_data['check_in'].dt.tz_convert('Asia/Singapore')
+        total_records = len(growth_data)
+        
+        # Keep the points that preserve the shape of all three curves when the chart asks for fewer
+        if max_points and total_records > max_points:
+            x = growth_data['check_in'].astype('int64').to_numpy() / 1e9
+            y = growth_data[['weight', 'height', 'head_circumference']].ffill().bfill().fillna(0).to_numpy(dtype=float)
+            growth_data = growth_data.iloc[lttb_indices(x, y, max_points)]
         
         return {
             "dates": growth_data['check_in'].dt.strftime('%Y-%m-%d').tolist(),
             "weights": growth_data['weight'].tolist(),
             "heights": growth_data['height'].tolist(),
             "head_circumferences": growth_data['head_circumference'].tolist(),
-            "total_records": len(growth_data)
+            "total_records": total_records,
+            "returned_points": len(growth_data)
+        }
+
+@router.get('/growth-velocity/{child_id}')
+def get_growth_velocity(child_id: int, months: Optional[int] = None, window: int = 3):
+    """Growth velocity per month and percentile-line crossings over the child's growth history"""
+    with engine.connect() as conn, conn.begin():
+        growth_data = queries.GROWTH_VELOCITY.frame(conn, child_id=child_id, months=months)
+        
+        if growth_data.empty:
+            return {
+                "child_id": child_id,
+                "total_records": 0,
+                "message": "No growth data found for the specified period"
+            }
+        
+        growth_data['check_in'] = growth_data['check_in'].dt.tz_convert('Asia/Singapore')
+        
+        # Ages and z-scores for the whole history in one pass per metric
+        birth_date = growth_data['birth_date'].iloc[0]
+        sex = normalize_sex(growth_data['gender'].iloc[0])
+        ages = age_in_months(birth_date, growth_data['check_in'])
+        dates = growth_data['check_in'].dt.strftime('%Y-%m-%d').tolist()
+        reference = get_growth_reference()
+        
+        metrics = {}
+        for metric in METRICS:
+            values = growth_data[metric].to_numpy(dtype=float)
+            z = reference.z_scores(sex, metric, ages, values)
+            metrics[metric] = metric_velocity(dates, ages, values, z, window)
+        
+        return {
+            "child_id": child_id,
+            "total_records": len(growth_data),
+            "window": window,
+            "metrics": metrics
         }
 
 @router.get('/sleeptime/{child_id}')
-def sleep_analytics(child_id: int, days: Optional[int] = 30):
-    """Enhanced sleep analytics - compatible with your existing sleep charts"""
+def sleep_analytics(child_id: int, days: Optional[int] = 30, max_points: Optional[int] = None):
+    """Daily sleep totals (night sleep vs naps) with a compact summary"""
     with engine.connect() as conn, conn.begin():
-        sql_text_sleep = f"""
-                            WITH date_range AS
-                            (
-                                SELECT
-                                    MAX(check_in) - INTERVAL '{days} DAY' as start_date,
-                                    MAX(check_in) as end_date
-                                FROM sleep_time
-                                WHERE child_id = {child_id}
-                            )
+        sleep_data = queries.SLEEP_INTERVALS.frame(conn, child_id=child_id, days=days)
 
-                            SELECT
-                                child_id,
-                                check_in,
-                                start_time,
-                                end_time
-                            FROM	sleep_time
-                            WHERE	child_id = {child_id} AND 
-                                    (check_in BETWEEN (SELECT start_date FROM date_range) AND
-                                    (SELECT end_date FROM date_range))
-                            ORDER BY	check_in DESC
-                        """
-        sleep_data = pd.read_sql_query(sql_text_sleep, parse_dates=['check_in', 'start_time', 'end_time'], con=conn)
-        
-        if sleep_data.empty:
-            return json.loads(pd.DataFrame().to_json(orient='records'))
-        
-        # Convert to Singapore timezone (matching your existing sleep router)
-        sleep_data['check_in'] = sleep_data['check_in'].dt.tz_convert('Asia/Singapore')
-        sleep_data['start_time'] = sleep_data['start_time'].dt.tz_convert('Asia/Singapore')
-        sleep_data['end_time'] = sleep_data['end_time'].dt.tz_convert('Asia/Singapore')
-        
-        # Calculate sleep duration
-        sleep_data['sleep_hours'] = (sleep_data['end_time'] - sleep_data['start_time']).dt.total_seconds() / 3600
-        
-        # Basic analytics
-        avg_sleep = sleep_data['sleep_hours'].mean()
-        consistency = sleep_data['sleep_hours'].std() if len(sleep_data) > 1 else 0
-        
-        result = sleep_data.copy()
-        result['analytics'] = {
-            "average_sleep_hours": round(avg_sleep, 2) if not pd.isna(avg_sleep) else 0,
-            "consistency": round(consistency, 2),
-            "total_records": len(sleep_data)
+    # Overlapping records are merged and sessions split at Singapore midnight before summing
+    timeline = SleepTimeline.from_frame(sleep_data)
+    daily = timeline.daily()
+
+    if daily.empty:
+        return {
+            "child_id": child_id,
+            "summary": timeline.summary(daily),
+            "daily": [],
+            "message": "No sleep data found for the specified period"
         }
-        
-    return json.loads(result.to_json(orient='records'))
+
+    summary = timeline.summary(daily)
+
+    # The series is already one row per day; still honour max_points for long ranges
+    if max_points and len(daily) > max_points:
+        x = daily['sleep_date'].astype('int64').to_numpy() / 1e9
+        daily = daily.iloc[lttb_indices(x, daily['total_hours'].to_numpy(), max_points)]
+
+    return {
+        "child_id": child_id,
+        "summary": summary,
+        "daily": [
+            {
+                "date": row.sleep_date.strftime('%Y-%m-%d'),
+                "total_hours": float(row.total_hours),
+                "night_hours": float(row.night_hours),
+                "nap_hours": float(row.nap_hours),
+                "sessions": int(row.sessions),
+                "naps": int(row.naps),
+                "midnight_spanning": int(row.midnight_spanning)
+            }
+            for row in daily.itertuples(index=False)
+        ]
+    }
 
 @router.get('/meal-analytics/{child_id}')
 def get_meal_analytics(child_id: int, days: Optional[int] = 30):
     """Meal consumption analytics"""
     with engine.connect() as conn, conn.begin():
-        sql_text_meal = f"""
-                            SELECT 
-                                m.check_in,
-                                m.consumption_level,
-                                m.meal_time_category,
-                                m.meal_category,
-                                mtc.time_category,
-                                mc.category as meal_category_name
-                            FROM meal m
-                            JOIN meal_time_category mtc ON m.meal_time_category = mtc.id
-                            JOIN meal_category mc ON m.meal_category = mc.id
-                            WHERE m.child_id = {child_id} AND
-                                  m.check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY m.check_in DESC
-                        """
-        meal_data = pd.read_sql_query(sql_text_meal, parse_dates=['check_in'], con=conn)
+        meal_data = queries.MEAL_ANALYTICS.frame(conn, child_id=child_id, days=days)
         
         if meal_data.empty:
             return {
@@ -232,20 +236,7 @@ def get_meal_analytics(child_id: int, days: Optional[int] = 30):
 def get_poop_analytics(child_id: int, days: Optional[int] = 30):
     """Poop frequency and pattern analytics"""
     with engine.connect() as conn, conn.begin():
-        sql_text_poop = f"""
-                            SELECT 
-                                p.check_in,
-                                pc.category as color_name,
-                                pcon.category as consistency_name,
-                                p.note
-                            FROM poop p
-                            JOIN poop_color pc ON p.color = pc.id
-                            JOIN poop_consistency pcon ON p.consistency = pcon.id
-                            WHERE p.child_id = {child_id} AND
-                                  p.check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY p.check_in DESC
-                        """
-        poop_data = pd.read_sql_query(sql_text_poop, parse_dates=['check_in'], con=conn)
+        poop_data = queries.POOP_ANALYTICS.frame(conn, child_id=child_id, days=days)
         
         if poop_data.empty:
             return {
@@ -279,17 +270,7 @@ def get_poop_analytics(child_id: int, days: Optional[int] = 30):
 def get_symptom_analytics(child_id: int, days: Optional[int] = 30):
     """Symptom tracking analytics"""
     with engine.connect() as conn, conn.begin():
-        sql_text_symptom = f"""
-                            SELECT 
-                                check_in,
-                                symptom,
-                                note
-                            FROM symptom
-                            WHERE child_id = {child_id} AND
-                                  check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY check_in DESC
-                        """
-        symptom_data = pd.read_sql_query(sql_text_symptom, parse_dates=['check_in'], con=conn)
+        symptom_data = queries.SYMPTOM_ANALYTICS.frame(conn, child_id=child_id, days=days)
         
         if symptom_data.empty:
             return {
@@ -327,12 +308,7 @@ def get_health_overview(child_id: int, days: Optional[int] = 30):
     """Comprehensive health overview combining all data types"""
     with engine.connect() as conn, conn.begin():
         # Get child info
-        child_sql = f"""
-                    SELECT id, name, birth_date, gender
-                    FROM child
-                    WHERE id = {child_id}
-                """
-        child_data = pd.read_sql_query(child_sql, parse_dates=['birth_date'], con=conn)
+        child_data = queries.CHILD_INFO.frame(conn, child_id=child_id)
         
         if child_data.empty:
             raise HTTPException(status_code=404, detail="Child not found")
@@ -340,32 +316,13 @@ def get_health_overview(child_id: int, days: Optional[int] = 30):
         child_info = child_data.iloc[0]
         
         # Get latest growth
-        latest_growth_sql = f"""
-                            SELECT check_in, weight, height, head_circumference
-                            FROM growth
-                            WHERE child_id = {child_id}
-                            ORDER BY check_in DESC
-                            LIMIT 1
-                        """
-        latest_growth = pd.read_sql_query(latest_growth_sql, parse_dates=['check_in'], con=conn)
+        latest_growth = queries.LATEST_GROWTH.frame(conn, child_id=child_id)
         
         # Get latest sleep
-        latest_sleep_sql = f"""
-                           SELECT check_in, start_time, end_time
-                           FROM sleep_time
-                           WHERE child_id = {child_id}
-                           ORDER BY check_in DESC
-                           LIMIT 1
-                       """
-        latest_sleep = pd.read_sql_query(latest_sleep_sql, parse_dates=['check_in', 'start_time', 'end_time'], con=conn)
+        latest_sleep = queries.LATEST_SLEEP.frame(conn, child_id=child_id)
         
         # Count recent activities
-        recent_counts_sql = f"""
-                            SELECT 
-                                (SELECT COUNT(*) FROM symptom WHERE child_id = {child_id} AND check_in >= NOW() - INTERVAL {days} DAY) as symptoms,
-                                (SELECT COUNT(*) FROM poop WHERE child_id = {child_id} AND check_in >= NOW() - INTERVAL {days} DAY) as poops
-                        """
-        recent_counts = pd.read_sql_query(recent_counts_sql, con=conn)
+        recent_counts = queries.RECENT_SYMPTOM_AND_POOP_COUNTS.frame(conn, child_id=child_id, days=days)
         
         # Calculate age
         age_months = int((datetime.now() - child_info['birth_date']).days / 30)
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session, select, desc, tuple_, delete, update
 from app.db import get_session
 from app.models import ChatbotChat, ChatMessage, Primary_Care_Giver
+from app import queries
 from app.services.context_aggregator import ChildContextAggregator
 from app.services.rag_service import RAGService
+from app.services.chat_history import append_message, persist_reply
+from app.services.sse import encode_events, error_frames, event_stream_response
+from app.services.llm_gateway import llm_user
+from app.utils import encode_cursor, decode_cursor
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 import os
-import json
 
 router = APIRouter(
     tags=["chat"],
@@ -19,11 +22,13 @@ router = APIRouter(
 class ChatRequest(BaseModel):
     message: str
     child_id: Optional[int] = None
+    chat_id: Optional[UUID] = None  # When given, the turn is saved to this chat by the server
     
 class ContextualChatRequest(BaseModel):
     message: str
     child_id: int  # Single child
     carer_id: int
+    chat_id: Optional[UUID] = None  # When given, the turn is saved to this chat by the server
 
 class ChatCreateRequest(BaseModel):
     title: str = "New Chat"
@@ -34,6 +39,17 @@ class ChatResponse(BaseModel):
     context_used: Optional[str] = None
     sources: Optional[list] = None
     response_type: Optional[str] = None
+    user_message_id: Optional[UUID] = None
+    reply_message_id: Optional[UUID] = None
+
+def save_user_turn(chat_id: Optional[UUID], message: str) -> Optional[UUID]:
+    """Store the user's message before generation starts, so it survives a failed or abandoned reply"""
+    if chat_id is None:
+        return None
+    try:
+        return append_message(chat_id, 'user', message)['id']
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Chat not found")
 
 # Initialize RAG service (singleton pattern)
 rag_service = None
@@ -60,39 +76,46 @@ def chat_endpoint(payload: ChatRequest):
         if not rag:
             return ChatResponse(reply="AI service is currently unavailable. Please try again later.")
         
+        user_message_id = save_user_turn(payload.chat_id, payload.message)
+        
         # Simple response without child context
         result = rag.get_contextual_response(payload.message, "General pediatric consultation")
+        reply_message_id = append_message(payload.chat_id, 'ai', result["response"])['id'] if payload.chat_id else None
         
         return ChatResponse(
             reply=result["response"],
             sources=result.get("sources", []),
-            response_type=result.get("response_type", "general")
+            response_type=result.get("response_type", "general"),
+            user_message_id=user_message_id,
+            reply_message_id=reply_message_id
         )
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.post('/chat/stream')
-def chat_stream_endpoint(payload: ChatRequest):
-    """Basic streaming chat endpoint (non-contextual)"""
+def chat_stream_endpoint(payload: ChatRequest, request: Request):
+    """Basic streaming chat endpoint (non-contextual), as server-sent events"""
     try:
         rag = get_rag_service()
         if not rag:
-            def error_stream():
-                yield f"data: {json.dumps({'content': 'AI service is currently unavailable. Please try again later.', 'done': True, 'error': True})}\n\n"
-            return StreamingResponse(error_stream(), media_type="text/plain")
+            return event_stream_response(request, error_frames('AI service is currently unavailable. Please try again later.'))
+        
+        save_user_turn(payload.chat_id, payload.message)
         
         def generate_response():
             try:
-                for chunk in rag.stream_contextual_response(payload.message, "General pediatric consultation"):
-                    yield f"data: {json.dumps(chunk)}\n\n"
+                events = rag.stream_contextual_response(payload.message, "General pediatric consultation")
+                yield from encode_events(persist_reply(events, payload.chat_id))
             except Exception as e:
-                yield f"data: {json.dumps({'content': 'Error generating response', 'done': True, 'error': True})}\n\n"
+                yield from error_frames('Error generating response')
         
-        return StreamingResponse(generate_response(), media_type="text/plain")
+        return event_stream_response(request, generate_response())
+    except HTTPException as exc:
+        return event_stream_response(request, error_frames(exc.detail))
     except Exception as exc:
-        def error_stream():
-            yield f"data: {json.dumps({'content': str(exc), 'done': True, 'error': True})}\n\n"
-        return StreamingResponse(error_stream(), media_type="text/plain")
+        return event_stream_response(request, error_frames(str(exc)))
 
 @router.post('/chat/contextual', response_model=ChatResponse)
 def contextual_chat_endpoint(payload: ContextualChatRequest, session: Session = Depends(get_session)):
@@ -120,13 +143,18 @@ def contextual_chat_endpoint(payload: ContextualChatRequest, session: Session =
         if not rag:
             return ChatResponse(reply="AI service is currently unavailable. Please try again later.")
         
-        result = rag.get_contextual_response(payload.message, child_context, payload.child_id)
+        user_message_id = save_user_turn(payload.chat_id, payload.message)
+        with llm_user(f"carer:{payload.carer_id}"):
+            result = rag.get_contextual_response(payload.message, child_context, payload.child_id)
+        reply_message_id = append_message(payload.chat_id, 'ai', result["response"])['id'] if payload.chat_id else None
         
         return ChatResponse(
             reply=result["response"],
             context_used=child_context,
             sources=result.get("sources", []),
-            response_type=result.get("response_type", "general")
+            response_type=result.get("response_type", "general"),
+            user_message_id=user_message_id,
+            reply_message_id=reply_message_id
         )
         
     except HTTPException:
@@ -136,8 +164,8 @@ def contextual_chat_endpoint(payload: ContextualChatRequest, session: Session =
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.post('/chat/contextual/stream')
-def contextual_chat_stream_endpoint(payload: ContextualChatRequest, session: Session = Depends(get_session)):
-    """Contextual streaming chat endpoint with single child"""
+def contextual_chat_stream_endpoint(payload: ContextualChatRequest, request: Request, session: Session = Depends(get_session)):
+    """Contextual streaming chat endpoint with single child, as server-sent events"""
     try:
         # Verify carer exists
         carer = session.exec(
@@ -145,9 +173,7 @@ def contextual_chat_stream_endpoint(payload: ContextualChatRequest, session: Ses
         ).first()
         
         if not carer:
-            def error_stream():
-                yield f"data: {json.dumps({'content': 'Caregiver not found', 'done': True, 'error': True})}\n\n"
-            return StreamingResponse(error_stream(), media_type="text/plain")
+            return event_stream_response(request, error_frames('Caregiver not found'))
         
         # Get context for the single child
         context_aggregator = ChildContextAggregator(session)
@@ -156,63 +182,55 @@ def contextual_chat_stream_endpoint(payload: ContextualChatRequest, session: Ses
         )
         
         if "Child not found" in child_context:
-            def error_stream():
-                yield f"data: {json.dumps({'content': f'Child {payload.child_id} not found or access denied', 'done': True, 'error': True})}\n\n"
-            return StreamingResponse(error_stream(), media_type="text/plain")
+            return event_stream_response(request, error_frames(f'Child {payload.child_id} not found or access denied'))
         
         # Get RAG service
         rag = get_rag_service(session)
         if not rag:
-            def error_stream():
-                yield f"data: {json.dumps({'content': 'AI service is currently unavailable. Please try again later.', 'done': True, 'error': True})}\n\n"
-            return StreamingResponse(error_stream(), media_type="text/plain")
+            return event_stream_response(request, error_frames('AI service is currently unavailable. Please try again later.'))
+        
+        save_user_turn(payload.chat_id, payload.message)
         
         def generate_response():
             try:
-                for chunk in rag.stream_contextual_response(payload.message, child_context, payload.child_id):
-                    yield f"data: {json.dumps(chunk)}\n\n"
+                events = rag.stream_contextual_response(payload.message, child_context, payload.child_id,
+                                                        user_id=f"carer:{payload.carer_id}")
+                yield from encode_events(persist_reply(events, payload.chat_id))
             except Exception as e:
-                yield f"data: {json.dumps({'content': 'Error generating response', 'done': True, 'error': True})}\n\n"
+                yield from error_frames('Error generating response')
         
-        return StreamingResponse(generate_response(), media_type="text/plain")
+        return event_stream_response(request, generate_response())
         
+    except HTTPException as exc:
+        return event_stream_response(request, error_frames(exc.detail))
     except Exception as exc:
         print(f"Error in contextual streaming chat: {exc}")
-        def error_stream():
-            yield f"data: {json.dumps({'content': str(exc), 'done': True, 'error': True})}\n\n"
-        return StreamingResponse(error_stream(), media_type="text/plain")
+        return event_stream_response(request, error_frames(str(exc)))
 
 @router.get('/chats/{owner_id}')
-def get_chats_by_owner(*, owner_id: int, child_id: Optional[int] = None, session: Session = Depends(get_session)):
-    """Get chats by owner, optionally filtered by child"""
-    if child_id is not None:
-        # Get chats for this specific child (including general chats with no child)
-        chats = session.exec(
-            select(ChatbotChat).where(
-                ChatbotChat.owner_id == owner_id,
-                (ChatbotChat.child_id == child_id) | (ChatbotChat.child_id.is_(None))
-            )
-        ).all()
-    else:
-        # Get all chats for owner
-        chats = session.exec(
-            select(ChatbotChat).where(ChatbotChat.owner_id == owner_id)
-        ).all()
-    
-    # Convert to response format
-    result = []
-    for chat in chats:
-        chat_dict = {
-            "id": str(chat.id),
-            "title": chat.title,
-            "owner_id": chat.owner_id,
-            "child_id": chat.child_id,
-            "created_at": chat.created_at.isoformat(),
-            "updated_at": chat.updated_at.isoformat()
-        }
-        result.append(chat_dict)
-    
-    return result
+def get_chats_by_owner(*, owner_id: int, child_id: Optional[int] = None, include_archived: bool = False,
+                       session: Session = Depends(get_session)):
+    """Get chats by owner (optionally for one child, plus general chats), with message count and last-message preview"""
+    try:
+        rows = queries.CHATS_BY_OWNER.execute(session.connection(), owner_id=owner_id, child_id=child_id,
+                                              include_archived=include_archived).mappings().all()
+        
+        return [{
+            "id": str(row["id"]),
+            "title": row["title"],
+            "owner_id": row["owner_id"],
+            "child_id": row["child_id"],
+            "created_at": row["created_at"].isoformat(),
+            "updated_at": row["updated_at"].isoformat(),
+            "archived_at": row["archived_at"].isoformat() if row["archived_at"] else None,
+            "message_count": row["message_count"],
+            "last_message_at": row["last_message_at"].isoformat() if row["last_message_at"] else None,
+            "last_message_sender": row["last_message_sender"],
+            "last_message_preview": row["last_message_preview"]
+        } for row in rows]
+        
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Error getting chats: {str(exc)}")
 
 @router.post('/chats')
 def create_chat(*, payload: ChatCreateRequest, owner_id: int, session: Session = Depends(get_session)):
@@ -246,10 +264,36 @@ def create_chat(*, payload: ChatCreateRequest, owner_id: int, session: Session =
         raise HTTPException(status_code=500, detail=f"Error creating chat: {str(exc)}")
 
 
-@router.get('/chats/{chat_id}/messages', response_model=list[ChatMessage])
-def get_messages_by_chat(*, chat_id: UUID, session: Session = Depends(get_session)):
-    messages = session.exec(select(ChatMessage).where(ChatMessage.chat_id == chat_id)).all()
-    return messages
+@router.get('/chats/{chat_id}/messages')
+def get_messages_by_chat(*, chat_id: UUID, limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None,
+                         session: Session = Depends(get_session)):
+    """
+    Latest messages of a chat, oldest first within the page.
+    Pass the returned next_cursor to get the page of earlier messages.
+    """
+    statement = select(ChatMessage.id, ChatMessage.chat_id, ChatMessage.message, ChatMessage.sender,
+                       ChatMessage.created_at).where(ChatMessage.chat_id == chat_id)
+    
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            cursor_id = UUID(cursor_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Keyset: strictly before the oldest message already loaded
+        statement = statement.where(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(cursor_created_at, cursor_id))
+    
+    # Newest first so the page is the most recent history; one extra row tells us whether more exists
+    statement = statement.order_by(desc(ChatMessage.created_at), desc(ChatMessage.id)).limit(limit + 1)
+    messages = [dict(row) for row in session.execute(statement).mappings().all()]
+    
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]['created_at'], messages[-1]['id'])
+    
+    messages.reverse()
+    return {"chat_id": chat_id, "items": messages, "next_cursor": next_cursor}
 
 @router.post('/chats/{chat_id}/messages', response_model=ChatMessage)
 def create_message_for_chat(*, chat_id: UUID, message: ChatMessage, session: Session = Depends(get_session)):
@@ -278,22 +322,43 @@ def update_chat(*, chat_id: UUID, chat_update: ChatUpdateRequest, session: Sessi
 
 @router.delete('/chats/{chat_id}')
 def delete_chat(*, chat_id: UUID, session: Session = Depends(get_session)):
-    """Delete a chat and all its messages"""
+    """Delete a chat; its messages are removed by the ON DELETE CASCADE foreign key"""
     try:
-        # Delete all messages associated with this chat
-        messages = session.exec(select(ChatMessage).where(ChatMessage.chat_id == chat_id)).all()
-        for message in messages:
-            session.delete(message)
-        
-        # Delete the chat itself
-        chat = session.exec(select(ChatbotChat).where(ChatbotChat.id == chat_id)).first()
-        if not chat:
+        result = session.execute(delete(ChatbotChat).where(ChatbotChat.id == chat_id))
+        if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Chat not found")
         
-        session.delete(chat)
         session.commit()
         return {"message": "Chat deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as exc:
         session.rollback()
         raise HTTPException(status_code=500, detail=str(exc))
+
+class ChatBulkRequest(BaseModel):
+    owner_id: int
+    chat_ids: List[UUID]
+    action: Literal['delete', 'archive', 'unarchive']
+
+@router.post('/chats/bulk')
+def bulk_update_chats(*, payload: ChatBulkRequest, session: Session = Depends(get_session)):
+    """Delete, archive or unarchive many of an owner's chats with one statement"""
+    try:
+        # Scoped to the owner so ids of someone else's chats are ignored
+        chats = (ChatbotChat.owner_id == payload.owner_id) & (ChatbotChat.id.in_(payload.chat_ids))
+        
+        if payload.action == 'delete':
+            statement = delete(ChatbotChat).where(chats)
+        else:
+            archived_at = datetime.utcnow() if payload.action == 'archive' else None
+            statement = update(ChatbotChat).where(chats).values(archived_at=archived_at)
+        
+        result = session.execute(statement)
+        session.commit()
+        return {"action": payload.action, "requested": len(payload.chat_ids), "affected": result.rowcount}
+        
+    except Exception as exc:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Error updating chats: {str(exc)}")
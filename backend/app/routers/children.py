@@ -1,14 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
+from sqlalchemy import text
 from app.db import get_session
 from app.models import Child, Primary_Care_Giver
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/child-profile",
     tags=["children"],
 )
 
+# Newest record of every check-in type per child: one DISTINCT ON (child_id) scan per table,
+# joined back onto the children so the whole lookup is a single round trip
+LATEST_RECORDS_SQL = """
+    WITH kids AS
+    (
+        SELECT id
+        FROM child
+        WHERE carer_id = :carer_id OR id = ANY(CAST(:child_ids AS integer[]))
+    ),
+    latest_growth AS
+    (
+        SELECT DISTINCT ON (child_id) *
+        FROM growth
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC, id DESC
+    ),
+    latest_sleep AS
+    (
+        SELECT DISTINCT ON (child_id) *
+        FROM sleep_time
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC, id DESC
+    ),
+    latest_meal AS
+    (
+        SELECT DISTINCT ON (child_id) *
+        FROM meal
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC, id DESC
+    ),
+    latest_poop AS
+    (
+        SELECT DISTINCT ON (child_id) *
+        FROM poop
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC, id DESC
+    ),
+    latest_symptom AS
+    (
+        SELECT DISTINCT ON (child_id) *
+        FROM symptom
+        WHERE child_id IN (SELECT id FROM kids)
+        ORDER BY child_id, check_in DESC, id DESC
+    )
+
+    SELECT
+        k.id AS child_id,
+        to_jsonb(latest_growth) AS growth,
+        to_jsonb(latest_sleep) AS sleep,
+        to_jsonb(latest_meal) AS meal,
+        to_jsonb(latest_poop) AS poop,
+        to_jsonb(latest_symptom) AS symptom
+    FROM kids k
+    LEFT JOIN latest_growth ON latest_growth.child_id = k.id
+    LEFT JOIN latest_sleep ON latest_sleep.child_id = k.id
+    LEFT JOIN latest_meal ON latest_meal.child_id = k.id
+    LEFT JOIN latest_poop ON latest_poop.child_id = k.id
+    LEFT JOIN latest_symptom ON latest_symptom.child_id = k.id
+    ORDER BY k.id
+"""
+
+@router.get('/bulk/latest')
+def get_latest_records(*, session: Session = Depends(get_session), carer_id: Optional[int] = None,
+                       child_ids: Optional[List[int]] = Query(None)):
+    """Latest growth, sleep, meal, poop and symptom record for every child of a carer (or the given children) in one query"""
+    if carer_id is None and not child_ids:
+        raise HTTPException(status_code=400, detail="Provide carer_id or at least one child_ids value")
+    
+    try:
+        rows = session.execute(
+            text(LATEST_RECORDS_SQL),
+            {"carer_id": carer_id, "child_ids": child_ids or []}
+        ).mappings().all()
+        
+        return [dict(row) for row in rows]
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get latest records: {str(e)}")
+
 @router.get('/{child_id}', response_model=Child)
 def child_profile(*, session: Session = Depends(get_session), child_id: int):
     child = session.get(Child, child_id)
@@ -0,0 +1,32 @@
+import asyncio
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from typing import List
+from app.services.event_broker import get_event_broker, child_topic
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+# Idle connections get a ping this often so proxies keep them open and dead sockets are noticed
+HEARTBEAT_SECONDS = 25
+
+
+@router.websocket('/ws')
+async def child_events(websocket: WebSocket, child_ids: List[int] = Query(...)):
+    """Push check-in create/update/delete and alert events for the given children"""
+    await websocket.accept()
+    broker = get_event_broker()
+    subscription = broker.subscribe(child_topic(child_id) for child_id in child_ids)
+    try:
+        await websocket.send_json({"type": "subscribed", "child_ids": child_ids})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                event = {"type": "ping"}
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        broker.unsubscribe(subscription)
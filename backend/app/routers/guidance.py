@@ -1,17 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
+from datetime import datetime, timedelta
 import asyncio
+import json
+import time
 
 from app.db import get_session
-from app.models import Child 
+from app.models import Child, Symptom
 from app.services.ai_guidance_service import AIGuidanceService
+from app.services.guidance_artifact_store import guidance_artifact_store
+from app.services.guidance_corpus import get_guidance_corpus
 from app.utils import get_age_string_and_months
 
 router = APIRouter(
     prefix="/api/guidance"
 )
 
+def get_child_data(db: Session, child_id: int, user_id: int) -> Dict[str, Any]:
+    """Verify the child belongs to the user and prepare child data for AI analysis"""
+    child = db.query(Child).filter(
+        Child.id == child_id,
+        Child.carer_id == user_id
+    ).first()
+    
+    if not child:
+        raise HTTPException(status_code=404, detail="Child not found")
+    
+    # Recent symptom history feeds the local article ranker
+    recent_symptoms = db.query(Symptom.symptom).filter(
+        Symptom.child_id == child_id,
+        Symptom.check_in >= datetime.now() - timedelta(days=30)
+    ).distinct().all()
+    
+    age_string, age_months = get_age_string_and_months(child.birth_date)
+    return {
+        'id': child.id,
+        'name': child.name,
+        'age': age_string,
+        'age_months': age_months,
+        'birth_date': child.birth_date.isoformat() if child.birth_date else None,
+        'gender': child.gender,
+        'recent_symptoms': [row[0] for row in recent_symptoms]
+    }
+
+async def compute_guidance_artifact(child_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the article pipeline once and store articles with their topic statistics.
+    Only a successful enrichment is stored; corpus or fallback articles are returned without storing them.
+    """
+    ai_service = AIGuidanceService()
+    try:
+        articles = await ai_service.enrich_child_articles(child_data)
+    except Exception as e:
+        print(f"Error enriching guidance articles: {str(e)}")
+        articles = []
+    if articles:
+        return guidance_artifact_store.put(child_data, articles)
+    
+    fallback = get_guidance_corpus().search(child_data) or ai_service.get_fallback_articles(child_data)
+    return guidance_artifact_store.build_artifact(child_data, fallback)
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for guidance service"""
@@ -21,42 +71,40 @@ async def health_check():
 async def get_child_guidance_articles(
     child_id: int,
     db: Session = Depends(get_session),
-    user_id: int = Query(..., description="User ID for authentication")
+    user_id: int = Query(..., description="User ID for authentication"),
+    offline: bool = Query(False, description="Serve ranked articles from the local corpus index only")
 ) -> Dict[str, Any]:
     """
     Get AI-curated guidance articles for a specific child
     """
     try:
-        # Verify child exists and belongs to user
-        child = db.query(Child).filter(
-            Child.id == child_id,
-            Child.carer_id == user_id
-        ).first()
-        
-        if not child:
-            raise HTTPException(status_code=404, detail="Child not found")
-        
-        # Prepare child data for AI analysis
-        age_string, age_months = get_age_string_and_months(child.birth_date)
-        child_data = {
-            'id': child.id,
-            'name': child.name,
-            'age': age_string,
-            'age_months': age_months,
-            'birth_date': child.birth_date.isoformat() if child.birth_date else None,
-            'gender': child.gender
-        }
-        
-        # Get AI-curated articles
-        ai_service = AIGuidanceService()
-        articles = await ai_service.get_child_specific_articles(child_data)
+        child_data = get_child_data(db, child_id, user_id)
+        
+        if offline:
+            # No LLM or network use: rank the curated corpus for this child
+            started = time.perf_counter()
+            articles = get_guidance_corpus().search(child_data)
+            return {
+                'success': True,
+                'child_id': child_id,
+                'child_name': child_data['name'],
+                'articles': articles,
+                'total_articles': len(articles),
+                'source': 'index',
+                'search_ms': round((time.perf_counter() - started) * 1000, 3)
+            }
+        
+        # Reuse the stored artifact if one exists, otherwise compute it
+        artifact = guidance_artifact_store.get(child_data)
+        if not artifact:
+            artifact = await compute_guidance_artifact(child_data)
         
         return {
             'success': True,
             'child_id': child_id,
-            'child_name': child.name,
-            'articles': articles,
-            'total_articles': len(articles)
+            'child_name': child_data['name'],
+            'articles': artifact['articles'],
+            'total_articles': artifact['total_articles']
         }
         
     except HTTPException:
@@ -64,6 +112,66 @@ async def get_child_guidance_articles(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get guidance articles: {str(e)}")
 
+@router.get("/articles/{child_id}/stream")
+async def stream_child_guidance_articles(
+    child_id: int,
+    db: Session = Depends(get_session),
+    user_id: int = Query(..., description="User ID for authentication"),
+    refresh: bool = Query(False, description="Recompute even if a stored artifact exists")
+):
+    """
+    Stream guidance articles as server-sent events: cached or curated articles
+    first, then re-ranked articles each time enrichment tasks complete
+    """
+    child_data = get_child_data(db, child_id, user_id)
+    artifact = None if refresh else guidance_artifact_store.get(child_data)
+    
+    def event(payload: Dict[str, Any]) -> str:
+        return f"data: {json.dumps(payload, default=str)}\n\n"
+    
+    async def generate_events():
+        if artifact:
+            yield event({'type': 'initial', 'source': 'cached', 'articles': artifact['articles']})
+            yield event({'type': 'done', 'source': 'cached', 'total_articles': artifact['total_articles']})
+            return
+        
+        # Emit curated corpus (or hard-coded fallback) articles immediately
+        ai_service = AIGuidanceService()
+        initial = get_guidance_corpus().search(child_data)
+        source = 'index'
+        if not initial:
+            initial = ai_service.get_fallback_articles(child_data)
+            source = 'fallback'
+        yield event({'type': 'initial', 'source': source, 'articles': initial})
+        
+        articles = []
+        updates = ai_service.stream_child_specific_articles(child_data)
+        try:
+            async for ranked in updates:
+                articles = ranked
+                yield event({'type': 'update', 'source': 'enriched', 'articles': ranked})
+        except Exception as e:
+            print(f"Error streaming guidance articles: {str(e)}")
+            yield event({'type': 'error', 'message': 'Failed to enrich guidance articles'})
+            yield event({'type': 'done', 'source': source, 'total_articles': len(articles or initial)})
+            return
+        finally:
+            # Cancels in-flight scrapes right away if the client disconnected mid-stream
+            await updates.aclose()
+        
+        # Only a completed enrichment becomes the child's artifact; corpus or fallback lists are never stored
+        if not articles:
+            yield event({'type': 'done', 'source': source, 'total_articles': len(initial)})
+            return
+        stored = guidance_artifact_store.put(child_data, articles)
+        yield event({'type': 'done', 'source': 'enriched', 'total_articles': stored['total_articles']})
+    
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/articles/{child_id}/refresh")
 async def refresh_child_guidance_articles(
     child_id: int,
@@ -74,36 +182,17 @@ async def refresh_child_guidance_articles(
     Force refresh of AI-curated guidance articles for a specific child
     """
     try:
-        # Verify child exists and belongs to user
-        child = db.query(Child).filter(
-            Child.id == child_id,
-            Child.carer_id == user_id
-        ).first()
-        
-        if not child:
-            raise HTTPException(status_code=404, detail="Child not found")
+        child_data = get_child_data(db, child_id, user_id)
         
-        # Prepare child data for AI analysis
-        age_string, age_months = get_age_string_and_months(child.birth_date)
-        child_data = {
-            'id': child.id,
-            'name': child.name,
-            'age': age_string,
-            'age_months': age_months,
-            'birth_date': child.birth_date.isoformat() if child.birth_date else None,
-            'gender': child.gender
-        }
-        
-        # Get fresh AI-curated articles
-        ai_service = AIGuidanceService()
-        articles = await ai_service.get_child_specific_articles(child_data)
+        # Always recompute and replace the stored artifact
+        artifact = await compute_guidance_artifact(child_data)
         
         return {
             'success': True,
             'child_id': child_id,
-            'child_name': child.name,
-            'articles': articles,
-            'total_articles': len(articles),
+            'child_name': child_data['name'],
+            'articles': artifact['articles'],
+            'total_articles': artifact['total_articles'],
             'refreshed_at': asyncio.get_event_loop().time()
         }
         
@@ -122,51 +211,22 @@ async def get_child_guidance_summary(
     Get AI-generated summary of guidance topics for a specific child
     """
     try:
-        # Verify child exists and belongs to user
-        child = db.query(Child).filter(
-            Child.id == child_id,
-            Child.carer_id == user_id
-        ).first()
-        
-        if not child:
-            raise HTTPException(status_code=404, detail="Child not found")
-        
-        # Prepare child data for AI analysis
-        age_string, age_months = get_age_string_and_months(child.birth_date)
-        child_data = {
-            'id': child.id,
-            'name': child.name,
-            'age': age_string,
-            'age_months': age_months,
-            'birth_date': child.birth_date.isoformat() if child.birth_date else None,
-            'gender': child.gender
-        }
-        
-        # Get AI-curated articles and generate summary
-        ai_service = AIGuidanceService()
-        articles = await ai_service.get_child_specific_articles(child_data)
-        
-        # Extract key topics from articles
-        all_topics = []
-        for article in articles:
-            topics = article.get('key_topics', [])
-            all_topics.extend(topics)
-        
-        # Count topic frequency
-        topic_counts = {}
-        for topic in all_topics:
-            topic_counts[topic] = topic_counts.get(topic, 0) + 1
+        child_data = get_child_data(db, child_id, user_id)
         
-        # Get top topics
-        top_topics = sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Read topic statistics from the already-built artifact; only compute
+        # when the articles endpoint has not run yet for this child
+        artifact = guidance_artifact_store.get(child_data)
+        if not artifact:
+            artifact = await compute_guidance_artifact(child_data)
         
         return {
             'success': True,
             'child_id': child_id,
-            'child_name': child.name,
-            'total_articles': len(articles),
-            'top_topics': [{'topic': topic, 'count': count} for topic, count in top_topics],
-            'avg_relevance_score': sum(article.get('relevance_score', 0) for article in articles) / len(articles) if articles else 0
+            'child_name': child_data['name'],
+            'total_articles': artifact['total_articles'],
+            'top_topics': artifact['top_topics'],
+            'avg_relevance_score': artifact['avg_relevance_score'],
+            'computed_at': artifact['computed_at']
         }
         
     except HTTPException:
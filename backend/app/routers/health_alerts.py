@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, desc
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select, desc, func, tuple_
 from app.db import get_session
 from app.models import Health_Alerts, Child
+from app.services.health_alert_engine import run_for_children, alert_upsert_statement
+from app.services.sleep_timeline import SLEEP_TIMEZONE
+from app.services.event_broker import publish_child_event
+from app.utils import encode_cursor, decode_cursor
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal
+import pandas as pd
 
 router = APIRouter(
     prefix="/health-alerts",
@@ -23,50 +28,73 @@ class HealthAlertCreate(BaseModel):
     data_period_start: date
     data_period_end: date
 
-class HealthAlertResponse(BaseModel):
+class HealthAlertSummary(BaseModel):
     id: UUID
     child_id: int
     alert_type: str
     title: str
-    description: str
     severity: str
-    suggestions: List[Dict[str, Any]]
     analysis_date: date
     created_at: datetime
     is_read: bool
     read_at: Optional[datetime]
 
+class HealthAlertResponse(HealthAlertSummary):
+    description: str
+    suggestions: List[Dict[str, Any]]
+
+# Columns of the 'summary' timeline view, all held in the covering ix_health_alerts_timeline index
+SUMMARY_COLUMNS = [Health_Alerts.id, Health_Alerts.child_id, Health_Alerts.alert_type, Health_Alerts.title,
+                   Health_Alerts.severity, Health_Alerts.analysis_date, Health_Alerts.created_at,
+                   Health_Alerts.is_read, Health_Alerts.read_at]
+FULL_COLUMNS = SUMMARY_COLUMNS + [Health_Alerts.description, Health_Alerts.suggestions]
+
 class MarkReadRequest(BaseModel):
     is_read: bool
 
-@router.get('/timeline/{child_id}', response_model=List[HealthAlertResponse])
-def get_alert_timeline(*, session: Session = Depends(get_session), child_id: int):
-    """Get all alerts for a child in chronological order (timeline)"""
+@router.get('/timeline/{child_id}')
+def get_alert_timeline(*, session: Session = Depends(get_session), child_id: int,
+                       limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None,
+                       view: Literal['full', 'summary'] = 'full'):
+    """
+    Alerts for a child, newest first, one page at a time.
+    Pass the returned next_cursor to get the following page; view=summary omits description and suggestions.
+    """
     try:
         child = session.get(Child, child_id)
         if not child:
             raise HTTPException(status_code=404, detail=f"Child ID #{child_id} not found")
         
-        alerts_statement = select(Health_Alerts).where(
+        columns = SUMMARY_COLUMNS if view == 'summary' else FULL_COLUMNS
+        alerts_statement = select(*columns).where(
             Health_Alerts.child_id == child_id,
             Health_Alerts.is_deleted == False
-        ).order_by(desc(Health_Alerts.created_at))
+        )
         
-        alerts = session.exec(alerts_statement).all()
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+                cursor_id = UUID(cursor_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            # Keyset: strictly after the last row of the previous page in (created_at, id) order
+            alerts_statement = alerts_statement.where(
+                tuple_(Health_Alerts.created_at, Health_Alerts.id) < tuple_(cursor_created_at, cursor_id)
+            )
         
-        return [HealthAlertResponse(
-            id=alert.id,
-            child_id=alert.child_id,
-            alert_type=alert.alert_type,
-            title=alert.title,
-            description=alert.description,
-            severity=alert.severity,
-            suggestions=alert.suggestions,
-            analysis_date=alert.analysis_date,
-            created_at=alert.created_at,
-            is_read=alert.is_read,
-            read_at=alert.read_at
-        ) for alert in alerts]
+        # One extra row tells us whether another page exists
+        alerts_statement = alerts_statement.order_by(
+            desc(Health_Alerts.created_at), desc(Health_Alerts.id)
+        ).limit(limit + 1)
+        
+        alerts = [dict(row) for row in session.execute(alerts_statement).mappings().all()]
+        
+        next_cursor = None
+        if len(alerts) > limit:
+            alerts = alerts[:limit]
+            next_cursor = encode_cursor(alerts[-1]['created_at'], alerts[-1]['id'])
+        
+        return {"child_id": child_id, "items": alerts, "next_cursor": next_cursor}
         
     except HTTPException:
         raise
@@ -81,14 +109,14 @@ def get_unread_count(*, session: Session = Depends(get_session), child_id: int):
         if not child:
             raise HTTPException(status_code=404, detail=f"Child ID #{child_id} not found")
         
-        unread_statement = select(Health_Alerts).where(
+        # count(*) over the partial unread index instead of loading every unread row
+        unread_statement = select(func.count()).select_from(Health_Alerts).where(
             Health_Alerts.child_id == child_id,
             Health_Alerts.is_read == False,
             Health_Alerts.is_deleted == False
         )
         
-        unread_alerts = session.exec(unread_statement).all()
-        count = len(unread_alerts)
+        count = session.exec(unread_statement).one()
         
         return {"child_id": child_id, "unread_count": count}
         
@@ -97,6 +125,83 @@ def get_unread_count(*, session: Session = Depends(get_session), child_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get unread count: {str(e)}")
 
+@router.get('/unread-counts')
+def get_unread_counts(*, session: Session = Depends(get_session), child_ids: List[int] = Query(...)):
+    """Unread alert counts for many children in one grouped query; children without unread alerts get 0"""
+    try:
+        unread_statement = select(Health_Alerts.child_id, func.count()).where(
+            Health_Alerts.child_id.in_(child_ids),
+            Health_Alerts.is_read == False,
+            Health_Alerts.is_deleted == False
+        ).group_by(Health_Alerts.child_id)
+        
+        counts = dict(session.exec(unread_statement).all())
+        
+        return [{"child_id": child_id, "unread_count": counts.get(child_id, 0)} for child_id in dict.fromkeys(child_ids)]
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get unread counts: {str(e)}")
+
+def alerts_for_day(session: Session, child_id: int, analysis_date: date) -> List[HealthAlertResponse]:
+    """Stored alerts for one child and analysis day, newest first"""
+    alerts_statement = select(Health_Alerts).where(
+        Health_Alerts.child_id == child_id,
+        Health_Alerts.analysis_date == datetime.combine(analysis_date, datetime.min.time()),
+        Health_Alerts.is_deleted == False
+    ).order_by(desc(Health_Alerts.created_at))
+    
+    return [HealthAlertResponse(
+        id=alert.id,
+        child_id=alert.child_id,
+        alert_type=alert.alert_type,
+        title=alert.title,
+        description=alert.description,
+        severity=alert.severity,
+        suggestions=alert.suggestions,
+        analysis_date=alert.analysis_date,
+        created_at=alert.created_at,
+        is_read=alert.is_read,
+        read_at=alert.read_at
+    ) for alert in session.exec(alerts_statement).all()]
+
+@router.get('/daily/{child_id}', response_model=List[HealthAlertResponse])
+def get_daily_alerts(*, session: Session = Depends(get_session), child_id: int, analysis_date: Optional[date] = None):
+    """
+    Alerts for a child on one day (today in Singapore by default). Read-only: alerts are evaluated
+    when check-ins are written and by the evaluate_health_alerts batch job.
+    """
+    try:
+        analysis_date = analysis_date or pd.Timestamp.now(tz=SLEEP_TIMEZONE).date()
+        return alerts_for_day(session, child_id, analysis_date)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get daily alerts: {str(e)}")
+
+@router.post('/evaluate/{child_id}', response_model=List[HealthAlertResponse])
+def evaluate_alerts(*, session: Session = Depends(get_session), child_id: int, analysis_date: Optional[date] = None):
+    """Run the server-side alert rules for a child (today in Singapore by default) and return that day's alerts"""
+    try:
+        child = session.get(Child, child_id)
+        if not child:
+            raise HTTPException(status_code=404, detail=f"Child ID #{child_id} not found")
+        
+        analysis_date = analysis_date or pd.Timestamp.now(tz=SLEEP_TIMEZONE).date()
+        _, removed = run_for_children(session.connection(), [child_id], analysis_date)
+        session.commit()
+        for alert in removed:
+            publish_child_event(child_id, 'alert', 'deleted', alert['alert_type'], alert['id'])
+        
+        responses = alerts_for_day(session, child_id, analysis_date)
+        for response in responses:
+            publish_child_event(child_id, 'alert', 'upserted', response.alert_type, response.id, response)
+        return responses
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to evaluate alerts: {str(e)}")
+
 @router.post('/', response_model=HealthAlertResponse)
 def create_alert(*, session: Session = Depends(get_session), alert_data: HealthAlertCreate):
     """Create or update an alert (upsert based on child_id, alert_type, analysis_date)"""
@@ -105,49 +210,12 @@ def create_alert(*, session: Session = Depends(get_session), alert_data: HealthA
         if not child:
             raise HTTPException(status_code=404, detail=f"Child ID #{alert_data.child_id} not found")
         
-        # Check if alert already exists
-        existing_alert_statement = select(Health_Alerts).where(
-            Health_Alerts.child_id == alert_data.child_id,
-            Health_Alerts.alert_type == alert_data.alert_type,
-            Health_Alerts.analysis_date == alert_data.analysis_date
-        )
-        
-        existing_alert = session.exec(existing_alert_statement).first()
-        
-        if existing_alert:
-            # Update existing alert
-            existing_alert.title = alert_data.title
-            existing_alert.description = alert_data.description
-            existing_alert.severity = alert_data.severity
-            existing_alert.suggestions = alert_data.suggestions
-            existing_alert.data_period_start = alert_data.data_period_start
-            existing_alert.data_period_end = alert_data.data_period_end
-            
-            session.add(existing_alert)
-            session.commit()
-            session.refresh(existing_alert)
-            alert = existing_alert
-        else:
-            # Create new alert
-            alert = Health_Alerts(
-                child_id=alert_data.child_id,
-                alert_type=alert_data.alert_type,
-                title=alert_data.title,
-                description=alert_data.description,
-                severity=alert_data.severity,
-                suggestions=alert_data.suggestions,
-                analysis_date=alert_data.analysis_date,
-                data_period_start=alert_data.data_period_start,
-                data_period_end=alert_data.data_period_end,
-                created_at=datetime.now(),
-                is_read=False
-            )
-            
-            session.add(alert)
-            session.commit()
-            session.refresh(alert)
+        # Native upsert on the (child_id, alert_type, analysis_date) unique constraint, safe under concurrent posts
+        statement = alert_upsert_statement([alert_data.dict()]).returning(Health_Alerts)
+        alert = session.execute(statement).scalar_one()
+        session.commit()
         
-        return HealthAlertResponse(
+        response = HealthAlertResponse(
             id=alert.id,
             child_id=alert.child_id,
             alert_type=alert.alert_type,
@@ -160,6 +228,8 @@ def create_alert(*, session: Session = Depends(get_session), alert_data: HealthA
             is_read=alert.is_read,
             read_at=alert.read_at
         )
+        publish_child_event(response.child_id, 'alert', 'upserted', response.alert_type, response.id, response)
+        return response
         
     except HTTPException:
         raise
@@ -182,7 +252,7 @@ def mark_alert_read_status(*, session: Session = Depends(get_session), alert_id:
         session.commit()
         session.refresh(alert)
         
-        return HealthAlertResponse(
+        response = HealthAlertResponse(
             id=alert.id,
             child_id=alert.child_id,
             alert_type=alert.alert_type,
@@ -195,6 +265,8 @@ def mark_alert_read_status(*, session: Session = Depends(get_session), alert_id:
             is_read=alert.is_read,
             read_at=alert.read_at
         )
+        publish_child_event(response.child_id, 'alert', 'read' if response.is_read else 'unread', response.alert_type, response.id, response)
+        return response
         
     except HTTPException:
         raise
@@ -217,6 +289,7 @@ def delete_alert(*, session: Session = Depends(get_session), alert_id: UUID):
         
         session.add(alert)
         session.commit()
+        publish_child_event(alert.child_id, 'alert', 'deleted', alert.alert_type, alert_id)
         
         return {"message": "Alert deleted successfully", "alert_id": str(alert_id)}
         
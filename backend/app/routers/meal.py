@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session, select
 from app.db import engine, get_session
 from app.models import Meal, Meal_Category, Meal_Time_Category
+from app import queries
+from app.services.event_broker import publish_child_event
+from app.services.alert_refresh import refresh_child_alerts
 from typing import List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -24,21 +27,7 @@ def get_meal(*, session: Session = Depends(get_session), meal_id: int):
 def get_meals_by_child(child_id: int, days: Optional[int] = 30):
     """Get all meals for a specific child (last 30 days by default)"""
     with engine.connect() as conn, conn.begin():
-        sql_text_meal = f"""
-                            SELECT 
-                                m.*,
-                                mtc.time_category,
-                                mc.category as meal_category_name,
-                                COALESCE(a.name, 'Unknown') as account_name
-                            FROM meal m
-                            JOIN meal_time_category mtc ON m.meal_time_category = mtc.id
-                            JOIN meal_category mc ON m.meal_category = mc.id
-                            LEFT JOIN accounts a ON m.account_id = a.id
-                            WHERE m.child_id = {child_id} AND
-                                  m.check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY m.check_in DESC
-                        """
-        meals = pd.read_sql_query(sql_text_meal, parse_dates=['check_in'], con=conn)
+        meals = queries.MEALS_BY_CHILD.frame(conn, child_id=child_id, days=days)
         
         if meals.empty:
             return []
@@ -66,24 +55,27 @@ def get_latest_meal(*, session: Session = Depends(get_session), child_id: int):
         raise HTTPException(status_code=500, detail=f"Failed to get meal data: {str(e)}")
 
 @router.post('/', response_model=Meal)
-def create_meal(*, session: Session = Depends(get_session), meal: Meal):
+def create_meal(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, meal: Meal):
     """Create a new meal record"""
     try:
         session.add(meal)
         session.commit()
         session.refresh(meal)
+        publish_child_event(meal.child_id, 'checkin', 'created', 'meal', meal.id, meal)
+        background_tasks.add_task(refresh_child_alerts, meal.child_id, meal.check_in)
         return meal
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create meal: {str(e)}")
 
 @router.put('/{meal_id}', response_model=Meal)
-def update_meal(*, session: Session = Depends(get_session), meal_id: int, meal_update: Meal):
+def update_meal(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, meal_id: int, meal_update: Meal):
     """Update an existing meal record"""
     try:
         meal = session.get(Meal, meal_id)
         if not meal:
             raise HTTPException(status_code=404, detail=f"Meal ID #{meal_id} not found")
+        previous_check_in = meal.check_in
         
         # Update fields
         meal.check_in = meal_update.check_in
@@ -96,6 +88,8 @@ def update_meal(*, session: Session = Depends(get_session), meal_id: int, meal_u
         session.add(meal)
         session.commit()
         session.refresh(meal)
+        publish_child_event(meal.child_id, 'checkin', 'updated', 'meal', meal.id, meal)
+        background_tasks.add_task(refresh_child_alerts, meal.child_id, previous_check_in, meal.check_in)
         return meal
         
     except HTTPException:
@@ -105,15 +99,19 @@ def update_meal(*, session: Session = Depends(get_session), meal_id: int, meal_u
         raise HTTPException(status_code=500, detail=f"Failed to update meal: {str(e)}")
 
 @router.delete('/{meal_id}')
-def delete_meal(*, session: Session = Depends(get_session), meal_id: int):
+def delete_meal(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, meal_id: int):
     """Delete a meal record"""
     try:
         meal = session.get(Meal, meal_id)
         if not meal:
             raise HTTPException(status_code=404, detail=f"Meal ID #{meal_id} not found")
         
+        child_id = meal.child_id
+        check_in = meal.check_in
         session.delete(meal)
         session.commit()
+        publish_child_event(child_id, 'checkin', 'deleted', 'meal', meal_id)
+        background_tasks.add_task(refresh_child_alerts, child_id, check_in)
         return {"message": f"Meal ID #{meal_id} deleted successfully"}
         
     except HTTPException:
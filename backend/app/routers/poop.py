@@ -1,9 +1,12 @@
 # Update your app/routers/poop.py file
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session, select
 from app.db import engine, get_session
 from app.models import Poop, Poop_Color, Poop_Texture  # CHANGED: Poop_Consistency -> Poop_Texture
+from app import queries
+from app.services.event_broker import publish_child_event
+from app.services.alert_refresh import refresh_child_alerts
 from typing import List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -26,21 +29,7 @@ def get_poop(*, session: Session = Depends(get_session), poop_id: int):
 def get_poops_by_child(child_id: int, days: Optional[int] = 90):
     """Get all poop records for a specific child (last 90 days by default)"""
     with engine.connect() as conn, conn.begin():
-        sql_text_poop = f"""
-                            SELECT 
-                                p.*,
-                                pc.category as color_name,
-                                pt.category as texture_name,
-                                COALESCE(a.name, 'Unknown') as account_name
-                            FROM poop p
-                            JOIN poop_color pc ON p.color = pc.id
-                            JOIN poop_texture pt ON p.texture = pt.id
-                            LEFT JOIN accounts a ON p.account_id = a.id
-                            WHERE p.child_id = {child_id} AND
-                                p.check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY p.check_in DESC
-                                                """
-        poops = pd.read_sql_query(sql_text_poop, parse_dates=['check_in'], con=conn)
+        poops = queries.POOPS_BY_CHILD.frame(conn, child_id=child_id, days=days)
         
         if poops.empty:
             return []
@@ -75,24 +64,27 @@ def get_latest_poop(*, session: Session = Depends(get_session), child_id: int):
         raise HTTPException(status_code=500, detail=f"Failed to get poop data: {str(e)}")
 
 @router.post('/', response_model=Poop)
-def create_poop(*, session: Session = Depends(get_session), poop: Poop):
+def create_poop(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, poop: Poop):
     """Create a new poop record"""
     try:
         session.add(poop)
         session.commit()
         session.refresh(poop)
+        publish_child_event(poop.child_id, 'checkin', 'created', 'poop', poop.id, poop)
+        background_tasks.add_task(refresh_child_alerts, poop.child_id, poop.check_in)
         return poop
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create poop record: {str(e)}")
 
 @router.put('/{poop_id}', response_model=Poop)
-def update_poop(*, session: Session = Depends(get_session), poop_id: int, poop_update: Poop):
+def update_poop(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, poop_id: int, poop_update: Poop):
     """Update an existing poop record"""
     try:
         poop = session.get(Poop, poop_id)
         if not poop:
             raise HTTPException(status_code=404, detail=f"Poop ID #{poop_id} not found")
+        previous_check_in = poop.check_in
         
         # Update fields
         poop.check_in = poop_update.check_in
@@ -103,6 +95,8 @@ def update_poop(*, session: Session = Depends(get_session), poop_id: int, poop_u
         session.add(poop)
         session.commit()
         session.refresh(poop)
+        publish_child_event(poop.child_id, 'checkin', 'updated', 'poop', poop.id, poop)
+        background_tasks.add_task(refresh_child_alerts, poop.child_id, previous_check_in, poop.check_in)
         return poop
         
     except HTTPException:
@@ -112,15 +106,19 @@ def update_poop(*, session: Session = Depends(get_session), poop_id: int, poop_u
         raise HTTPException(status_code=500, detail=f"Failed to update poop record: {str(e)}")
 
 @router.delete('/{poop_id}')
-def delete_poop(*, session: Session = Depends(get_session), poop_id: int):
+def delete_poop(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, poop_id: int):
     """Delete a poop record"""
     try:
         poop = session.get(Poop, poop_id)
         if not poop:
             raise HTTPException(status_code=404, detail=f"Poop ID #{poop_id} not found")
         
+        child_id = poop.child_id
+        check_in = poop.check_in
         session.delete(poop)
         session.commit()
+        publish_child_event(child_id, 'checkin', 'deleted', 'poop', poop_id)
+        background_tasks.add_task(refresh_child_alerts, child_id, check_in)
         return {"message": f"Poop ID #{poop_id} deleted successfully"}
         
     except HTTPException:
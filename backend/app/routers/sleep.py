@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session, select
 from app.db import engine, get_session
 from app.models import Sleep_Time
+from app import queries
+from app.services.event_broker import publish_child_event
+from app.services.alert_refresh import refresh_child_alerts
 from typing import List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -24,23 +27,7 @@ def get_sleep(*, session: Session = Depends(get_session), sleep_id: int):
 def get_sleep_by_child(child_id: int, days: Optional[int] = 30):
     """Get sleep records for a specific child within the last N days"""
     with engine.connect() as conn, conn.begin():
-        sql_text = f"""
-            SELECT
-                s.id,
-                s.child_id,
-                s.check_in,
-                s.start_time,
-                s.end_time,
-                s.note,
-                s.account_id,
-                COALESCE(a.name, 'Unknown') as account_name
-            FROM sleep_time s
-            LEFT JOIN accounts a ON s.account_id = a.id
-            WHERE s.child_id = {child_id} 
-            AND s.check_in >= NOW() - INTERVAL '{days} DAY'
-            ORDER BY s.check_in DESC
-        """
-        sleep_data = pd.read_sql_query(sql_text, parse_dates=['check_in', 'start_time', 'end_time'], con=conn)
+        sleep_data = queries.SLEEP_BY_CHILD.frame(conn, child_id=child_id, days=days)
         
         if sleep_data.empty:
             return []
@@ -70,24 +57,27 @@ def get_latest_sleep(*, session: Session = Depends(get_session), child_id: int):
         raise HTTPException(status_code=500, detail=f"Failed to get sleep data: {str(e)}")
 
 @router.post('/', response_model=Sleep_Time)
-def create_sleep(*, session: Session = Depends(get_session), sleep: Sleep_Time):
+def create_sleep(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, sleep: Sleep_Time):
     """Create a new sleep record"""
     try:
         session.add(sleep)
         session.commit()
         session.refresh(sleep)
+        publish_child_event(sleep.child_id, 'checkin', 'created', 'sleep', sleep.id, sleep)
+        background_tasks.add_task(refresh_child_alerts, sleep.child_id, sleep.check_in)
         return sleep
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create sleep: {str(e)}")
 
 @router.put('/{sleep_id}', response_model=Sleep_Time)
-def update_sleep(*, session: Session = Depends(get_session), sleep_id: int, sleep_update: Sleep_Time):
+def update_sleep(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, sleep_id: int, sleep_update: Sleep_Time):
     """Update an existing sleep record"""
     try:
         sleep = session.get(Sleep_Time, sleep_id)
         if not sleep:
             raise HTTPException(status_code=404, detail=f"Sleep ID #{sleep_id} not found")
+        previous_check_in = sleep.check_in
         
         # Update fields (exactly like meal router)
         sleep.check_in = sleep_update.check_in
@@ -99,6 +89,8 @@ def update_sleep(*, session: Session = Depends(get_session), sleep_id: int, slee
         session.add(sleep)
         session.commit()
         session.refresh(sleep)
+        publish_child_event(sleep.child_id, 'checkin', 'updated', 'sleep', sleep.id, sleep)
+        background_tasks.add_task(refresh_child_alerts, sleep.child_id, previous_check_in, sleep.check_in)
         return sleep
         
     except HTTPException:
@@ -108,15 +100,19 @@ def update_sleep(*, session: Session = Depends(get_session), sleep_id: int, slee
         raise HTTPException(status_code=500, detail=f"Failed to update sleep: {str(e)}")
 
 @router.delete('/{sleep_id}')
-def delete_sleep(*, session: Session = Depends(get_session), sleep_id: int):
+def delete_sleep(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, sleep_id: int):
     """Delete a sleep record"""
     try:
         sleep = session.get(Sleep_Time, sleep_id)
         if not sleep:
             raise HTTPException(status_code=404, detail=f"Sleep ID #{sleep_id} not found")
         
+        child_id = sleep.child_id
+        check_in = sleep.check_in
         session.delete(sleep)
         session.commit()
+        publish_child_event(child_id, 'checkin', 'deleted', 'sleep', sleep_id)
+        background_tasks.add_task(refresh_child_alerts, child_id, check_in)
         return {"message": f"Sleep ID #{sleep_id} deleted successfully"}
         
     except HTTPException:
@@ -130,27 +126,7 @@ def delete_sleep(*, session: Session = Depends(get_session), sleep_id: int):
 def sleep_metrics(child_id: int):
     """Legacy endpoint for sleep metrics"""
     with engine.connect() as conn, conn.begin():
-        sql_text_sleep = f"""
-                            WITH date_range AS
-                            (
-                                SELECT
-                                    MAX(check_in) - INTERVAL '30 DAY' as start_date,
-                                    MAX(check_in) as end_date
-                                FROM sleep_time
-                            )
-
-                            SELECT
-                                child_id,
-                                check_in,
-                                start_time,
-                                end_time
-                            FROM	sleep_time
-                            WHERE	child_id = {child_id} AND 
-                                    (check_in BETWEEN (SELECT start_date FROM date_range) AND
-                                    (SELECT end_date FROM date_range))
-                            ORDER BY	check_in DESC
-                        """
-        sleep = pd.read_sql_query(sql_text_sleep, con=conn)
+        sleep = queries.SLEEP_LEGACY_30_DAYS.frame(conn, child_id=child_id)
         sleep['check_in'] = sleep['check_in'].dt.tz_convert('Asia/Singapore')
         sleep['start_time'] = sleep['start_time'].dt.tz_convert('Asia/Singapore')
         sleep['end_time'] = sleep['end_time'].dt.tz_convert('Asia/Singapore')
@@ -158,9 +134,11 @@ def sleep_metrics(child_id: int):
     return json.loads(sleep.to_json(orient='records'))
 
 @router.post('/sleeptime/', response_model=Sleep_Time)
-def new_sleep(*, session: Session = Depends(get_session), sleep: Sleep_Time):
+def new_sleep(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, sleep: Sleep_Time):
     """Legacy endpoint for creating sleep records"""
     session.add(sleep)
     session.commit()
     session.refresh(sleep)
+    publish_child_event(sleep.child_id, 'checkin', 'created', 'sleep', sleep.id, sleep)
+    background_tasks.add_task(refresh_child_alerts, sleep.child_id, sleep.check_in)
     return sleep
\ No newline at end of file
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session, select
 from app.db import engine, get_session
 from app.models import Symptom
+from app import queries
+from app.services.event_broker import publish_child_event
+from app.services.alert_refresh import refresh_child_alerts
 from typing import List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -24,17 +27,7 @@ def get_symptom(*, session: Session = Depends(get_session), symptom_id: int):
 def get_symptoms_by_child(child_id: int, days: Optional[int] = 30):
     """Get all symptoms for a specific child (last 30 days by default)"""
     with engine.connect() as conn, conn.begin():
-        sql_text_symptom = f"""
-                            SELECT 
-                                s.*,
-                                COALESCE(a.name, 'Unknown') as account_name
-                            FROM symptom s
-                            LEFT JOIN accounts a ON s.account_id = a.id
-                            WHERE s.child_id = {child_id} AND
-                                  s.check_in >= NOW() - INTERVAL '{days} DAY'
-                            ORDER BY s.check_in DESC
-                        """
-        symptoms = pd.read_sql_query(sql_text_symptom, parse_dates=['check_in'], con=conn)
+        symptoms = queries.SYMPTOMS_BY_CHILD.frame(conn, child_id=child_id, days=days)
         
         if symptoms.empty:
             return []
@@ -83,24 +76,27 @@ def get_symptoms_by_type(*, session: Session = Depends(get_session), child_id: i
         raise HTTPException(status_code=500, detail=f"Failed to get symptoms: {str(e)}")
 
 @router.post('/', response_model=Symptom)
-def create_symptom(*, session: Session = Depends(get_session), symptom: Symptom):
+def create_symptom(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, symptom: Symptom):
     """Create a new symptom record"""
     try:
         session.add(symptom)
         session.commit()
         session.refresh(symptom)
+        publish_child_event(symptom.child_id, 'checkin', 'created', 'symptom', symptom.id, symptom)
+        background_tasks.add_task(refresh_child_alerts, symptom.child_id, symptom.check_in)
         return symptom
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create symptom: {str(e)}")
 
 @router.put('/{symptom_id}', response_model=Symptom)
-def update_symptom(*, session: Session = Depends(get_session), symptom_id: int, symptom_update: Symptom):
+def update_symptom(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, symptom_id: int, symptom_update: Symptom):
     """Update an existing symptom record"""
     try:
         symptom = session.get(Symptom, symptom_id)
         if not symptom:
             raise HTTPException(status_code=404, detail=f"Symptom ID #{symptom_id} not found")
+        previous_check_in = symptom.check_in
         
         print(f"🔄 Updating symptom {symptom_id}")
         print(f"📝 Original check_in: {symptom.check_in} (type: {type(symptom.check_in)})")
@@ -135,6 +131,8 @@ def update_symptom(*, session: Session = Depends(get_session), symptom_id: int,
         session.add(symptom)
         session.commit()
         session.refresh(symptom)
+        publish_child_event(symptom.child_id, 'checkin', 'updated', 'symptom', symptom.id, symptom)
+        background_tasks.add_task(refresh_child_alerts, symptom.child_id, previous_check_in, symptom.check_in)
         return symptom
         
     except HTTPException:
@@ -145,15 +143,19 @@ def update_symptom(*, session: Session = Depends(get_session), symptom_id: int,
         raise HTTPException(status_code=500, detail=f"Failed to update symptom: {str(e)}")
 
 @router.delete('/{symptom_id}')
-def delete_symptom(*, session: Session = Depends(get_session), symptom_id: int):
+def delete_symptom(*, session: Session = Depends(get_session), background_tasks: BackgroundTasks, symptom_id: int):
     """Delete a symptom record"""
     try:
         symptom = session.get(Symptom, symptom_id)
         if not symptom:
             raise HTTPException(status_code=404, detail=f"Symptom ID #{symptom_id} not found")
         
+        child_id = symptom.child_id
+        check_in = symptom.check_in
         session.delete(symptom)
         session.commit()
+        publish_child_event(child_id, 'checkin', 'deleted', 'symptom', symptom_id)
+        background_tasks.add_task(refresh_child_alerts, child_id, check_in)
         return {"message": f"Symptom ID #{symptom_id} deleted successfully"}
         
     except HTTPException:
@@ -166,18 +168,7 @@ def delete_symptom(*, session: Session = Depends(get_session), symptom_id: int):
 def get_symptom_summary(child_id: int, days: Optional[int] = 30):
     """Get symptom summary/statistics for a child"""
     with engine.connect() as conn, conn.begin():
-        sql_text_symptom = f"""
-                            SELECT 
-                                symptom,
-                                COUNT(*) as count,
-                                check_in
-                            FROM symptom
-                            WHERE child_id = {child_id} AND
-                                  check_in >= NOW() - INTERVAL '{days} DAY'
-                            GROUP BY symptom, check_in
-                            ORDER BY check_in DESC
-                        """
-        symptoms = pd.read_sql_query(sql_text_symptom, parse_dates=['check_in'], con=conn)
+        symptoms = queries.SYMPTOM_SUMMARY.frame(conn, child_id=child_id, days=days)
         
         if symptoms.empty:
             return {
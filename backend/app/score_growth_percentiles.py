@@ -0,0 +1,124 @@
+"""
+Batch job: score every growth record against the WHO reference tables and
+store z-scores and percentiles in the growth_percentile side table.
+
+Run from the backend directory:
+    python -m app.score_growth_percentiles --workers 4 --chunk-size 5000
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.batch_job import add_worker_arguments, empty_stats, format_timings, run_partitions, timed
+from app.db import engine
+from app.models import Growth_Percentile
+from app.services.growth_reference import get_growth_reference, DAYS_PER_MONTH, METRICS
+
+SCORE_COLUMNS = [f'{metric}_{suffix}' for metric in METRICS for suffix in ('z', 'percentile')]
+STAT_KEYS = ('rows', 'out_of_range', 'chunks', 'read_s', 'score_s', 'write_s')
+
+
+def score_chunk(chunk: pd.DataFrame) -> Tuple[List[Dict], List[int]]:
+    """
+    Vectorized scoring of a chunk of growth rows joined with child birth_date and gender.
+    Returns the score rows and the ids of growth records outside the WHO age range, which get no scores.
+    """
+    ages = (chunk['check_in'] - chunk['birth_date']).dt.total_seconds().to_numpy() / 86400 / DAYS_PER_MONTH
+    ages = np.maximum(ages, 0.0)
+
+    scored = get_growth_reference().score_population(chunk, chunk['gender'], ages)
+    scored['age_months'] = np.round(ages, 2)
+    scored['scored_at'] = datetime.now(timezone.utc)
+
+    out_of_range = scored.loc[~scored['in_reference_range'], 'id'].astype(int).tolist()
+    scored = scored[scored['in_reference_range']]
+    rows = scored[['id', 'child_id', 'age_months', 'scored_at'] + SCORE_COLUMNS].rename(columns={'id': 'growth_id'})
+    # NaN (missing measurement) is stored as NULL
+    rows = rows.astype(object).where(rows.notna(), None)
+    return rows.to_dict(orient='records'), out_of_range
+
+
+def upsert_scores(conn, rows: List[Dict], out_of_range: List[int]):
+    """Write scores with a single INSERT ... ON CONFLICT per chunk and drop stale scores for out-of-range records"""
+    if out_of_range:
+        conn.execute(delete(Growth_Percentile).where(Growth_Percentile.growth_id.in_(out_of_range)))
+    if not rows:
+        return
+    statement = insert(Growth_Percentile).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['growth_id'],
+        set_={column: statement.excluded[column] for column in ['child_id', 'age_months', 'scored_at'] + SCORE_COLUMNS}
+    )
+    conn.execute(statement)
+
+
+def score_partition(id_range: Tuple[int, int], chunk_size: int) -> Dict:
+    """Stream the growth rows in [start, end] in chunks, score them and upsert the results one transaction per chunk"""
+    start, end = id_range
+    stats = empty_stats(STAT_KEYS)
+    sql_text = text("""
+        SELECT g.id, g.child_id, g.check_in, g.weight, g.height, g.head_circumference,
+               c.birth_date, c.gender
+        FROM growth g
+        JOIN child c ON c.id = g.child_id
+        WHERE g.id BETWEEN :start AND :end
+        ORDER BY g.id
+    """)
+
+    # Each chunk is committed on its own, so a long run holds no locks across chunks and
+    # a failure keeps the chunks already written
+    with engine.connect() as read_conn, engine.connect() as write_conn:
+        read_conn = read_conn.execution_options(stream_results=True)
+        chunks = pd.read_sql_query(sql_text, con=read_conn, params={'start': start, 'end': end},
+                                   parse_dates=['check_in', 'birth_date'], chunksize=chunk_size)
+        while True:
+            with timed(stats, 'read_s'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            with timed(stats, 'score_s'):
+                rows, out_of_range = score_chunk(chunk)
+
+            with timed(stats, 'write_s'), write_conn.begin():
+                upsert_scores(write_conn, rows, out_of_range)
+
+            stats['rows'] += len(rows)
+            stats['out_of_range'] += len(out_of_range)
+            stats['chunks'] += 1
+
+    return stats
+
+
+def partition_ids(workers: int) -> List[Tuple[int, int]]:
+    """Split the growth id range into one contiguous range per worker"""
+    with engine.connect() as conn:
+        low, high = conn.execute(text("SELECT MIN(id), MAX(id) FROM growth")).one()
+    if low is None:
+        return []
+    bounds = np.linspace(low, high + 1, num=workers + 1).astype(int)
+    return [(int(bounds[i]), int(bounds[i + 1]) - 1) for i in range(workers) if bounds[i] < bounds[i + 1]]
+
+
+def run(workers: int, chunk_size: int) -> Dict:
+    """Score all growth records, in parallel when workers > 1"""
+    started = time.perf_counter()
+    totals = run_partitions(score_partition, partition_ids(workers), workers, STAT_KEYS, chunk_size)
+    totals['elapsed_s'] = time.perf_counter() - started
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score all growth records against WHO reference tables")
+    add_worker_arguments(parser, chunk_size=5000, chunk_help="Rows read and upserted per chunk")
+    args = parser.parse_args()
+
+    totals = run(args.workers, args.chunk_size)
+    print(f"Scored {totals['rows']} growth records in {totals['chunks']} chunks across {totals['partitions']} partitions")
+    print(f"  skipped {totals['out_of_range']} records outside the WHO age range")
+    print(format_timings(totals, ['read', 'score', 'write']))
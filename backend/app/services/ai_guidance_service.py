@@ -1,31 +1,43 @@
 import os
 import json
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from datetime import datetime
 import aiohttp
-import google.generativeai as genai
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 from app.utils import calculate_age_in_months
+from app.services.article_ranker import ArticleRanker
+from app.services.guidance_corpus import get_guidance_corpus
+from app.services.llm_gateway import get_llm_gateway
+
+# Budget for batched relevance analysis (scraped content is capped at 2000 chars per article)
+ANALYSIS_BATCH_MAX_ITEMS = 8
+ANALYSIS_BATCH_MAX_CHARS = 16000
+# While streaming, how long finished scrapes wait for others to join the same analysis batch
+STREAM_BATCH_WAIT_SECONDS = 1.5
+
+# Candidates kept after local ranking, before any scraping or LLM analysis
+LOCAL_PRUNE_KEEP = 10
+# Share of the final score taken by the LLM relevance score (the rest is the local score)
+LLM_SCORE_WEIGHT = 0.6
 
 class AIGuidanceService:
     def __init__(self):
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         print(f"GEMINI_API_KEY present: {bool(self.gemini_api_key)}")
         
-        if not self.gemini_api_key:
-            print("WARNING: GEMINI_API_KEY not found, AI features will use fallbacks")
-            self.model = None
-        else:
-            try:
-                genai.configure(api_key=self.gemini_api_key)
-                self.model = genai.GenerativeModel('gemini-2.0-flash')
-                print("Gemini AI initialized successfully")
-            except Exception as e:
-                print(f"Error initializing Gemini AI: {e}")
-                self.model = None
+        # Model calls go through the shared LLM gateway (global concurrency cap, coalescing, retries, metrics).
+        # No per-user attribution: one child's pipeline fans out many calls and would queue behind the per-user cap.
+        try:
+            self.llm = get_llm_gateway()
+            print(f"AI guidance using LLM backend: {self.llm.backend.name}")
+        except Exception as e:
+            print(f"WARNING: AI features will use fallbacks ({e})")
+            self.llm = None
+        
+        self.ranker = ArticleRanker()
         
         # Trusted domains for child health content
         self.trusted_domains = [
@@ -46,41 +58,61 @@ class AIGuidanceService:
         ]
     
     async def get_child_specific_articles(self, child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get AI-curated articles specific to a child's context"""
+        """Get AI-curated articles specific to a child's context, falling back to curated/fallback articles"""
         try:
-            print(f"Starting article generation for child: {child_data.get('name', 'Unknown')}, age: {child_data.get('age', 'Unknown')}")
-            
-            # Step 1: Generate search queries based on child context
-            search_queries = await self._generate_search_queries(child_data)
-            print(f"Generated {len(search_queries)} search queries: {search_queries}")
-            
-            # Step 2: Search for articles using AI-powered web search
-            raw_articles = await self._search_articles(search_queries)
-            print(f"Found {len(raw_articles)} raw articles")
-            
-            # Step 3: Scrape and analyze content
-            enriched_articles = await self._enrich_articles(raw_articles, child_data)
-            print(f"Enriched {len(enriched_articles)} articles")
+            final_articles = await self.enrich_child_articles(child_data)
             
-            # Step 4: Score and rank articles by relevance
-            ranked_articles = await self._rank_articles(enriched_articles, child_data)
-            print(f"Ranked {len(ranked_articles)} articles")
-            
-            final_articles = ranked_articles[:10]  # Return top 10 articles
-            
-            # If no articles found, return fallback articles
+            # If no articles found, return curated corpus articles, then fallback articles
+            if not final_articles:
+                print("No AI articles found, returning curated corpus articles")
+                final_articles = get_guidance_corpus().search(child_data)
             if not final_articles:
-                print("No AI articles found, returning fallback articles")
-                final_articles = self._get_fallback_articles(child_data)
+                print("No corpus articles found, returning fallback articles")
+                final_articles = self.get_fallback_articles(child_data)
             
             print(f"Returning {len(final_articles)} articles")
-            print(final_articles)
             return final_articles
             
         except Exception as e:
             print(f"Error in get_child_specific_articles: {str(e)}")
             print("Returning fallback articles due to error")
-            return self._get_fallback_articles(child_data)
+            return self.get_fallback_articles(child_data)
+    
+    async def enrich_child_articles(self, child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Run the full search, scrape, analyze and rank pipeline and return the top 10 enriched articles.
+        Raises on failure and returns an empty list when nothing was found (no fallbacks).
+        """
+        print(f"Starting article generation for child: {child_data.get('name', 'Unknown')}, age: {child_data.get('age', 'Unknown')}")
+        
+        # Step 1: Generate search queries based on child context
+        search_queries = await self._generate_search_queries(child_data)
+        print(f"Generated {len(search_queries)} search queries: {search_queries}")
+        
+        # Step 2: Search for articles using AI-powered web search
+        raw_articles = await self._search_articles(search_queries)
+        print(f"Found {len(raw_articles)} raw articles")
+        
+        # Curated articles from the local corpus are always candidates
+        seen_urls = {article.get('url', '') for article in raw_articles}
+        for article in get_guidance_corpus().search(child_data):
+            if article['url'] not in seen_urls:
+                raw_articles.append(article)
+        print(f"{len(raw_articles)} candidate articles including curated corpus")
+        
+        # Prune candidates locally so only the most promising get scraped and analyzed
+        raw_articles = self.ranker.rank(raw_articles, child_data, limit=LOCAL_PRUNE_KEEP)
+        print(f"Kept {len(raw_articles)} articles after local ranking")
+        
+        # Step 3: Scrape and analyze content
+        enriched_articles = await self._enrich_articles(raw_articles, child_data)
+        print(f"Enriched {len(enriched_articles)} articles")
+        
+        # Step 4: Score and rank articles by relevance
+        ranked_articles = await self._rank_articles(enriched_articles, child_data)
+        print(f"Ranked {len(ranked_articles)} articles")
+        
+        return ranked_articles[:10]  # Return top 10 articles
     
     async def _generate_search_queries(self, child_data: Dict[str, Any]) -> List[str]:
         """Use AI to generate targeted search queries based on child context"""
@@ -106,13 +138,13 @@ class AIGuidanceService:
         """
         
         # Check if AI model is available
-        if not self.model:
+        if not self.llm:
             print("AI model not available, using fallback queries")
             return self._fallback_queries(age, age_months)
         
         try:
             prompt = f"{context}\n\nGenerate 5 search queries as a JSON array of strings:"
-            response = self.model.generate_content(prompt)
+            response = await self.llm.agenerate(prompt, caller='guidance')
             
             # Extract JSON from response
             queries_text = response.text.strip()
@@ -206,12 +238,12 @@ class AIGuidanceService:
         """
         
         # Check if AI model is available
-        if not self.model:
+        if not self.llm:
             print("AI model not available, skipping web search")
             return []
         
         try:
-            response = self.model.generate_content(search_prompt)
+            response = await self.llm.agenerate(search_prompt, caller='guidance')
             results_text = response.text.strip()
             
             if results_text.startswith('```json'):
@@ -229,7 +261,9 @@ class AIGuidanceService:
     async def _enrich_articles(self, articles: List[Dict[str, Any]], child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Scrape article content and use AI to analyze relevance"""
         enriched = []
+        scraped = []
         
+        # Step 1: Scrape every article, keeping the ones with content for batched analysis
         for i, article in enumerate(articles):
             print(f"Enriching article {i+1}/{len(articles)}: {article.get('title', 'Unknown')}")
             print(f"URL: {article.get('url', 'No URL')}")
@@ -240,30 +274,11 @@ class AIGuidanceService:
                 print(f"Scraped content length: {len(content) if content else 0}")
                 
                 if content:
-                    # Use AI to analyze and summarize content
-                    analysis = await self._analyze_article_content(content, child_data)
-                    print(f"Analysis relevance score: {analysis.get('relevance_score', 0)}")
-                    
-                    article.update({
-                        'content_snippet': content[:500] + '...',
-                        'ai_summary': analysis.get('summary', ''),
-                        'relevance_score': analysis.get('relevance_score', 0),
-                        'key_topics': analysis.get('key_topics', []),
-                        'age_appropriate': analysis.get('age_appropriate', True)
-                    })
-                    
-                    enriched.append(article)
-                    print(f"Successfully enriched article: {article.get('title')}")
+                    scraped.append((article, content))
                 else:
                     print(f"Failed to scrape content for: {article.get('url')}")
                     # Still add the article but with basic analysis
-                    article.update({
-                        'content_snippet': article.get('description', 'No content available'),
-                        'ai_summary': f"Article about {article.get('title', 'child development')}",
-                        'relevance_score': 60,  # Give it a decent score since it matched our search
-                        'key_topics': ['parenting', 'child development'],
-                        'age_appropriate': True
-                    })
+                    self._apply_unscraped_analysis(article)
                     enriched.append(article)
                     print(f"Added article without scraping: {article.get('title')}")
                     
@@ -284,9 +299,97 @@ class AIGuidanceService:
                     print(f"Failed to add article even with fallback: {article}")
                     continue
         
+        # Step 2: Analyze all scraped content with as few LLM calls as possible
+        if scraped:
+            analyses = await self._analyze_articles_batch([content for _, content in scraped], child_data)
+            
+            for (article, content), analysis in zip(scraped, analyses):
+                print(f"Analysis relevance score: {analysis.get('relevance_score', 0)}")
+                self._apply_analysis(article, content, analysis)
+                enriched.append(article)
+                print(f"Successfully enriched article: {article.get('title')}")
+        
         print(f"Enrichment complete: {len(enriched)}/{len(articles)} articles enriched")
         return enriched
     
+    def _apply_analysis(self, article: Dict[str, Any], content: str, analysis: Dict[str, Any]):
+        """Attach scraped content and AI analysis to an article"""
+        article.update({
+            'content_snippet': content[:500] + '...',
+            'ai_summary': analysis.get('summary', ''),
+            'relevance_score': analysis.get('relevance_score', 0),
+            'key_topics': analysis.get('key_topics', []),
+            'age_appropriate': analysis.get('age_appropriate', True)
+        })
+    
+    def _apply_unscraped_analysis(self, article: Dict[str, Any]):
+        """Attach basic analysis to an article whose content could not be scraped"""
+        article.update({
+            'content_snippet': article.get('description', 'No content available'),
+            'ai_summary': article.get('ai_summary') or f"Article about {article.get('title', 'child development')}",
+            'relevance_score': article.get('relevance_score') or 60,  # Give it a decent score since it matched our search
+            'key_topics': article.get('key_topics') or ['parenting', 'child development'],
+            'age_appropriate': True
+        })
+    
+    async def stream_child_specific_articles(self, child_data: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the current top articles after each analysis batch: finished scrapes are collected
+        up to ANALYSIS_BATCH_MAX_ITEMS or STREAM_BATCH_WAIT_SECONDS, then analysed in one LLM call
+        """
+        search_queries = await self._generate_search_queries(child_data)
+        raw_articles = await self._search_articles(search_queries)
+        
+        seen_urls = {article.get('url', '') for article in raw_articles}
+        for article in get_guidance_corpus().search(child_data):
+            if article['url'] not in seen_urls:
+                raw_articles.append(article)
+        raw_articles = self.ranker.rank(raw_articles, child_data, limit=LOCAL_PRUNE_KEEP)
+        
+        # Scrape concurrently and enrich finished scrapes batch by batch
+        tasks = {
+            asyncio.create_task(self._scrape_article_content(article['url'])): article
+            for article in raw_articles if article.get('url')
+        }
+        pending = set(tasks)
+        enriched = []
+        
+        # Closing the generator (e.g. the SSE client went away) cancels scrapes still in flight
+        try:
+            loop = asyncio.get_running_loop()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                deadline = loop.time() + STREAM_BATCH_WAIT_SECONDS
+                while pending and len(done) < ANALYSIS_BATCH_MAX_ITEMS:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    more, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                    done |= more
+                
+                scraped = []
+                for task in done:
+                    article = tasks[task]
+                    content = None if task.exception() else task.result()
+                    if content:
+                        scraped.append((article, content))
+                    else:
+                        self._apply_unscraped_analysis(article)
+                        enriched.append(article)
+                
+                if scraped:
+                    analyses = await self._analyze_articles_batch([content for _, content in scraped], child_data)
+                    for (article, content), analysis in zip(scraped, analyses):
+                        self._apply_analysis(article, content, analysis)
+                        enriched.append(article)
+                
+                ranked = await self._rank_articles(enriched, child_data)
+                yield ranked[:10]
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
     async def _scrape_article_content(self, url: str) -> Optional[str]:
         """Scrape article content from URL"""
         try:
@@ -333,7 +436,7 @@ class AIGuidanceService:
         """
         
         # Check if AI model is available
-        if not self.model:
+        if not self.llm:
             return {
                 'summary': 'AI analysis unavailable - using fallback',
                 'relevance_score': 75,
@@ -342,7 +445,7 @@ class AIGuidanceService:
             }
         
         try:
-            response = self.model.generate_content(analysis_prompt)
+            response = await self.llm.agenerate(analysis_prompt, caller='guidance')
             analysis_text = response.text.strip()
             
             if analysis_text.startswith('```json'):
@@ -362,10 +465,124 @@ class AIGuidanceService:
                 'age_appropriate': True
             }
     
+    def _chunk_contents(self, contents: List[str]) -> List[List[int]]:
+        """Group content indexes into chunks that fit the batch prompt budget"""
+        chunks = []
+        current = []
+        current_chars = 0
+        
+        for i, content in enumerate(contents):
+            content_chars = len(content)
+            if current and (len(current) >= ANALYSIS_BATCH_MAX_ITEMS or
+                            current_chars + content_chars > ANALYSIS_BATCH_MAX_CHARS):
+                chunks.append(current)
+                current = []
+                current_chars = 0
+            current.append(i)
+            current_chars += content_chars
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _validate_analysis(self, item: Any) -> Optional[Dict[str, Any]]:
+        """Validate a single analysis object from a batched response"""
+        if not isinstance(item, dict):
+            return None
+        
+        summary = item.get('summary')
+        score = item.get('relevance_score')
+        topics = item.get('key_topics', [])
+        age_appropriate = item.get('age_appropriate', True)
+        
+        if not isinstance(summary, str) or isinstance(score, bool) or not isinstance(score, (int, float)):
+            return None
+        if not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics):
+            return None
+        if not isinstance(age_appropriate, bool):
+            return None
+        
+        return {
+            'summary': summary,
+            'relevance_score': max(0, min(100, score)),
+            'key_topics': topics,
+            'age_appropriate': age_appropriate
+        }
+    
+    async def _analyze_articles_batch(self, contents: List[str], child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Use AI to analyze many articles per prompt, falling back to single calls only for items that fail to parse"""
+        # Without a model the single-item path already returns the fallback analysis
+        if not self.llm:
+            return [await self._analyze_article_content(content, child_data) for content in contents]
+        
+        age = child_data.get('age', '')
+        analyses: List[Optional[Dict[str, Any]]] = [None] * len(contents)
+        
+        for chunk in self._chunk_contents(contents):
+            articles_text = "\n\n".join(
+                f"Article {position}:\n{contents[i]}" for position, i in enumerate(chunk)
+            )
+            
+            batch_prompt = f"""
+        Analyze each of the following {len(chunk)} articles for relevance to a child aged {age}:
+        
+        {articles_text}
+        
+        Return a JSON array with exactly one object per article, in the same order, using this format:
+        [
+            {{
+                "index": 0,
+                "summary": "Brief 2-3 sentence summary of the article",
+                "relevance_score": 0-100 (how relevant is this to a {age} old child),
+                "key_topics": ["topic1", "topic2", "topic3"],
+                "age_appropriate": true/false
+            }}
+        ]
+        """
+            
+            try:
+                response = await self.llm.agenerate(batch_prompt, caller='guidance')
+                results_text = response.text.strip()
+                
+                if results_text.startswith('```json'):
+                    results_text = results_text[7:-3]
+                elif results_text.startswith('```'):
+                    results_text = results_text[3:-3]
+                
+                results = json.loads(results_text)
+                if not isinstance(results, list):
+                    results = []
+            except Exception as e:
+                print(f"Error analyzing batch of {len(chunk)} articles: {str(e)}")
+                results = []
+            
+            # Match results back by index, falling back to position order
+            for position, item in enumerate(results):
+                index = item.get('index', position) if isinstance(item, dict) else position
+                if isinstance(index, int) and 0 <= index < len(chunk) and analyses[chunk[index]] is None:
+                    analyses[chunk[index]] = self._validate_analysis(item)
+        
+        # Only items that could not be parsed from a batch get their own call
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if missing:
+            print(f"Falling back to single-item analysis for {len(missing)}/{len(contents)} articles")
+        for i in missing:
+            analyses[i] = await self._analyze_article_content(contents[i], child_data)
+        
+        return analyses
+    
     async def _rank_articles(self, articles: List[Dict[str, Any]], child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Rank articles by relevance score and other factors"""
-        # Sort by relevance score (descending)
-        ranked = sorted(articles, key=lambda x: x.get('relevance_score', 0), reverse=True)
+        # Re-score locally against the enriched text (summary and topics)
+        self.ranker.rank(articles, child_data)
+        
+        # Blend the LLM relevance score with the local score so ranking stays stable between runs
+        for article in articles:
+            article['final_score'] = round(
+                LLM_SCORE_WEIGHT * article.get('relevance_score', 0) +
+                (1 - LLM_SCORE_WEIGHT) * 100 * article.get('local_score', 0), 2
+            )
+        ranked = sorted(articles, key=lambda x: x.get('final_score', 0), reverse=True)
         
         # Filter out low-relevance articles (lowered threshold)
         relevant_articles = [article for article in ranked if article.get('relevance_score', 0) > 20]
@@ -373,7 +590,7 @@ class AIGuidanceService:
         
         return relevant_articles
     
-    def _get_fallback_articles(self, child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def get_fallback_articles(self, child_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Return fallback articles when AI service fails"""
         age = child_data.get('age', 'young child')
         age_months = child_data.get('age_months', 12)
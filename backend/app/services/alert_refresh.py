@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+from app.db import engine
+from app.services.event_broker import publish_child_event
+from app.services.health_alert_engine import run_for_children, ALERT_WINDOW_DAYS
+from app.services.sleep_timeline import SLEEP_TIMEZONE
+
+
+def refresh_child_alerts(child_id: int, *check_ins: Optional[datetime]):
+    """
+    Re-run the alert rules for a child after a check-in write (run as a background task).
+    Every analysis day from the earliest check-in up to today whose window includes it is refreshed;
+    older days are left to the evaluate_health_alerts batch job.
+    """
+    today = pd.Timestamp.now(tz=SLEEP_TIMEZONE).date()
+    first_day = today - timedelta(days=ALERT_WINDOW_DAYS - 1)
+    times = [time for time in check_ins if time is not None]
+    if times:
+        earliest = min(pd.to_datetime(time, utc=True) for time in times)
+        first_day = max(first_day, earliest.tz_convert(SLEEP_TIMEZONE).date())
+    days = pd.date_range(first_day, today, freq='D').date
+
+    alerts: List[Dict[str, Any]] = []
+    removed: List[Dict[str, Any]] = []
+    try:
+        with engine.begin() as conn:
+            for day in days:
+                written, stale = run_for_children(conn, [child_id], day)
+                alerts += written
+                removed += stale
+    except Exception as e:
+        print(f"Failed to refresh alerts for child {child_id}: {str(e)}")
+        return
+
+    for alert in alerts:
+        publish_child_event(child_id, 'alert', 'upserted', alert['alert_type'],
+                            data={key: value for key, value in alert.items() if key != 'issue'})
+    for alert in removed:
+        publish_child_event(child_id, 'alert', 'deleted', alert['alert_type'], alert['id'])
@@ -0,0 +1,145 @@
+import re
+import zlib
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Size of the hashed embedding space and weight of each signal in the final score
+EMBEDDING_DIM = 512
+BM25_WEIGHT = 0.6
+EMBEDDING_WEIGHT = 0.4
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'what', 'when', 'with', 'your', 'you'
+}
+
+# Query terms describing each developmental stage
+STAGE_TERMS = {
+    'newborn': ['newborn', 'infant', 'baby', 'feeding', 'sleep', 'safe sleep'],
+    'infant': ['infant', 'baby', 'milestones', 'feeding', 'solid foods', 'sleep'],
+    'toddler_early': ['toddler', 'milestones', 'walking', 'words', 'nutrition'],
+    'toddler_late': ['toddler', 'speech', 'language', 'behavior', 'potty training'],
+    'preschooler': ['preschool', 'child', 'development', 'learning', 'social skills'],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+def developmental_stage(age_months: int) -> str:
+    """Developmental stage for an age (mirrors ChildProfileService.get_developmental_stage)"""
+    if age_months < 3:
+        return "newborn"
+    elif age_months < 12:
+        return "infant"
+    elif age_months < 24:
+        return "toddler_early"
+    elif age_months < 36:
+        return "toddler_late"
+    else:
+        return "preschooler"
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    """Searchable text of an article, title weighted twice"""
+    parts = [
+        article.get('title', ''),
+        article.get('title', ''),
+        article.get('description', ''),
+        article.get('ai_summary', ''),
+        ' '.join(article.get('key_topics', []) or []),
+        ' '.join(article.get('tags', []) or []),
+    ]
+    return ' '.join(part for part in parts if part)
+
+
+def hash_embeddings(texts: List[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """L2-normalized feature-hashed embeddings over word unigrams, bigrams and character trigrams"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        if not features:
+            continue
+        indexes = np.fromiter((zlib.crc32(feature.encode()) % dim for feature in features), dtype=np.int64)
+        np.add.at(matrix[row], indexes, 1.0)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def bm25_scores(doc_tokens: List[List[str]], query_tokens: List[str]) -> np.ndarray:
+    """BM25 score of every document against the query, computed as one matrix operation"""
+    query_terms = sorted(set(query_tokens))
+    if not doc_tokens or not query_terms:
+        return np.zeros(len(doc_tokens), dtype=np.float64)
+
+    term_index = {term: i for i, term in enumerate(query_terms)}
+    tf = np.zeros((len(doc_tokens), len(query_terms)), dtype=np.float64)
+    for row, tokens in enumerate(doc_tokens):
+        for token in tokens:
+            col = term_index.get(token)
+            if col is not None:
+                tf[row, col] += 1
+
+    doc_lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=np.float64)
+    avg_length = doc_lengths.mean() if doc_lengths.mean() > 0 else 1.0
+
+    doc_freq = (tf > 0).sum(axis=0)
+    n_docs = len(doc_tokens)
+    idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length)
+    term_scores = tf * (BM25_K1 + 1) / (tf + length_norm[:, None])
+    return term_scores @ idf
+
+
+class ArticleRanker:
+    """Local lexical + semantic ranking of guidance articles against a child's profile"""
+
+    def build_query(self, child_data: Dict[str, Any]) -> str:
+        """Query text from the child's age, developmental stage and recent symptoms"""
+        age_months = child_data.get('age_months', 0) or 0
+        parts = [child_data.get('age', ''), f"{age_months} months"]
+        parts.extend(STAGE_TERMS.get(developmental_stage(age_months), []))
+        parts.extend(child_data.get('recent_symptoms', []) or [])
+        return ' '.join(part for part in parts if part)
+
+    def score(self, articles: List[Dict[str, Any]], child_data: Dict[str, Any]) -> np.ndarray:
+        """Combined local score in [0, 1] for each article"""
+        if not articles:
+            return np.zeros(0, dtype=np.float64)
+
+        query = self.build_query(child_data)
+        texts = [article_text(article) for article in articles]
+
+        bm25 = bm25_scores([tokenize(text) for text in texts], tokenize(query))
+        bm25_max = bm25.max()
+        bm25_norm = bm25 / bm25_max if bm25_max > 0 else bm25
+
+        embeddings = hash_embeddings(texts + [query])
+        cosine = np.clip(embeddings[:-1] @ embeddings[-1], 0.0, 1.0)
+
+        return BM25_WEIGHT * bm25_norm + EMBEDDING_WEIGHT * cosine
+
+    def rank(self, articles: List[Dict[str, Any]], child_data: Dict[str, Any],
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Annotate articles with `local_score` and return them best first, optionally pruned to `limit`"""
+        scores = self.score(articles, child_data)
+        for article, score in zip(articles, scores):
+            article['local_score'] = round(float(score), 4)
+
+        # Stable sort keeps the original order for ties
+        order = np.argsort(-scores, kind='stable')
+        ranked = [articles[i] for i in order]
+        return ranked[:limit] if limit is not None else ranked
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+from uuid import UUID, uuid4
+from sqlalchemy import insert, update
+
+from app.db import engine
+from app.models import ChatbotChat, ChatMessage
+
+# Stored when a stream ends before producing any text
+EMPTY_REPLY = "(No response)"
+
+
+def append_message(chat_id: UUID, sender: str, text: str) -> Dict[str, Any]:
+    """
+    Store one chat turn and bump the chat's updated_at in the same transaction.
+    Raises LookupError when the chat does not exist.
+    """
+    now = datetime.now(timezone.utc)
+    message = {"id": uuid4(), "chat_id": chat_id, "message": text, "sender": sender, "created_at": now}
+    with engine.begin() as conn:
+        bumped = conn.execute(update(ChatbotChat).where(ChatbotChat.id == chat_id).values(updated_at=now))
+        if bumped.rowcount == 0:
+            raise LookupError(f"Chat {chat_id} not found")
+        conn.execute(insert(ChatMessage).values(**message))
+    return message
+
+
+def persist_reply(events: Iterable[Dict[str, Any]], chat_id: Optional[UUID]) -> Iterator[Dict[str, Any]]:
+    """
+    Pass streamed generation events through and store the assembled reply with a single insert.
+    The reply is saved when the 'done' event arrives (its id is added to that event), or with
+    whatever was generated if the stream fails or the client goes away first. Only 'delta' text is
+    stored: a failed generation with no output saves nothing.
+    """
+    if chat_id is None:
+        yield from events
+        return
+
+    parts = []
+    saved = False
+    failed = False
+    try:
+        for event in events:
+            if event.get("event") == "delta":
+                parts.append(event["content"])
+            elif event.get("event") == "error":
+                failed = True
+            elif event.get("event") == "done" and not saved:
+                saved = True
+                if not failed or any(parts):
+                    reply = append_message(chat_id, "ai", "".join(parts) or EMPTY_REPLY)
+                    event = {**event, "message_id": str(reply["id"])}
+            yield event
+    finally:
+        if not saved and any(parts):
+            try:
+                append_message(chat_id, "ai", "".join(parts))
+            except Exception as e:
+                print(f"Failed to save partial reply for chat {chat_id}: {str(e)}")
@@ -35,7 +35,7 @@ class ChildContextAggregator:
         # Add benchmark comparison if we have growth data
         if context["growth"]["status"] == "available":
             context["growth"]["benchmark"] = self.growth_service.compare_with_benchmark(
-                child_id, profile["age_months"]
+                child_id, profile["age_months"], profile["gender"]
             )
         
         return context
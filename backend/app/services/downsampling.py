@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    `y` may be 1-D or 2-D (points x series); with several series each one is
+    scaled to [0, 1] and triangle areas are summed, so one shared set of points
+    preserves the shape of every series plotted against the same x axis.
+    """
+    n = len(x)
+    if max_points <= 0 or max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        # Not enough room for a bucket; keep the end points
+        return np.array([0, n - 1][:max_points], dtype=np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+
+    # Scale every series (and x) to [0, 1] so no unit dominates the area
+    span = np.ptp(y, axis=0)
+    y = (y - y.min(axis=0)) / np.where(span > 0, span, 1.0)
+    x_span = np.ptp(x)
+    x = (x - x.min()) / (x_span if x_span > 0 else 1.0)
+
+    # First and last points are always kept; the rest is split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean(axis=0)
+
+        # Area of the triangle (previous selected point, candidate, next bucket average) for every candidate
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end, None]) * (next_y - y[previous])
+        ).sum(axis=1)
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+from fastapi.encoders import jsonable_encoder
+
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 256
+
+RESYNC_EVENT = {"type": "resync"}
+
+
+def child_topic(child_id: int) -> str:
+    return f"child:{child_id}"
+
+
+class Subscription:
+    """One listener's queue of events for a set of topics, bound to the event loop it was created on"""
+
+    def __init__(self, topics: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event: Dict[str, Any]):
+        """Queue an event; must run on the subscription's loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client gets one resync marker and refetches, rather than an unbounded backlog
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self) -> Dict[str, Any]:
+        event = await self.queue.get()
+        if event is RESYNC_EVENT:
+            self.overflowed = False
+        return event
+
+
+class EventBroker(ABC):
+    """Fan-out of events to subscribers by topic; replace with a shared backend when running several processes"""
+
+    @abstractmethod
+    def publish(self, topic: str, event: Dict[str, Any]):
+        """Send an event to every current subscriber of a topic; safe to call from any thread"""
+
+    @abstractmethod
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Start receiving events for the given topics; call from the event loop that will read them"""
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        """Stop delivering events to a subscription"""
+
+
+class InProcessBroker(EventBroker):
+    """Broker for a single API process: subscribers are asyncio queues, publishers may be sync endpoints"""
+
+    def __init__(self):
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str, event: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is going away
+                self.unsubscribe(subscription)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics, asyncio.get_running_loop())
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+
+# Shared across requests (singleton pattern)
+_event_broker: EventBroker = InProcessBroker()
+
+
+def get_event_broker() -> EventBroker:
+    return _event_broker
+
+
+def set_event_broker(broker: EventBroker):
+    """Swap the broker implementation (e.g. one backed by Postgres LISTEN/NOTIFY or Redis)"""
+    global _event_broker
+    _event_broker = broker
+
+
+def publish_child_event(child_id: Optional[int], event_type: str, action: str, kind: str,
+                        record_id: Any = None, data: Any = None):
+    """Publish a change to everyone following a child; never fails the request that triggered it"""
+    if child_id is None:
+        return
+    event = {
+        "type": event_type,  # 'checkin' or 'alert'
+        "kind": kind,  # e.g. 'meal', 'sleep', or the alert type
+        "action": action,  # 'created', 'updated', 'deleted', 'read'
+        "child_id": child_id,
+        "id": record_id,
+        "data": data,
+        "at": datetime.now(timezone.utc),
+    }
+    try:
+        get_event_broker().publish(child_topic(child_id), jsonable_encoder(event))
+    except Exception as e:
+        print(f"Failed to publish {event_type} event for child {child_id}: {str(e)}")
@@ -0,0 +1,93 @@
+from typing import Dict, List, Any
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# z-scores of the major percentile lines on WHO charts (3rd, 10th, 25th, 50th, 75th, 90th, 97th)
+PERCENTILE_LINES = np.array([3, 10, 25, 50, 75, 90, 97])
+PERCENTILE_LINE_Z = np.array([-1.8808, -1.2816, -0.6745, 0.0, 0.6745, 1.2816, 1.8808])
+
+# Dropping across this many major lines from the child's highest channel is worth a review
+CHANNEL_DROP_ALERT = 2
+
+
+def least_squares_slope(t: np.ndarray, values: np.ndarray) -> float:
+    """Slope of the least-squares line through all points (units per month)"""
+    if len(t) < 2:
+        return float('nan')
+    t_centered = t - t.mean()
+    denominator = np.dot(t_centered, t_centered)
+    if denominator == 0:
+        return float('nan')
+    return float(np.dot(t_centered, values - values.mean()) / denominator)
+
+
+def sliding_slopes(t: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """Least-squares slope over each window of `window` consecutive points, aligned to the window's last point"""
+    slopes = np.full(len(t), np.nan)
+    if window < 2 or len(t) < window:
+        return slopes
+
+    t_windows = sliding_window_view(t, window)
+    v_windows = sliding_window_view(values, window)
+    t_centered = t_windows - t_windows.mean(axis=1, keepdims=True)
+    v_centered = v_windows - v_windows.mean(axis=1, keepdims=True)
+    denominator = (t_centered * t_centered).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes[window - 1:] = np.where(denominator > 0, (t_centered * v_centered).sum(axis=1) / denominator, np.nan)
+    return slopes
+
+
+def percentile_band(channel: int) -> str:
+    """Readable band between major percentile lines for a channel index"""
+    if channel == 0:
+        return f"<{PERCENTILE_LINES[0]}th"
+    if channel == len(PERCENTILE_LINES):
+        return f">{PERCENTILE_LINES[-1]}th"
+    return f"{PERCENTILE_LINES[channel - 1]}th-{PERCENTILE_LINES[channel]}th"
+
+
+def percentile_crossings(dates: List[str], z: np.ndarray) -> Dict[str, Any]:
+    """Major percentile lines crossed between consecutive measurements, in one vectorized pass"""
+    valid = ~np.isnan(z)
+    z = z[valid]
+    dates = [date for date, keep in zip(dates, valid) if keep]
+    if len(z) < 2:
+        return {"crossings": [], "channels_dropped_from_peak": 0, "alert": False}
+
+    channels = np.searchsorted(PERCENTILE_LINE_Z, z)
+    steps = np.diff(channels)
+    changed = np.flatnonzero(steps)
+
+    crossings = [
+        {
+            "date": dates[i + 1],
+            "from_band": percentile_band(int(channels[i])),
+            "to_band": percentile_band(int(channels[i + 1])),
+            "lines_crossed": int(abs(steps[i])),
+            "direction": "up" if steps[i] > 0 else "down"
+        }
+        for i in changed
+    ]
+
+    drop_from_peak = np.maximum.accumulate(channels) - channels
+    return {
+        "crossings": crossings,
+        "channels_dropped_from_peak": int(drop_from_peak[-1]),
+        "alert": bool(drop_from_peak[-1] >= CHANNEL_DROP_ALERT)
+    }
+
+
+def metric_velocity(dates: List[str], ages: np.ndarray, values: np.ndarray, z: np.ndarray, window: int) -> Dict[str, Any]:
+    """Overall and windowed velocity plus percentile crossings for one metric"""
+    valid = ~np.isnan(values)
+    t, v = ages[valid], values[valid]
+    windowed = sliding_slopes(t, v, window)
+
+    overall = least_squares_slope(t, v)
+    return {
+        "velocity_per_month": None if np.isnan(overall) else round(overall, 3),
+        "dates": [date for date, keep in zip(dates, valid) if keep],
+        "values": v.tolist(),
+        "windowed_velocity_per_month": [None if np.isnan(s) else round(float(s), 3) for s in windowed],
+        **percentile_crossings(dates, z)
+    }
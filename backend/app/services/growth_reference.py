@@ -0,0 +1,255 @@
+import os
+import json
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+WHO_LMS_PATH = os.path.join(os.path.dirname(__file__), 'who_lms_reference.json')
+
+METRICS = ('weight', 'height', 'head_circumference')
+SEXES = ('male', 'female')
+
+# Average days per month, used for fractional ages
+DAYS_PER_MONTH = 30.4375
+
+# Months covered by the precomputed (sex, month) benchmark grid (the WHO tables end at 60 months)
+GRID_MAX_MONTH = 60
+
+# Seconds between checks of growth_benchmark for edits; a changed table is reloaded at the next check
+GROWTH_REFERENCE_TTL_SECONDS = float(os.getenv('GROWTH_REFERENCE_TTL_SECONDS', '300'))
+
+
+def normalize_sex(gender) -> str:
+    """Map a child's gender to the reference table sex (same rule as the old benchmark helpers)"""
+    return 'male' if str(gender).strip().lower() in ('male', 'm', 'boy') else 'female'
+
+
+def normal_cdf(z: np.ndarray) -> np.ndarray:
+    """Standard normal CDF via the Abramowitz-Stegun erf approximation (max error 1.5e-7)"""
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def age_in_months(birth_date, check_ins: pd.Series) -> np.ndarray:
+    """Fractional age in months at each check-in"""
+    birth = pd.Timestamp(birth_date)
+    if birth.tzinfo is None and check_ins.dt.tz is not None:
+        birth = birth.tz_localize('UTC')
+    elif birth.tzinfo is not None and check_ins.dt.tz is None:
+        birth = birth.tz_convert(None)
+    days = (check_ins - birth).dt.total_seconds().to_numpy() / 86400
+    return np.maximum(days / DAYS_PER_MONTH, 0.0)
+
+
+def interp_in_range(ages: np.ndarray, table_ages: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """np.interp that gives NaN outside the table instead of clamping to the edge values"""
+    return np.interp(ages, table_ages, values, left=np.nan, right=np.nan)
+
+
+def whole_months(birth_date, check_ins: pd.Series) -> np.ndarray:
+    """Calendar month difference at each check-in (matches the previous per-row calculation)"""
+    birth = pd.Timestamp(birth_date)
+    return ((check_ins.dt.year - birth.year) * 12 + (check_ins.dt.month - birth.month)).to_numpy()
+
+
+class GrowthReference:
+    """Growth reference tables held as NumPy arrays per sex and metric"""
+
+    def __init__(self, lms: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+                 medians: Optional[Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]] = None,
+                 version: Optional[str] = None):
+        # (sex, metric) -> (ages, L, M, S)
+        self.lms = lms
+        # (sex, metric) -> (ages, median) from Growth_Benchmark; WHO M is used where missing
+        self.medians = medians or {}
+        self.version = version
+        # Ages (months) covered by the WHO tables; z-scores and medians are NaN outside it
+        table_ages = next(iter(lms.values()))[0]
+        self.age_range = (float(table_ages[0]), float(table_ages[-1]))
+
+        # Immutable grid [sex, metric, month] of interpolated medians for O(1) whole-month lookups
+        months = np.arange(GRID_MAX_MONTH + 1, dtype=np.float64)
+        self.benchmark_grid = np.array([
+            [self.median(sex, metric, months) for metric in METRICS] for sex in SEXES
+        ])
+        self.benchmark_grid.flags.writeable = False
+
+    @classmethod
+    def load(cls, conn=None, lms_path: str = WHO_LMS_PATH, version: Optional[str] = None) -> 'GrowthReference':
+        """Load WHO LMS parameters and, when a connection is given, the Growth_Benchmark table"""
+        with open(lms_path, 'r') as f:
+            data = json.load(f)
+
+        ages = np.array(data['age_months'], dtype=np.float64)
+        lms = {}
+        for sex in SEXES:
+            for metric in METRICS:
+                table = data[sex][metric]
+                lms[(sex, metric)] = (
+                    ages,
+                    np.array(table['L'], dtype=np.float64),
+                    np.array(table['M'], dtype=np.float64),
+                    np.array(table['S'], dtype=np.float64),
+                )
+
+        medians = {}
+        if conn is not None:
+            benchmarks = pd.read_sql_query(
+                "SELECT age_month, weight, height, head_circumference, gender FROM growth_benchmark",
+                con=conn
+            )
+            medians = cls.medians_from_frame(benchmarks)
+
+        return cls(lms, medians, version)
+
+    @staticmethod
+    def medians_from_frame(benchmarks: pd.DataFrame) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        """Sorted (age, median) arrays per sex and metric from Growth_Benchmark rows"""
+        medians = {}
+        if benchmarks.empty:
+            return medians
+
+        benchmarks = benchmarks.assign(sex=benchmarks['gender'].map(normalize_sex))
+        for sex, rows in benchmarks.groupby('sex'):
+            rows = rows.groupby('age_month', as_index=False)[list(METRICS)].mean().sort_values('age_month')
+            for metric in METRICS:
+                medians[(sex, metric)] = (
+                    rows['age_month'].to_numpy(dtype=np.float64),
+                    rows[metric].to_numpy(dtype=np.float64),
+                )
+        return medians
+
+    def in_range(self, ages) -> np.ndarray:
+        """True where an age is covered by the WHO tables"""
+        ages = np.asarray(ages, dtype=np.float64)
+        return (ages >= self.age_range[0]) & (ages <= self.age_range[1])
+
+    def median(self, sex: str, metric: str, ages) -> np.ndarray:
+        """Interpolated benchmark median for each age (WHO M outside the benchmark table, NaN outside both)"""
+        ages = np.asarray(ages, dtype=np.float64)
+        table_ages, _, values, _ = self.lms[(sex, metric)]
+        medians = interp_in_range(ages, table_ages, values)
+        if (sex, metric) in self.medians:
+            table_ages, values = self.medians[(sex, metric)]
+            benchmark = interp_in_range(ages, table_ages, values)
+            medians = np.where(np.isnan(benchmark), medians, benchmark)
+        return medians
+
+    def benchmark_at(self, gender, age_months: int) -> Optional[Dict[str, float]]:
+        """
+        Benchmark medians for a whole-month age from the precomputed grid (no interpolation at call time).
+        None for ages outside the grid.
+        """
+        month = int(age_months)
+        if month < 0 or month > GRID_MAX_MONTH:
+            return None
+        row = self.benchmark_grid[SEXES.index(normalize_sex(gender)), :, month]
+        return {metric: round(float(value), 2) for metric, value in zip(METRICS, row)}
+
+    def lms_at(self, sex: str, metric: str, ages) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolated L, M and S parameters for each age; NaN outside the WHO tables"""
+        ages = np.asarray(ages, dtype=np.float64)
+        table_ages, L, M, S = self.lms[(sex, metric)]
+        return interp_in_range(ages, table_ages, L), interp_in_range(ages, table_ages, M), interp_in_range(ages, table_ages, S)
+
+    def z_scores(self, sex: str, metric: str, ages, values) -> np.ndarray:
+        """LMS z-scores; NaN where the measurement is missing or not positive, or the age is outside the tables"""
+        values = np.asarray(values, dtype=np.float64)
+        L, M, S = self.lms_at(sex, metric, ages)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(values > 0, values / M, np.nan)
+            small_l = np.abs(L) < 1e-6
+            z = np.where(small_l, np.log(ratio) / S, (np.power(ratio, L) - 1) / (np.where(small_l, 1.0, L) * S))
+        return z
+
+    def percentiles(self, sex: str, metric: str, ages, values) -> np.ndarray:
+        """Percentile (0-100) of each measurement"""
+        return 100.0 * normal_cdf(self.z_scores(sex, metric, ages, values))
+
+    def score_frame(self, frame: pd.DataFrame, gender, ages) -> pd.DataFrame:
+        """
+        Add benchmark_<metric>, <metric>_z and <metric>_percentile columns for every metric present,
+        plus in_reference_range (scores are NaN where it is False)
+        """
+        sex = normalize_sex(gender)
+        scored = frame.copy()
+        scored['in_reference_range'] = self.in_range(ages)
+        for metric in METRICS:
+            if metric not in scored.columns:
+                continue
+            z = self.z_scores(sex, metric, ages, scored[metric].to_numpy())
+            scored[f'benchmark_{metric}'] = np.round(self.median(sex, metric, ages), 2)
+            scored[f'{metric}_z'] = np.round(z, 2)
+            scored[f'{metric}_percentile'] = np.round(100.0 * normal_cdf(z), 1)
+        return scored
+
+    def score_population(self, frame: pd.DataFrame, genders: pd.Series, ages) -> pd.DataFrame:
+        """Like score_frame, for rows belonging to children of either sex"""
+        sexes = genders.map(normalize_sex).to_numpy()
+        ages = np.asarray(ages, dtype=np.float64)
+        scored = frame.copy()
+        scored['in_reference_range'] = self.in_range(ages)
+        for metric in METRICS:
+            if metric not in scored.columns:
+                continue
+            values = scored[metric].to_numpy(dtype=np.float64)
+            z = np.full(len(scored), np.nan)
+            benchmark = np.full(len(scored), np.nan)
+            for sex in SEXES:
+                mask = sexes == sex
+                if mask.any():
+                    z[mask] = self.z_scores(sex, metric, ages[mask], values[mask])
+                    benchmark[mask] = self.median(sex, metric, ages[mask])
+            scored[f'benchmark_{metric}'] = np.round(benchmark, 2)
+            scored[f'{metric}_z'] = np.round(z, 2)
+            scored[f'{metric}_percentile'] = np.round(100.0 * normal_cdf(z), 1)
+        return scored
+
+
+# Loaded once per process and reloaded when growth_benchmark changes (singleton pattern)
+_growth_reference: Optional[GrowthReference] = None
+_growth_reference_checked_at = 0.0
+_growth_reference_lock = Lock()
+
+
+def benchmark_version(conn) -> str:
+    """Fingerprint of the growth_benchmark rows, so any edit to the table gives a new version"""
+    from app import queries
+    return queries.GROWTH_BENCHMARK_VERSION.execute(conn).scalar_one()
+
+
+def _reference_is_fresh() -> bool:
+    return _growth_reference is not None and \
+        time.monotonic() - _growth_reference_checked_at < GROWTH_REFERENCE_TTL_SECONDS
+
+
+def get_growth_reference() -> GrowthReference:
+    """
+    Return the process-wide reference, loading it on first use. At most once per TTL the
+    growth_benchmark version is re-read and the reference reloaded if the table changed.
+    """
+    global _growth_reference, _growth_reference_checked_at
+    if _reference_is_fresh():
+        return _growth_reference
+    with _growth_reference_lock:
+        if _reference_is_fresh():
+            return _growth_reference
+        from app.db import engine
+        try:
+            with engine.connect() as conn:
+                version = benchmark_version(conn)
+                if _growth_reference is None or _growth_reference.version != version:
+                    _growth_reference = GrowthReference.load(conn, version=version)
+                    print(f"Growth reference loaded (benchmark version {version})")
+        except Exception as e:
+            print(f"Error loading growth benchmarks: {e}")
+            if _growth_reference is None:
+                # WHO medians only; the version stays unset so the next check retries the table
+                _growth_reference = GrowthReference.load()
+        _growth_reference_checked_at = time.monotonic()
+    return _growth_reference
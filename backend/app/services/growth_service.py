@@ -1,7 +1,8 @@
 from sqlmodel import Session, select
-from app.models import Growth, Growth_Benchmark
+from app.models import Growth, Child
+from app.services.growth_reference import get_growth_reference
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import statistics
 
 class GrowthService:
@@ -53,31 +54,33 @@ class GrowthService:
         else:
             return "stable"
 
-    def compare_with_benchmark(self, child_id: int, child_age_months: int) -> Dict:
+    def compare_with_benchmark(self, child_id: int, child_age_months: int, gender: Optional[str] = None) -> Dict:
         """Compare latest growth with benchmark"""
-        latest_growth = self.session.exec(
-            select(Growth)
+        latest = self.session.exec(
+            select(Growth, Child.gender)
+            .join(Child, Child.id == Growth.child_id)
             .where(Growth.child_id == child_id)
             .order_by(Growth.check_in.desc())
         ).first()
         
-        if not latest_growth:
+        if not latest:
             return {"status": "no_data"}
         
-        benchmark = self.session.exec(
-            select(Growth_Benchmark)
-            .where(Growth_Benchmark.age_month == child_age_months)
-        ).first()
+        latest_growth, child_gender = latest
         
-        if not benchmark:
-            return {"status": "no_benchmark"}
+        # Benchmarks come from the in-memory reference grid, so this costs no extra query
+        reference = get_growth_reference()
+        benchmark = reference.benchmark_at(gender or child_gender, child_age_months)
+        if benchmark is None:
+            return {"status": "out_of_range"}
         
         return {
             "status": "available",
-            "weight_comparison": "above" if latest_growth.weight > benchmark.weight else "below",
-            "height_comparison": "above" if latest_growth.height > benchmark.height else "below",
-            "benchmark_weight": benchmark.weight,
-            "benchmark_height": benchmark.height,
+            "weight_comparison": "above" if latest_growth.weight > benchmark["weight"] else "below",
+            "height_comparison": "above" if latest_growth.height > benchmark["height"] else "below",
+            "benchmark_weight": benchmark["weight"],
+            "benchmark_height": benchmark["height"],
+            "benchmark_head_circumference": benchmark["head_circumference"],
             "actual_weight": latest_growth.weight,
             "actual_height": latest_growth.height
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,62 @@
+import hashlib
+from datetime import datetime, timezone
+from threading import Lock
+from typing import List, Dict, Any, Optional
+
+
+def symptoms_key(child_data: Dict[str, Any]) -> str:
+    """Hash of the child's recent symptom set, which the article ranking depends on"""
+    symptoms = sorted({str(symptom).strip().lower() for symptom in child_data.get('recent_symptoms') or []})
+    return hashlib.sha1('|'.join(symptoms).encode()).hexdigest()
+
+
+class GuidanceArtifactStore:
+    """Process-wide store of computed guidance artifacts, one per child"""
+
+    def __init__(self):
+        self._artifacts: Dict[int, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def build_artifact(self, child_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Bundle articles with their derived topic statistics"""
+        topic_counts: Dict[str, int] = {}
+        for article in articles:
+            for topic in article.get('key_topics', []):
+                topic_counts[topic] = topic_counts.get(topic, 0) + 1
+
+        top_topics = sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        avg_relevance_score = (
+            sum(article.get('relevance_score', 0) for article in articles) / len(articles)
+            if articles else 0
+        )
+
+        return {
+            'child_id': child_data.get('id'),
+            'age_months': child_data.get('age_months'),
+            'symptoms_key': symptoms_key(child_data),
+            'articles': articles,
+            'total_articles': len(articles),
+            'top_topics': [{'topic': topic, 'count': count} for topic, count in top_topics],
+            'avg_relevance_score': avg_relevance_score,
+            'computed_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+    def get(self, child_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the stored artifact if it was computed for the child's current age and recent symptoms"""
+        with self._lock:
+            artifact = self._artifacts.get(child_data.get('id'))
+        if artifact and artifact.get('age_months') == child_data.get('age_months') and \
+                artifact.get('symptoms_key') == symptoms_key(child_data):
+            return artifact
+        return None
+
+    def put(self, child_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build and store the artifact for a child, replacing any previous one"""
+        artifact = self.build_artifact(child_data, articles)
+        with self._lock:
+            self._artifacts[child_data.get('id')] = artifact
+        return artifact
+
+
+# Shared across requests (singleton pattern)
+guidance_artifact_store = GuidanceArtifactStore()
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+from threading import Lock
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+import numpy as np
+
+from app.services.article_ranker import ArticleRanker, tokenize, hash_embeddings, BM25_K1, BM25_B, BM25_WEIGHT, EMBEDDING_WEIGHT
+
+SERVICES_DIR = os.path.dirname(__file__)
+BACKEND_GUIDANCE_LIST = os.path.join(SERVICES_DIR, 'guidance_list.json')
+# The frontend copy carries titles, descriptions, tags and images for the same URLs
+FRONTEND_GUIDANCE_LIST = os.path.join(SERVICES_DIR, '..', '..', '..', 'frontend', 'src', 'assets', 'guidance_list.json')
+
+MAX_AGE_MONTHS = 18 * 12
+
+# Default age (years) of each curated section when the title does not state one
+SECTION_AGE_YEARS = {
+    'PuiSim_GeneralArticles': 2,
+    'Pang_GeneralArticles': 5,
+}
+
+WORD_NUMBERS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10'
+}
+
+
+def infer_age_range(title: str, section: str) -> tuple[int, int]:
+    """Age range in months covered by an article, from its title or curated section"""
+    text = title.lower()
+    for word, digit in WORD_NUMBERS.items():
+        text = re.sub(rf'\b{word}\b', digit, text)
+
+    # "2-3 Year", "Ages 2-5", "Age 2 to Age 4", "4 to 5-Year-Olds"
+    span = re.search(r'(\d+)\s*(?:-|to)\s*(?:age\s*)?(\d+)', text)
+    if span and re.search(r'years?|olds?|ages?', text):
+        low, high = sorted((int(span.group(1)), int(span.group(2))))
+        return low * 12, (high + 1) * 12 - 1
+
+    # "First 5 Years"
+    first = re.search(r'first\s+(\d+)\s*years?', text)
+    if first:
+        return 0, int(first.group(1)) * 12 - 1
+
+    # "2-Year-Old", "Child at 2", "5 Years Old"
+    single = re.search(r'(\d+)\s*-?\s*years?\b', text) or re.search(r'\bat\s+(\d+)\b', text)
+    if single:
+        years = int(single.group(1))
+        return years * 12, (years + 1) * 12 - 1
+
+    if section in SECTION_AGE_YEARS:
+        years = SECTION_AGE_YEARS[section]
+        return years * 12, (years + 1) * 12 - 1
+
+    # Highlighted / general health articles apply to every age
+    return 0, MAX_AGE_MONTHS
+
+
+def title_from_url(url: str) -> str:
+    """Readable title from the last path segment of a URL"""
+    slug = urlparse(url).path.rstrip('/').split('/')[-1]
+    slug = re.sub(r'\.(html?|aspx)$', '', slug)
+    words = [word for word in re.split(r'[-_]+', slug) if word and not word.isdigit()]
+    return ' '.join(words).capitalize() if words else urlparse(url).netloc
+
+
+class GuidanceCorpus:
+    """Offline index of curated guidance articles with an inverted index and precomputed embeddings"""
+
+    def __init__(self, articles: List[Dict[str, Any]]):
+        self.articles = articles
+        self.age_min = np.array([a['age_min_months'] for a in articles], dtype=np.int32)
+        self.age_max = np.array([a['age_max_months'] for a in articles], dtype=np.int32)
+
+        # Inverted index over title, description and topics: term -> (doc ids, term frequencies)
+        doc_tokens = [tokenize(self._index_text(article)) for article in articles]
+        postings: Dict[str, Dict[int, int]] = {}
+        for doc_id, tokens in enumerate(doc_tokens):
+            for token in tokens:
+                postings.setdefault(token, {})
+                postings[token][doc_id] = postings[token].get(doc_id, 0) + 1
+        self.postings = {
+            term: (np.fromiter(docs.keys(), dtype=np.int32), np.fromiter(docs.values(), dtype=np.float64))
+            for term, docs in postings.items()
+        }
+
+        n_docs = max(len(articles), 1)
+        self.doc_lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=np.float64)
+        avg_length = self.doc_lengths.mean() if len(articles) and self.doc_lengths.mean() > 0 else 1.0
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / avg_length)
+        self.idf = {
+            term: float(np.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5)))
+            for term, (doc_ids, _) in self.postings.items()
+        }
+
+        self.embeddings = hash_embeddings([self._index_text(article) for article in articles])
+        self.ranker = ArticleRanker()
+
+    @staticmethod
+    def _index_text(article: Dict[str, Any]) -> str:
+        return ' '.join([article['title'], article['title'], article['description'], ' '.join(article['key_topics'])])
+
+    @classmethod
+    def from_files(cls, backend_path: str = BACKEND_GUIDANCE_LIST,
+                   frontend_path: str = FRONTEND_GUIDANCE_LIST) -> 'GuidanceCorpus':
+        """Build the corpus from the backend URL lists, enriched with frontend metadata when available"""
+        sections: Dict[str, List[Any]] = {}
+        for path in (backend_path, frontend_path):
+            if not os.path.exists(path):
+                print(f"Guidance list not found, skipping: {path}")
+                continue
+            with open(path, 'r') as f:
+                data = json.load(f)
+            for section, entries in data.items():
+                entries = entries if isinstance(entries, list) else [entries]
+                sections.setdefault(section, []).extend(entries)
+
+        # Merge entries by URL; dict entries (with metadata) win over bare URLs
+        by_url: Dict[str, Dict[str, Any]] = {}
+        for section, entries in sections.items():
+            for entry in entries:
+                data = entry if isinstance(entry, dict) else {'url': entry}
+                url = data.get('url')
+                if not url:
+                    continue
+                merged = by_url.setdefault(url, {'url': url, 'section': section})
+                for key, value in data.items():
+                    if value and not merged.get(key):
+                        merged[key] = value
+
+        articles = []
+        for i, (url, data) in enumerate(by_url.items()):
+            title = data.get('title') or title_from_url(url)
+            description = data.get('description') or title
+            tags = data.get('tags') or []
+            age_min, age_max = infer_age_range(title, data['section'])
+            articles.append({
+                'id': f"corpus_{i}",
+                'title': title,
+                'description': description,
+                'tags': tags,
+                'url': url,
+                'domain': urlparse(url).netloc.replace('www.', ''),
+                'image': data.get('image'),
+                'ai_summary': description,
+                'key_topics': [tag.lower() for tag in tags],
+                'content_snippet': description,
+                'age_min_months': age_min,
+                'age_max_months': age_max,
+            })
+
+        print(f"Guidance corpus indexed with {len(articles)} articles")
+        return cls(articles)
+
+    def _bm25(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25 scores accumulated from the postings of each query term"""
+        scores = np.zeros(len(self.articles), dtype=np.float64)
+        for term in set(query_tokens):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, tf = posting
+            scores[doc_ids] += self.idf[term] * tf * (BM25_K1 + 1) / (tf + self.length_norm[doc_ids])
+        return scores
+
+    def search(self, child_data: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """Ranked, age-filtered articles for a child without any LLM or network calls"""
+        if not self.articles:
+            return []
+
+        age_months = child_data.get('age_months', 0) or 0
+        query = self.ranker.build_query(child_data)
+
+        bm25 = self._bm25(tokenize(query))
+        bm25_max = bm25.max()
+        bm25_norm = bm25 / bm25_max if bm25_max > 0 else bm25
+        cosine = np.clip(self.embeddings @ hash_embeddings([query])[0], 0.0, 1.0)
+        scores = BM25_WEIGHT * bm25_norm + EMBEDDING_WEIGHT * cosine
+
+        in_range = (self.age_min <= age_months) & (age_months <= self.age_max)
+        candidates = np.flatnonzero(in_range)
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:limit]
+
+        results = []
+        for i in order:
+            article = dict(self.articles[i])
+            article['local_score'] = round(float(scores[i]), 4)
+            article['relevance_score'] = int(round(60 + 40 * scores[i]))
+            article['age_appropriate'] = True
+            results.append(article)
+        return results
+
+
+# Built lazily on first use (singleton pattern)
+_guidance_corpus: Optional[GuidanceCorpus] = None
+_guidance_corpus_lock = Lock()
+
+
+def get_guidance_corpus() -> GuidanceCorpus:
+    global _guidance_corpus
+    if _guidance_corpus is None:
+        with _guidance_corpus_lock:
+            if _guidance_corpus is None:
+                _guidance_corpus = GuidanceCorpus.from_files()
+    return _guidance_corpus
@@ -0,0 +1,482 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from app import queries
+from app.models import Health_Alerts
+from app.services.growth_analytics import percentile_crossings
+from app.services.growth_reference import get_growth_reference, age_in_months, normalize_sex
+from app.services.sleep_timeline import SleepTimeline, SLEEP_TIMEZONE
+
+# Days analysed for daily rules, ending on (and including) the analysis date
+ALERT_WINDOW_DAYS = 7
+# Growth is measured less often, so its rule looks further back
+GROWTH_WINDOW_DAYS = 90
+
+# Thresholds shared by every daily rule (same as the previous client-side checks)
+SEVERE_MIN_POOR_DAYS = 2
+SEVERE_MIN_DAYS_WITH_DATA = 3
+MODERATE_MIN_CONCERNING_DAYS = 3
+MODERATE_MIN_DAYS_WITH_DATA = 4
+
+# Poop colours and textures that are not "normal" on the Bristol chart
+CONCERNING_POOP_COLORS = ['red', 'black', 'white', 'pale', 'clay', 'green']
+NORMAL_POOP_TEXTURES = ['sausage', 'smooth', 'soft', 'formed', 'log']
+ABNORMAL_POOP_TEXTURES = ['hard', 'pellets', 'lumpy', 'sausage-lumpy', 'cracked',
+                          'soft-blobs', 'mushy', 'watery', 'liquid', 'loose']
+# Bristol types 1-2: the stool a constipated child passes
+HARD_POOP_TEXTURES = ['hard', 'pellets', 'lumpy', 'sausage-lumpy']
+NORMAL_POOP_COLORS = ['brown', 'tan', 'yellow']
+
+# Daily rules. Each expression is evaluated with DataFrame.eval over the (child, day) frame built in
+# daily_frame(), so one rule covers every child in the batch at once:
+#   has_data   - the day counts towards "days with data"
+#   poor       - a bad day (counts towards the severe alert)
+#   concerning - a borderline day (counts towards the moderate alert)
+ALERT_RULES: List[Dict[str, Any]] = [
+    {
+        'category': 'meal',
+        'has_data': 'meals > 0',
+        'poor': 'avg_consumption < 70',
+        'concerning': 'avg_consumption >= 70 and avg_consumption < 85',
+        'severe': {
+            'alert_type': 'meal-poor-appetite',
+            'issue': 'poor appetite',
+            'title': 'Significant Appetite Decline Detected',
+            'description': '{name} has shown poor appetite (<70%) for {poor_days} days over the past {days_with_data} days',
+            'suggestions': [
+                {'id': 1, 'title': 'Consider Medical Consultation',
+                 'content': 'Persistent poor appetite may indicate illness. Monitor for fever, signs of infection, or other symptoms.'},
+                {'id': 2, 'title': 'Offer High-Calorie Foods',
+                 'content': 'Focus on nutrient-dense, high-calorie foods that your child enjoys to maintain nutrition during low appetite periods.'},
+                {'id': 3, 'title': 'Monitor Hydration',
+                 'content': 'Ensure adequate fluid intake, especially if solid food consumption is very low.'},
+            ],
+        },
+        'moderate': {
+            'alert_type': 'meal-reduced-appetite',
+            'issue': 'reduced appetite',
+            'title': 'Reduced Appetite Pattern Detected',
+            'description': '{name} has shown declining appetite patterns over recent days',
+            'suggestions': [
+                {'id': 1, 'title': 'Monitor for Early Signs',
+                 'content': 'Watch for signs of illness such as runny nose, cough, or increased fussiness. Teething can also cause decreased appetite.'},
+                {'id': 2, 'title': 'Offer Preferred Foods',
+                 'content': 'During periods of decreased appetite, focus on offering foods your child typically enjoys and finds comforting.'},
+                {'id': 3, 'title': 'Check for Discomfort',
+                 'content': "Gently feel around your child's neck for any swollen lymph nodes, and observe if they seem to have difficulty swallowing."},
+            ],
+        },
+    },
+    {
+        'category': 'sleep',
+        'has_data': 'sleep_sessions > 0',
+        'poor': 'sleep_hours < 6',
+        'concerning': 'sleep_hours >= 6 and sleep_hours < 9',
+        'severe': {
+            'alert_type': 'sleep-severe-deprivation',
+            'issue': 'sleep deprivation',
+            'title': 'Severe Sleep Deprivation Detected',
+            'description': '{name} has had severely insufficient sleep (<6 hours) for {poor_days} days over the past {days_with_data} days',
+            'suggestions': [
+                {'id': 1, 'title': 'Consider Medical Consultation',
+                 'content': 'Persistent severe sleep issues may indicate illness or discomfort. Monitor for fever, signs of infection, or other symptoms.'},
+                {'id': 2, 'title': 'Review Sleep Environment',
+                 'content': 'Ensure optimal sleep conditions - appropriate temperature, darkness, minimal noise, and comfortable bedding.'},
+                {'id': 3, 'title': 'Monitor for Health Issues',
+                 'content': 'Severe sleep disruption can indicate teething, illness, or developmental changes. Watch for other concerning symptoms.'},
+            ],
+        },
+        'moderate': {
+            'alert_type': 'sleep-concerning-pattern',
+            'issue': 'sleep concerns',
+            'title': 'Sleep Quality Concerns Detected',
+            'description': '{name} has shown declining sleep patterns over recent days',
+            'suggestions': [
+                {'id': 1, 'title': 'Monitor Sleep Patterns',
+                 'content': 'Keep track of bedtime routines and any factors that might be affecting sleep quality.'},
+                {'id': 2, 'title': 'Check for Growth Spurts',
+                 'content': 'Sleep disruptions can be normal during growth spurts or developmental milestones.'},
+                {'id': 3, 'title': 'Maintain Consistent Routine',
+                 'content': 'Try to maintain consistent bedtime and wake-up times to help regulate sleep patterns.'},
+            ],
+        },
+    },
+    {
+        # Only days with a logged bowel movement count: a day without a poop log is missing data,
+        # not evidence of constipation, so hard stools are the constipation signal
+        'category': 'poop',
+        'has_data': 'poops > 0',
+        'poor': 'hard_poops > 0',
+        'concerning': 'unusual_poops > 0',
+        'severe': {
+            'alert_type': 'poop-severe-constipation',
+            'issue': 'bowel problems',
+            'title': 'Severe Constipation Pattern Detected',
+            'description': '{name} has passed hard stools on {poor_days} of the {days_with_data} days with bowel movements logged recently',
+            'suggestions': [
+                {'id': 1, 'title': 'Consider Medical Consultation',
+                 'content': 'Prolonged constipation can be serious in children. Consult your pediatrician for proper evaluation and treatment.'},
+                {'id': 2, 'title': 'Focus on Hydration & Fiber',
+                 'content': "Increase fluid intake and offer fiber-rich foods appropriate for your child's age. Gentle movement can also help."},
+                {'id': 3, 'title': 'Track Additional Symptoms',
+                 'content': 'Monitor for signs of discomfort, fever, vomiting, or changes in appetite that may accompany digestive issues.'},
+            ],
+        },
+        'moderate': {
+            'alert_type': 'poop-concerning-pattern',
+            'issue': 'digestive concerns',
+            'title': 'Digestive Pattern Changes Detected',
+            'description': '{name} has shown changes in bowel movement patterns over recent days',
+            'suggestions': [
+                {'id': 1, 'title': 'Monitor Bowel Patterns',
+                 'content': 'Keep track of frequency, color, and consistency of bowel movements to identify any worsening trends.'},
+                {'id': 2, 'title': 'Review Recent Changes',
+                 'content': 'Consider if dietary changes, new foods, medications, or stress might be affecting digestive patterns.'},
+                {'id': 3, 'title': 'Maintain Healthy Habits',
+                 'content': 'Ensure adequate fluid intake and age-appropriate fiber sources to support healthy digestion.'},
+            ],
+        },
+    },
+    {
+        'category': 'health',
+        'has_data': 'symptoms > 0',
+        'poor': 'fever_symptoms > 0',
+        'concerning': 'symptoms > 0',
+        'severe': {
+            'alert_type': 'health-severe-fever',
+            'issue': 'fever symptoms',
+            'title': 'Persistent Fever Pattern Detected',
+            'description': '{name} has had fever for {poor_days} days over the past {days_with_data} days',
+            'suggestions': [
+                {'id': 1, 'title': 'Seek Medical Attention',
+                 'content': 'Persistent fever in children can indicate serious infection and requires immediate medical evaluation.'},
+                {'id': 2, 'title': 'Monitor Temperature Closely',
+                 'content': 'Check temperature regularly and keep detailed records. Watch for signs of dehydration or worsening symptoms.'},
+                {'id': 3, 'title': 'Maintain Hydration & Rest',
+                 'content': 'Ensure adequate fluid intake and rest. Contact emergency services if temperature exceeds 40°C (104°F) or child shows signs of distress.'},
+            ],
+        },
+        'moderate': {
+            'alert_type': 'health-concerning-symptoms',
+            'issue': 'health symptoms',
+            'title': 'Health Symptoms Pattern Detected',
+            'description': '{name} has shown health symptoms over recent days',
+            'suggestions': [
+                {'id': 1, 'title': 'Monitor Symptom Progression',
+                 'content': 'Keep track of symptoms and their severity. Watch for worsening patterns or new concerning signs.'},
+                {'id': 2, 'title': 'Consider Medical Consultation',
+                 'content': 'If symptoms persist or worsen, consult your pediatrician for proper evaluation and treatment guidance.'},
+                {'id': 3, 'title': 'Supportive Care',
+                 'content': 'Provide comfort measures, ensure adequate rest and hydration, and maintain a calm environment for recovery.'},
+            ],
+        },
+    },
+]
+
+# Growth rule: dropping across this many major percentile lines within the growth window
+GROWTH_RULE = {
+    'category': 'growth',
+    'metrics': ['weight', 'height'],
+    'min_lines_dropped': 2,
+    'alert': {
+        'alert_type': 'growth-percentile-drop',
+        'issue': 'growth changes',
+        'title': 'Growth Percentile Drop Detected',
+        'description': "{name}'s {metric} has dropped across {lines} major percentile lines in recent measurements",
+        'suggestions': [
+            {'id': 1, 'title': 'Re-check the Measurement',
+             'content': 'A single unusual reading can be a measuring error. Measure again in a few days under the same conditions.'},
+            {'id': 2, 'title': 'Review Feeding and Illness',
+             'content': 'Recent illness, reduced appetite or feeding changes often explain a temporary slowdown in growth.'},
+            {'id': 3, 'title': 'Discuss at the Next Check-up',
+             'content': 'If the drop continues over the next measurements, share the growth chart with your pediatrician.'},
+        ],
+    },
+}
+
+COMBINED_ALERT_TYPE = 'combined-health-concerns'
+
+
+def alert_window(analysis_date: date, days: int = ALERT_WINDOW_DAYS):
+    """Local day start of the first day and end (exclusive) of the analysis date, as tz-aware timestamps"""
+    end = pd.Timestamp(analysis_date).tz_localize(SLEEP_TIMEZONE) + pd.Timedelta(days=1)
+    return end - pd.Timedelta(days=days), end
+
+
+def load_alert_data(conn, child_ids: List[int], analysis_date: date) -> Dict[str, pd.DataFrame]:
+    """Bulk-load every table the rules need for a batch of children, one query per table"""
+    start, end = alert_window(analysis_date)
+    growth_start, _ = alert_window(analysis_date, GROWTH_WINDOW_DAYS)
+    window = {'child_ids': child_ids, 'window_start': start.to_pydatetime(), 'window_end': end.to_pydatetime()}
+    return {
+        'children': queries.ALERT_CHILDREN.frame(conn, child_ids=child_ids),
+        'meals': queries.ALERT_MEALS.frame(conn, **window),
+        'sleep': queries.ALERT_SLEEP.frame(conn, **window),
+        'poops': queries.ALERT_POOPS.frame(conn, **window),
+        'symptoms': queries.ALERT_SYMPTOMS.frame(conn, **window),
+        'growth': queries.ALERT_GROWTH.frame(conn, child_ids=child_ids, window_start=growth_start.to_pydatetime(),
+                                             window_end=end.to_pydatetime()),
+    }
+
+
+def _local_day(times: pd.Series) -> pd.Series:
+    # Empty query results come back tz-naive, so normalise to UTC before converting
+    return pd.to_datetime(times, utc=True).dt.tz_convert(SLEEP_TIMEZONE).dt.tz_localize(None).dt.normalize()
+
+
+def classify_hard_poops(poops: pd.DataFrame) -> np.ndarray:
+    """True where a poop has a constipated (Bristol 1-2) texture"""
+    return poops['texture_name'].fillna('').str.lower().isin(HARD_POOP_TEXTURES).to_numpy()
+
+
+def classify_unusual_poops(poops: pd.DataFrame) -> np.ndarray:
+    """Vectorized Bristol-chart check: True where a poop is not clearly normal"""
+    color = poops['color_name'].fillna('').str.lower()
+    texture = poops['texture_name'].fillna('').str.lower()
+    normal = (
+        ~color.isin(CONCERNING_POOP_COLORS) & ~texture.isin(ABNORMAL_POOP_TEXTURES) & (
+            texture.isin(NORMAL_POOP_TEXTURES) |
+            (color.isin(NORMAL_POOP_COLORS) & ~texture.str.contains('sticky|foamy|floating|mucus'))
+        )
+    )
+    return ~normal.to_numpy()
+
+
+def daily_frame(data: Dict[str, pd.DataFrame], analysis_date: date) -> pd.DataFrame:
+    """One row per (child, local day) in the window with the per-day values the rules read"""
+    child_ids = data['children']['child_id'].to_numpy()
+    start, _ = alert_window(analysis_date)
+    days = pd.date_range(start.tz_localize(None), periods=ALERT_WINDOW_DAYS, freq='D')
+    daily = pd.DataFrame(index=pd.MultiIndex.from_product([child_ids, days], names=['child_id', 'day']))
+
+    meals = data['meals'].assign(day=lambda f: _local_day(f['check_in']))
+    meal_stats = meals.groupby(['child_id', 'day'])['consumption_level'].agg(['count', 'mean'])
+    daily['meals'] = meal_stats['count']
+    daily['avg_consumption'] = meal_stats['mean']
+
+    poops = data['poops'].assign(day=lambda f: _local_day(f['check_in']))
+    poops['unusual'] = classify_unusual_poops(poops)
+    poops['hard'] = classify_hard_poops(poops)
+    poop_stats = poops.groupby(['child_id', 'day']).agg(
+        poops=('unusual', 'count'), unusual_poops=('unusual', 'sum'), hard_poops=('hard', 'sum'))
+    daily['poops'] = poop_stats['poops']
+    daily['unusual_poops'] = poop_stats['unusual_poops']
+    daily['hard_poops'] = poop_stats['hard_poops']
+
+    symptoms = data['symptoms'].assign(day=lambda f: _local_day(f['check_in']))
+    symptoms['fever'] = symptoms['symptom'].fillna('').str.lower().str.contains('fever')
+    symptom_stats = symptoms.groupby(['child_id', 'day'])['fever'].agg(['count', 'sum'])
+    daily['symptoms'] = symptom_stats['count']
+    daily['fever_symptoms'] = symptom_stats['sum']
+
+    # Sleep goes through the session engine so overlaps and midnight-spanning sleep are handled
+    sleep_days = []
+    for child_id, records in data['sleep'].groupby('child_id'):
+        per_day = SleepTimeline.from_frame(records).daily()
+        sleep_days.append(per_day.assign(child_id=child_id))
+    if sleep_days:
+        sleep = pd.concat(sleep_days).rename(columns={'sleep_date': 'day'}).set_index(['child_id', 'day'])
+        daily['sleep_hours'] = sleep['total_hours']
+        daily['sleep_sessions'] = sleep['sessions']
+    else:
+        daily['sleep_hours'] = np.nan
+        daily['sleep_sessions'] = np.nan
+
+    counts = ['meals', 'poops', 'unusual_poops', 'hard_poops', 'symptoms', 'fever_symptoms', 'sleep_sessions']
+    daily[counts] = daily[counts].fillna(0)
+    return daily
+
+
+def _alert(child: Dict[str, Any], spec: Dict[str, Any], severity: str, analysis_date: date,
+           period_start: date, **fields) -> Dict[str, Any]:
+    name = child.get('name') or 'Your child'
+    return {
+        'child_id': int(child['child_id']),
+        'alert_type': spec['alert_type'],
+        'issue': spec['issue'],
+        'title': spec['title'],
+        'description': spec['description'].format(name=name, **fields),
+        'severity': severity,
+        'suggestions': spec['suggestions'],
+        'analysis_date': datetime.combine(analysis_date, datetime.min.time()),
+        'data_period_start': datetime.combine(period_start, datetime.min.time()),
+        'data_period_end': datetime.combine(analysis_date, datetime.min.time()),
+    }
+
+
+def evaluate_daily_rules(daily: pd.DataFrame, children: pd.DataFrame, analysis_date: date) -> List[Dict[str, Any]]:
+    """Apply every daily rule to all children at once"""
+    period_start = analysis_date - timedelta(days=ALERT_WINDOW_DAYS - 1)
+    by_id = children.set_index('child_id').to_dict(orient='index')
+    alerts = []
+
+    for rule in ALERT_RULES:
+        has_data = daily.eval(rule['has_data']).astype(bool)
+        flags = pd.DataFrame({
+            'days_with_data': has_data,
+            'poor_days': has_data & daily.eval(rule['poor']).astype(bool),
+            'concerning_days': has_data & daily.eval(rule['concerning']).astype(bool),
+        })
+        totals = flags.groupby(level='child_id').sum()
+
+        severe = (totals['poor_days'] >= SEVERE_MIN_POOR_DAYS) & \
+            (totals['days_with_data'] >= SEVERE_MIN_DAYS_WITH_DATA)
+        moderate = ~severe & (
+            (totals['concerning_days'] >= MODERATE_MIN_CONCERNING_DAYS) |
+            ((totals['poor_days'] >= 1) & (totals['concerning_days'] >= 2))
+        ) & (totals['days_with_data'] >= MODERATE_MIN_DAYS_WITH_DATA)
+
+        for level, mask, severity in (('severe', severe, 'error'), ('moderate', moderate, 'warning')):
+            for child_id, counts in totals[mask].iterrows():
+                child = {'child_id': child_id, **by_id.get(child_id, {})}
+                alerts.append(_alert(child, rule[level], severity, analysis_date, period_start,
+                                     poor_days=int(counts['poor_days']),
+                                     days_with_data=int(counts['days_with_data'])))
+    return alerts
+
+
+def evaluate_growth_rule(growth: pd.DataFrame, children: pd.DataFrame, analysis_date: date) -> List[Dict[str, Any]]:
+    """
+    Percentile-line drops over the growth window. Uses the z-scores stored in growth_percentile and
+    scores against the WHO tables only the records the batch job has not scored yet.
+    """
+    if growth.empty:
+        return []
+
+    period_start = analysis_date - timedelta(days=GROWTH_WINDOW_DAYS - 1)
+    reference = get_growth_reference()
+    by_id = children.set_index('child_id')
+    alerts = []
+
+    for child_id, rows in growth.groupby('child_id'):
+        if child_id not in by_id.index or len(rows) < 2:
+            continue
+        child = by_id.loc[child_id]
+        ages = age_in_months(child['birth_date'], rows['check_in'])
+        dates = rows['check_in'].dt.strftime('%Y-%m-%d').tolist()
+        for metric in GROWTH_RULE['metrics']:
+            z = rows[f'{metric}_z'].to_numpy(dtype=float)
+            unscored = np.isnan(z)
+            if unscored.any():
+                computed = reference.z_scores(normalize_sex(child['gender']), metric, ages, rows[metric].to_numpy(dtype=float))
+                z = np.where(unscored, computed, z)
+            dropped = percentile_crossings(dates, z)['channels_dropped_from_peak']
+            if dropped >= GROWTH_RULE['min_lines_dropped']:
+                alerts.append(_alert({'child_id': child_id, 'name': child['name']}, GROWTH_RULE['alert'], 'warning',
+                                     analysis_date, period_start, metric=metric.replace('_', ' '), lines=dropped))
+                break
+    return alerts
+
+
+def combine_alerts(alerts: List[Dict[str, Any]], children: pd.DataFrame) -> List[Dict[str, Any]]:
+    """One alert per child: a single finding is kept as-is, several become a combined alert"""
+    names = dict(zip(children['child_id'], children['name']))
+    by_child: Dict[int, List[Dict[str, Any]]] = {}
+    for alert in alerts:
+        by_child.setdefault(alert['child_id'], []).append(alert)
+
+    combined = []
+    for child_id, child_alerts in by_child.items():
+        if len(child_alerts) == 1:
+            combined.append(child_alerts[0])
+            continue
+
+        is_error = any(alert['severity'] == 'error' for alert in child_alerts)
+        issues = ', '.join(alert['issue'] for alert in child_alerts)
+        combined.append({
+            **child_alerts[0],
+            'alert_type': COMBINED_ALERT_TYPE,
+            'issue': issues,
+            'title': 'Multiple Health Concerns Detected' if is_error else 'Multiple Pattern Changes Detected',
+            'description': f"{names.get(child_id) or 'Your child'} is showing {issues} patterns that may be related",
+            'severity': 'error' if is_error else 'warning',
+            'suggestions': [
+                {'id': 1, 'title': 'Monitor for Illness Signs',
+                 'content': 'Multiple health pattern changes often indicate illness, infection, or systemic health issues. Watch for fever, signs of discomfort, or worsening symptoms.'},
+                {'id': 2, 'title': 'Maintain Basic Care & Comfort',
+                 'content': 'Focus on hydration, comfort foods, consistent routines, and extra comfort during this challenging period.'},
+                {'id': 3,
+                 'title': 'Consider Medical Consultation' if is_error else 'Continue Close Monitoring',
+                 'content': 'Multiple persistent issues may indicate a health problem that warrants professional medical assessment.' if is_error
+                 else 'Keep tracking all patterns closely as related changes often resolve together once the underlying cause is addressed.'},
+            ],
+            'data_period_start': min(alert['data_period_start'] for alert in child_alerts),
+        })
+    return combined
+
+
+def evaluate_alerts(data: Dict[str, pd.DataFrame], analysis_date: date) -> List[Dict[str, Any]]:
+    """Run all rules for the children in `data` and return at most one alert per child"""
+    if data['children'].empty:
+        return []
+    daily = daily_frame(data, analysis_date)
+    alerts = evaluate_daily_rules(daily, data['children'], analysis_date)
+    alerts += evaluate_growth_rule(data['growth'], data['children'], analysis_date)
+    return combine_alerts(alerts, data['children'])
+
+
+# Columns refreshed when an alert for the same child, type and day already exists
+ALERT_UPSERT_COLUMNS = ['title', 'description', 'severity', 'suggestions', 'data_period_start', 'data_period_end']
+
+
+def alert_upsert_statement(alerts: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (child_id, alert_type, analysis_date) DO UPDATE; read and deleted state is kept"""
+    now = datetime.now()
+    rows = [
+        {**{key: value for key, value in alert.items() if key != 'issue'},
+         'id': uuid4(), 'created_at': now, 'is_read': False, 'is_deleted': False}
+        for alert in alerts
+    ]
+    statement = insert(Health_Alerts).values(rows)
+    return statement.on_conflict_do_update(
+        constraint='uq_health_alerts_child_type_date',
+        set_={column: statement.excluded[column] for column in ALERT_UPSERT_COLUMNS}
+    )
+
+
+def upsert_alerts(conn, alerts: List[Dict[str, Any]]):
+    """Write alerts with a single upsert statement"""
+    if not alerts:
+        return
+    conn.execute(alert_upsert_statement(alerts))
+
+
+def remove_stale_alerts(conn, child_ids: List[int], analysis_date: date,
+                        alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Delete the children's alerts for the day whose type the rules no longer produce
+    (e.g. the check-in behind it was deleted, or it became part of a combined alert).
+    Alerts the user already dismissed are left untouched. Returns the removed alerts.
+    """
+    current = [(alert['child_id'], alert['alert_type']) for alert in alerts]
+    statement = delete(Health_Alerts).where(
+        Health_Alerts.child_id.in_(child_ids),
+        Health_Alerts.analysis_date == datetime.combine(analysis_date, datetime.min.time()),
+        Health_Alerts.is_deleted == False,
+    )
+    if current:
+        statement = statement.where(tuple_(Health_Alerts.child_id, Health_Alerts.alert_type).not_in(current))
+    removed = conn.execute(statement.returning(Health_Alerts.id, Health_Alerts.child_id, Health_Alerts.alert_type))
+    return [dict(row) for row in removed.mappings()]
+
+
+def replace_alerts(conn, child_ids: List[int], analysis_date: date,
+                   alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Make the stored alerts for the day match the rule results; returns the removed alerts"""
+    removed = remove_stale_alerts(conn, child_ids, analysis_date, alerts)
+    upsert_alerts(conn, alerts)
+    return removed
+
+
+def run_for_children(conn, child_ids: List[int], analysis_date: Optional[date] = None):
+    """Load, evaluate and store alerts for a set of children; returns (alerts written, alerts removed)"""
+    analysis_date = analysis_date or pd.Timestamp.now(tz=SLEEP_TIMEZONE).date()
+    data = load_alert_data(conn, child_ids, analysis_date)
+    alerts = evaluate_alerts(data, analysis_date)
+    removed = replace_alerts(conn, child_ids, analysis_date, alerts)
+    return alerts, removed
@@ -1,5 +1,6 @@
 from sqlmodel import Session, select
 from app.models import Symptom, Sleep_Time, Meal
+from app.services.sleep_timeline import SleepTimeline
 from datetime import datetime, timedelta
 from typing import Dict, List
 import statistics
@@ -48,24 +49,20 @@ class HealthService:
         if not sleep_records:
             return {"status": "no_data"}
         
-        # Calculate average sleep duration
-        durations = []
-        for record in sleep_records:
-            if record.start_time and record.end_time:
-                duration = (record.end_time - record.start_time).total_seconds() / 3600
-                if 0 < duration < 24:  # Valid duration
-                    durations.append(duration)
+        # Average sleep per day from merged sessions, not per raw record
+        daily = SleepTimeline.from_records(sleep_records).daily()
         
-        if not durations:
+        if daily.empty:
             return {"status": "incomplete_data"}
         
-        avg_sleep = statistics.mean(durations)
+        avg_sleep = float(daily['total_hours'].mean())
         
         return {
             "status": "available",
             "average_sleep_hours": round(avg_sleep, 1),
             "sleep_quality": "good" if avg_sleep > 8 else "needs_attention",
-            "records_count": len(sleep_records)
+            "records_count": len(sleep_records),
+            "days_with_data": len(daily)
         }
 
     def get_nutrition_summary(self, child_id: int, days_back: int = 7) -> Dict:
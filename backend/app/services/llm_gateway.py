@@ -0,0 +1,426 @@
+"""
+Shared gateway for every LLM call in the project (RAG chat, AI guidance, the standalone chatbot).
+
+It caps concurrent calls globally and per user (extra callers queue up to a deadline),
+coalesces identical in-flight prompts so they hit the model once, applies a timeout to
+every attempt, retries transient failures (timeouts, rate limits, 5xx) with jittered
+exponential backoff, and records latency and token metrics.
+
+LLM_BACKEND=fake swaps Gemini for a local fake model, for tests and offline development.
+This module only depends on the standard library (the Gemini SDK is imported lazily), so it
+can also be loaded by path from outside the backend package.
+"""
+import asyncio
+import contextvars
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Latency samples kept per caller for percentiles
+LATENCY_SAMPLES = 500
+
+# User a request runs on behalf of, for calls that cannot pass one (e.g. inside a LangChain chain)
+current_llm_user: contextvars.ContextVar = contextvars.ContextVar('current_llm_user', default=None)
+
+
+@contextmanager
+def llm_user(user: Optional[str]):
+    """Attribute LLM calls made inside the block (in this thread or task) to a user for the per-user cap"""
+    token = current_llm_user.set(user)
+    try:
+        yield
+    finally:
+        current_llm_user.reset(token)
+
+
+class LLMError(Exception):
+    """Base class for gateway failures"""
+
+
+class LLMOverloadedError(LLMError):
+    """No concurrency slot became free before the queue deadline"""
+
+
+class LLMTimeoutError(LLMError):
+    """A model call did not finish within the per-attempt timeout"""
+
+
+def is_timeout(error: Exception) -> bool:
+    name = type(error).__name__.lower()
+    return isinstance(error, TimeoutError) or 'timeout' in name or 'deadline' in name
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Worth retrying: timeouts, dropped connections, rate limiting (429) and server errors (5xx).
+    Auth failures, other 4xx responses and invalid or blocked requests fail straight away.
+    """
+    if is_timeout(error) or isinstance(error, ConnectionError):
+        return True
+    # google.api_core errors carry the HTTP status in .code, HTTP client errors in .status_code
+    status = getattr(error, 'code', None)
+    if not isinstance(status, int):
+        status = getattr(error, 'status_code', None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+@dataclass
+class LLMResult:
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+@dataclass
+class GatewayConfig:
+    max_concurrency: int = 8
+    max_per_user: int = 2
+    queue_timeout: float = 30.0
+    request_timeout: float = 60.0
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_cap: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> 'GatewayConfig':
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", cls.max_concurrency)),
+            max_per_user=int(os.getenv("LLM_MAX_PER_USER", cls.max_per_user)),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", cls.queue_timeout)),
+            request_timeout=float(os.getenv("LLM_TIMEOUT", cls.request_timeout)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", cls.max_retries)),
+        )
+
+
+# Backends
+
+class GeminiBackend:
+    """Google Gemini through the google-generativeai SDK"""
+
+    def __init__(self, api_key: str, model: str = GEMINI_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._model = genai.GenerativeModel(model)
+        self.name = model
+
+    @staticmethod
+    def _usage(response) -> Dict[str, Optional[int]]:
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            "prompt_tokens": getattr(usage, 'prompt_token_count', None),
+            "completion_tokens": getattr(usage, 'candidates_token_count', None),
+        }
+
+    def generate(self, prompt: str, temperature: Optional[float], timeout: float) -> LLMResult:
+        config = self._genai.GenerationConfig(temperature=temperature) if temperature is not None else None
+        response = self._model.generate_content(prompt, generation_config=config, request_options={"timeout": timeout})
+        return LLMResult(response.text, **self._usage(response))
+
+    def stream(self, prompt: str, temperature: Optional[float], timeout: float) -> Iterator[LLMResult]:
+        config = self._genai.GenerationConfig(temperature=temperature) if temperature is not None else None
+        response = self._model.generate_content(prompt, generation_config=config, stream=True,
+                                                request_options={"timeout": timeout})
+        for chunk in response:
+            if chunk.text:
+                yield LLMResult(chunk.text)
+        # Usage is only complete once the stream has been consumed
+        yield LLMResult("", **self._usage(response))
+
+
+class FakeBackend:
+    """Deterministic local model: echoes the prompt after a delay, optionally failing the first calls"""
+
+    def __init__(self, latency: float = 0.05, fail_first: int = 0, reply: Optional[str] = None):
+        self.name = "fake"
+        self.latency = latency
+        self.fail_first = fail_first
+        self.reply = reply
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _reply(self, prompt: str, timeout: float) -> str:
+        with self._lock:
+            self.calls += 1
+            failing = self.calls <= self.fail_first
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake model timed out")
+        time.sleep(self.latency)
+        if failing:
+            raise ConnectionError("fake model unavailable")
+        return self.reply if self.reply is not None else f"Fake reply to: {prompt.strip()[:200]}"
+
+    def generate(self, prompt: str, temperature: Optional[float], timeout: float) -> LLMResult:
+        text = self._reply(prompt, timeout)
+        return LLMResult(text, prompt_tokens=len(prompt.split()), completion_tokens=len(text.split()))
+
+    def stream(self, prompt: str, temperature: Optional[float], timeout: float) -> Iterator[LLMResult]:
+        words = self._reply(prompt, timeout).split(' ')
+        for index, word in enumerate(words):
+            yield LLMResult(word if index == 0 else f" {word}")
+        yield LLMResult("", prompt_tokens=len(prompt.split()), completion_tokens=len(words))
+
+
+def create_backend(kind: Optional[str] = None):
+    """Backend named by LLM_BACKEND ('gemini' by default, or 'fake')"""
+    kind = (kind or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if kind == "fake":
+        return FakeBackend(latency=float(os.getenv("LLM_FAKE_LATENCY", "0.05")))
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+    return GeminiBackend(api_key)
+
+
+# Metrics
+
+class LLMMetrics:
+    """Counters, token totals and latency percentiles per caller"""
+
+    COUNTERS = ('requests', 'succeeded', 'failed', 'retries', 'timeouts', 'rejected', 'coalesced', 'streams',
+                'prompt_tokens', 'completion_tokens')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callers: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = 0
+        self.queued = 0
+
+    def _caller(self, caller: str) -> Dict[str, Any]:
+        if caller not in self._callers:
+            self._callers[caller] = {**dict.fromkeys(self.COUNTERS, 0), 'latency_ms': deque(maxlen=LATENCY_SAMPLES)}
+        return self._callers[caller]
+
+    def incr(self, caller: str, counter: str, amount: int = 1):
+        with self._lock:
+            self._caller(caller)[counter] += amount
+
+    def gauge(self, name: str, delta: int):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def observe(self, caller: str, latency_s: float, result: Optional[LLMResult]):
+        with self._lock:
+            stats = self._caller(caller)
+            stats['latency_ms'].append(latency_s * 1000)
+            if result is not None:
+                stats['prompt_tokens'] += result.prompt_tokens or 0
+                stats['completion_tokens'] += result.completion_tokens or 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            callers = {}
+            for caller, stats in self._callers.items():
+                latencies = sorted(stats['latency_ms'])
+                pick = lambda q: round(latencies[min(int(q * len(latencies)), len(latencies) - 1)], 1) if latencies else None
+                callers[caller] = {
+                    **{counter: stats[counter] for counter in self.COUNTERS},
+                    'latency_ms': {'p50': pick(0.5), 'p95': pick(0.95), 'max': pick(1.0), 'samples': len(latencies)},
+                }
+            return {'in_flight': self.in_flight, 'queued': self.queued, 'callers': callers}
+
+
+# Gateway
+
+class LLMGateway:
+    """Concurrency-capped, coalescing, retrying front door to one LLM backend"""
+
+    def __init__(self, backend, config: Optional[GatewayConfig] = None):
+        self.backend = backend
+        self.config = config or GatewayConfig()
+        self.metrics = LLMMetrics()
+        self._global_slots = threading.BoundedSemaphore(self.config.max_concurrency)
+        self._user_slots: Dict[str, list] = {}  # user -> [semaphore, holders]
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    # Slots
+
+    def _user_semaphore(self, user: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            entry = self._user_slots.setdefault(user, [threading.BoundedSemaphore(self.config.max_per_user), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_user(self, user: str):
+        with self._lock:
+            entry = self._user_slots[user]
+            entry[0].release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_slots[user]
+
+    def _acquire(self, caller: str, user: Optional[str]):
+        """Wait for a per-user slot, then a global one, within the queue deadline"""
+        deadline = time.monotonic() + self.config.queue_timeout
+        self.metrics.gauge('queued', 1)
+        try:
+            if user is not None:
+                semaphore = self._user_semaphore(user)
+                if not semaphore.acquire(timeout=self.config.queue_timeout):
+                    self._forget_user(user)
+                    self.metrics.incr(caller, 'rejected')
+                    raise LLMOverloadedError(f"Too many concurrent LLM requests for {user}")
+            if not self._global_slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                if user is not None:
+                    self._release_user(user)
+                self.metrics.incr(caller, 'rejected')
+                raise LLMOverloadedError("LLM gateway is at capacity")
+        finally:
+            self.metrics.gauge('queued', -1)
+        self.metrics.gauge('in_flight', 1)
+
+    def _forget_user(self, user: str):
+        """Drop a waiter that never got its per-user slot"""
+        with self._lock:
+            entry = self._user_slots[user]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_slots[user]
+
+    def _release(self, user: Optional[str]):
+        self.metrics.gauge('in_flight', -1)
+        self._global_slots.release()
+        if user is not None:
+            self._release_user(user)
+
+    # Retries
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay"""
+        return random.uniform(0, min(self.config.backoff_cap, self.config.backoff_base * 2 ** attempt))
+
+    def _with_retries(self, caller: str, user: Optional[str], call):
+        """
+        Run call() holding a global and a per-user slot, retrying transient failures.
+        The slots are released during the backoff sleep, so a retrying call does not block
+        others, and re-acquired for the next attempt. On success the caller owns the slots
+        and must _release() them; on failure they are already released.
+        """
+        for attempt in range(self.config.max_retries + 1):
+            self._acquire(caller, user)
+            try:
+                return call()
+            except Exception as e:
+                self._release(user)
+                if is_timeout(e):
+                    self.metrics.incr(caller, 'timeouts')
+                    error = LLMTimeoutError(str(e))
+                else:
+                    error = e
+                if attempt == self.config.max_retries or not is_transient(e):
+                    raise error from e
+                self.metrics.incr(caller, 'retries')
+                delay = self._backoff(attempt)
+                print(f"LLM call for {caller} failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+
+    # Public API
+
+    def generate(self, prompt: str, *, caller: str = "default", user: Optional[str] = None,
+                 temperature: Optional[float] = None) -> LLMResult:
+        """Complete a prompt; identical prompts already in flight share one model call"""
+        user = user if user is not None else current_llm_user.get()
+        self.metrics.incr(caller, 'requests')
+        key = hashlib.sha256(f"{self.backend.name}|{temperature}|{prompt}".encode()).hexdigest()
+
+        with self._lock:
+            leader = self._in_flight.get(key)
+            if leader is None:
+                future = self._in_flight[key] = Future()
+        if leader is not None:
+            self.metrics.incr(caller, 'coalesced')
+            return leader.result()
+
+        started = time.perf_counter()
+        result = None
+        try:
+            result = self._with_retries(
+                caller, user, lambda: self.backend.generate(prompt, temperature, self.config.request_timeout)
+            )
+            self._release(user)
+            self.metrics.incr(caller, 'succeeded')
+            future.set_result(result)
+            return result
+        except Exception as e:
+            self.metrics.incr(caller, 'failed')
+            future.set_exception(e)
+            raise
+        finally:
+            self.metrics.observe(caller, time.perf_counter() - started, result)
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stream(self, prompt: str, *, caller: str = "default", user: Optional[str] = None,
+               temperature: Optional[float] = None) -> Iterator[str]:
+        """
+        Stream text chunks, holding a concurrency slot until the stream ends.
+        Streams are not coalesced; a failed attempt is only retried before the first chunk.
+        """
+        user = user if user is not None else current_llm_user.get()
+        self.metrics.incr(caller, 'requests')
+        self.metrics.incr(caller, 'streams')
+        started = time.perf_counter()
+        usage = LLMResult("")
+        failed = True
+        holding = False
+        try:
+            chunks = self._with_retries(caller, user, lambda: self._open_stream(prompt, temperature))
+            holding = True
+            for chunk in chunks:
+                usage.prompt_tokens = chunk.prompt_tokens or usage.prompt_tokens
+                usage.completion_tokens = chunk.completion_tokens or usage.completion_tokens
+                if chunk.text:
+                    yield chunk.text
+            failed = False
+        finally:
+            if holding:
+                self._release(user)
+            self.metrics.incr(caller, 'failed' if failed else 'succeeded')
+            self.metrics.observe(caller, time.perf_counter() - started, usage)
+
+    def _open_stream(self, prompt: str, temperature: Optional[float]) -> Iterator[LLMResult]:
+        """Start a backend stream and pull its first chunk, so connection failures surface here (and are retried)"""
+        stream = iter(self.backend.stream(prompt, temperature, self.config.request_timeout))
+        first = next(stream, None)
+
+        def chunks():
+            if first is not None:
+                yield first
+            yield from stream
+        return chunks()
+
+    async def agenerate(self, prompt: str, **kwargs) -> LLMResult:
+        """generate() for async callers, run in a worker thread so the event loop is never blocked"""
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+
+# Shared by every LLM caller in the process (singleton pattern)
+_llm_gateway: Optional[LLMGateway] = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide gateway, creating it from the environment on first use"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway(create_backend(), GatewayConfig.from_env())
+    return _llm_gateway
+
+
+def set_llm_gateway(gateway: Optional[LLMGateway]):
+    """Replace the shared gateway (e.g. with a FakeBackend one in tests); None recreates it from the environment"""
+    global _llm_gateway
+    _llm_gateway = gateway
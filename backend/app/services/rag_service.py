@@ -1,5 +1,7 @@
 import os
-from langchain_google_genai import GoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain.llms.base import LLM
+from langchain.schema.output import GenerationChunk
 from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
@@ -9,12 +11,37 @@ import json
 from datetime import datetime, timedelta
 from sqlmodel import Session, select
 from app.models import Symptom, Sleep_Time, Meal, Growth
+from app.services.sleep_timeline import SleepTimeline
+from app.services.llm_gateway import get_llm_gateway, GEMINI_MODEL
 import statistics
+import time
 
-GEMINI_MODEL = "gemini-2.0-flash"
 AI_TEMPERATURE = 0.3
 
 
+class GatewayLLM(LLM):
+    """LangChain LLM that sends every completion and stream through the shared LLM gateway"""
+
+    caller: str = "rag"
+    temperature: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm_gateway"
+
+    def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        return get_llm_gateway().generate(prompt, caller=self.caller, user=kwargs.get("user"),
+                                          temperature=self.temperature).text
+
+    def _stream(self, prompt: str, stop=None, run_manager=None, **kwargs):
+        for text in get_llm_gateway().stream(prompt, caller=self.caller, user=kwargs.get("user"),
+                                             temperature=self.temperature):
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
 class RAGService:
     """RAG service using LangChain + FAISS + Google Gemini"""
 
@@ -23,10 +50,8 @@ class RAGService:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
 
-        # Initialize Gemini LLM and embeddings
-        self.llm = GoogleGenerativeAI(
-            model=GEMINI_MODEL, google_api_key=self.api_key, temperature=AI_TEMPERATURE
-        )
+        # Completions go through the shared gateway (concurrency caps, coalescing, retries, metrics)
+        self.llm = GatewayLLM(caller="rag", temperature=AI_TEMPERATURE)
 
         self.embeddings = GoogleGenerativeAIEmbeddings(
             model="models/embedding-001", google_api_key=self.api_key
@@ -143,29 +168,23 @@ class RAGService:
             if not sleep_records:
                 return {"status": "no_data"}
             
-            # Calculate daily sleep durations
-            daily_sleep = []
-            sleep_quality_scores = []
-            
-            for record in sleep_records:
-                if record.start_time and record.end_time:
-                    try:
-                        duration = (record.end_time - record.start_time).total_seconds() / 3600
-                        if 0 < duration < 24:  # Valid duration
-                            daily_sleep.append(duration)
-                            # Simple quality score based on duration
-                            if 8 <= duration <= 12:
-                                sleep_quality_scores.append("good")
-                            elif 6 <= duration < 8 or 12 < duration <= 14:
-                                sleep_quality_scores.append("fair")
-                            else:
-                                sleep_quality_scores.append("poor")
-                    except:
-                        continue  # Skip invalid records
+            # Daily sleep totals from merged sessions, oldest first
+            daily = SleepTimeline.from_records(sleep_records).daily()
+            daily_sleep = daily['total_hours'].tolist()
             
             if not daily_sleep:
                 return {"status": "incomplete_data"}
             
+            # Simple quality score based on each day's total
+            sleep_quality_scores = []
+            for duration in daily_sleep:
+                if 8 <= duration <= 12:
+                    sleep_quality_scores.append("good")
+                elif 6 <= duration < 8 or 12 < duration <= 14:
+                    sleep_quality_scores.append("fair")
+                else:
+                    sleep_quality_scores.append("poor")
+            
             avg_sleep = statistics.mean(daily_sleep)
             sleep_consistency = statistics.stdev(daily_sleep) if len(daily_sleep) > 1 else 0
             
@@ -173,7 +192,7 @@ class RAGService:
             pattern = "consistent" if sleep_consistency < 1.5 else "inconsistent"
             trend = self._calculate_trend(daily_sleep) if len(daily_sleep) > 1 else "stable"
             
-            days_analyzed = len(set(record.check_in.date() for record in sleep_records))
+            days_analyzed = len(daily)
             
             return {
                 "status": "available",
@@ -595,8 +614,18 @@ class RAGService:
                 "error": str(e),
             }
 
-    def stream_contextual_response(self, query: str, child_context: str, child_id: Optional[int] = None):
-        """Stream AI response with child context and knowledge retrieval"""
+    def stream_contextual_response(self, query: str, child_context: str, child_id: Optional[int] = None,
+                                   user_id: Optional[str] = None):
+        """
+        Stream AI response with child context and knowledge retrieval, as events:
+        one 'meta' (sources, response type, context), 'delta' per text chunk, then 'done' with usage.
+        On failure an 'error' event with a message for the user comes before 'done'.
+        user_id is who the LLM gateway's per-user concurrency cap applies to.
+        """
+        started = time.perf_counter()
+        first_chunk_at = None
+        usage = {"chunks": 0, "characters": 0}
+        meta_sent = False
         try:
             # Get enhanced context with relevant weekly patterns based on query
             enhanced_context = self._get_enhanced_context_with_patterns(child_context, child_id, query)
@@ -662,35 +691,48 @@ class RAGService:
             else:
                 prompt = self._create_general_prompt(query, enhanced_context)
 
-            # Stream the response
-            for chunk in self.llm.stream(prompt):
-                yield {
-                    "content": chunk,
-                    "sources": sources if sources else [],
-                    "response_type": response_type,
-                    "context_used": enhanced_context,
-                    "done": False,
-                }
-
-            # Send final message
+            # Sources and context are sent once up front; each chunk after that only carries new text
             yield {
-                "content": "",
+                "event": "meta",
                 "sources": sources,
                 "response_type": response_type,
                 "context_used": enhanced_context,
-                "done": True,
             }
+            meta_sent = True
+
+            for chunk in self.llm.stream(prompt, user=user_id):
+                if not first_chunk_at:
+                    first_chunk_at = time.perf_counter()
+                usage["chunks"] += 1
+                usage["characters"] += len(chunk)
+                yield {"event": "delta", "content": chunk}
+
+            yield {"event": "done", "usage": self._stream_usage(usage, started, first_chunk_at)}
 
         except Exception as e:
             print(f"Error in streaming response: {e}")
+            if not meta_sent:
+                yield {
+                    "event": "meta",
+                    "sources": [],
+                    "response_type": "error",
+                    "context_used": enhanced_context if 'enhanced_context' in locals() else child_context,
+                }
             yield {
-                "content": "I apologize, but I'm having trouble processing your request right now. Please try again later.",
-                "sources": [],
-                "response_type": "error",
-                "context_used": enhanced_context if 'enhanced_context' in locals() else child_context,
-                "done": True,
-                "error": str(e),
+                "event": "error",
+                "message": "I apologize, but I'm having trouble processing your request right now. Please try again later.",
             }
+            yield {"event": "done", "usage": self._stream_usage(usage, started, first_chunk_at), "error": str(e)}
+
+    @staticmethod
+    def _stream_usage(usage: Dict, started: float, first_chunk_at: Optional[float]) -> Dict:
+        """Chunk/character counts and timings for the final stream event (the LLM stream reports no token counts)"""
+        finished = time.perf_counter()
+        return {
+            **usage,
+            "first_chunk_ms": round((first_chunk_at - started) * 1000) if first_chunk_at else None,
+            "duration_ms": round((finished - started) * 1000),
+        }
 
     def _create_general_prompt(self, query: str, child_context: str) -> str:
         """Create a general AI prompt"""
@@ -0,0 +1,161 @@
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+
+SLEEP_TIMEZONE = 'Asia/Singapore'
+
+# Sessions starting between these local hours count as night sleep, anything else is a nap
+NIGHT_START_HOUR = 19
+NIGHT_END_HOUR = 7
+
+# Single records longer than this are almost always a timer left running; they are reported, not counted
+MAX_RECORD_HOURS = 24
+
+NS_PER_HOUR = 3600 * 10**9
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+DAILY_COLUMNS = ['sleep_date', 'total_hours', 'night_hours', 'nap_hours', 'sessions', 'naps', 'midnight_spanning']
+
+
+def _local_ns(times) -> np.ndarray:
+    """Wall-clock time in the sleep timezone as int64 nanoseconds"""
+    times = pd.to_datetime(pd.Series(times), utc=True)
+    return times.dt.tz_convert(SLEEP_TIMEZONE).dt.tz_localize(None).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray):
+    """
+    Merge overlapping or touching [start, end) intervals with one sort and a linear sweep.
+    Returns (session_starts, session_ends, records_per_session).
+    """
+    if len(starts) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+
+    # A record starts a new session when it begins after every earlier record has ended
+    reach = np.maximum.accumulate(ends)
+    new_session = np.empty(len(starts), dtype=bool)
+    new_session[0] = True
+    new_session[1:] = starts[1:] > reach[:-1]
+
+    first = np.flatnonzero(new_session)
+    last = np.append(first[1:] - 1, len(starts) - 1)
+    return starts[first], reach[last], last - first + 1
+
+
+def split_by_day(starts: np.ndarray, ends: np.ndarray):
+    """
+    Split sessions at local midnight.
+    Returns (session_index, day_start, piece_start, piece_end) with one row per day a session touches.
+    """
+    first_day = starts - starts % NS_PER_DAY
+    # The end is exclusive, so a session ending exactly at midnight does not touch the next day
+    last_day = (ends - 1) - (ends - 1) % NS_PER_DAY
+    day_counts = (last_day - first_day) // NS_PER_DAY + 1
+
+    session_index = np.repeat(np.arange(len(starts)), day_counts)
+    offsets = np.arange(len(session_index)) - np.repeat(np.cumsum(day_counts) - day_counts, day_counts)
+    day_start = first_day[session_index] + offsets * NS_PER_DAY
+
+    piece_start = np.maximum(starts[session_index], day_start)
+    piece_end = np.minimum(ends[session_index], day_start + NS_PER_DAY)
+    return session_index, day_start, piece_start, piece_end
+
+
+class SleepTimeline:
+    """Sleep sessions rebuilt from raw Sleep_Time records: overlaps merged, split per local day"""
+
+    def __init__(self, starts, ends):
+        local_starts = _local_ns(starts)
+        local_ends = _local_ns(ends)
+
+        durations = local_ends - local_starts
+        valid = durations > 0
+        self.records_count = len(local_starts)
+        self.invalid_records = int((~valid).sum())
+        self.discarded_long_records = int((durations > MAX_RECORD_HOURS * NS_PER_HOUR).sum())
+        keep = valid & (durations <= MAX_RECORD_HOURS * NS_PER_HOUR)
+
+        self.session_starts, self.session_ends, self.session_records = merge_intervals(local_starts[keep], local_ends[keep])
+        self.merged_records = int(keep.sum()) - len(self.session_starts)
+
+        start_hours = (self.session_starts % NS_PER_DAY) // NS_PER_HOUR
+        self.is_night = (start_hours >= NIGHT_START_HOUR) | (start_hours < NIGHT_END_HOUR)
+        self.spans_midnight = (self.session_ends - 1) // NS_PER_DAY > self.session_starts // NS_PER_DAY
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> 'SleepTimeline':
+        """Build from Sleep_Time model instances (or anything with start_time / end_time)"""
+        records = [r for r in records if r.start_time and r.end_time]
+        return cls([r.start_time for r in records], [r.end_time for r in records])
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'SleepTimeline':
+        """Build from a DataFrame with start_time and end_time columns"""
+        frame = frame.dropna(subset=['start_time', 'end_time'])
+        return cls(frame['start_time'], frame['end_time'])
+
+    @property
+    def sessions_count(self) -> int:
+        return len(self.session_starts)
+
+    def session_hours(self) -> np.ndarray:
+        """Length of each merged session in hours"""
+        return (self.session_ends - self.session_starts) / NS_PER_HOUR
+
+    def daily(self) -> pd.DataFrame:
+        """Sleep per local calendar day (one 24h window per row), oldest first"""
+        if not self.sessions_count:
+            return pd.DataFrame(columns=DAILY_COLUMNS)
+
+        session_index, day_start, piece_start, piece_end = split_by_day(self.session_starts, self.session_ends)
+        hours = (piece_end - piece_start) / NS_PER_HOUR
+        night = self.is_night[session_index]
+
+        # Pieces come out grouped by session; reduce them per day with one sort
+        days, inverse = np.unique(day_start, return_inverse=True)
+        n_days = len(days)
+        total = np.bincount(inverse, weights=hours, minlength=n_days)
+        night_hours = np.bincount(inverse, weights=np.where(night, hours, 0.0), minlength=n_days)
+        sessions = np.bincount(inverse, minlength=n_days)
+        naps = np.bincount(inverse, weights=(~night).astype(np.float64), minlength=n_days)
+        spanning = np.bincount(inverse, weights=self.spans_midnight[session_index].astype(np.float64), minlength=n_days)
+
+        return pd.DataFrame({
+            'sleep_date': pd.to_datetime(days),
+            'total_hours': np.round(total, 2),
+            'night_hours': np.round(night_hours, 2),
+            'nap_hours': np.round(total - night_hours, 2),
+            'sessions': sessions,
+            'naps': naps.astype(int),
+            'midnight_spanning': spanning.astype(int),
+        })
+
+    def summary(self, daily: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Averages over the days that have sleep recorded"""
+        daily = self.daily() if daily is None else daily
+        summary = {
+            "days_with_data": len(daily),
+            "total_records": self.records_count,
+            "sessions": self.sessions_count,
+            "merged_records": self.merged_records,
+            "invalid_records": self.invalid_records,
+            "discarded_long_records": self.discarded_long_records,
+            "midnight_spanning_sessions": int(self.spans_midnight.sum()),
+        }
+        if daily.empty:
+            return summary
+
+        summary.update({
+            "average_sleep_hours": round(float(daily['total_hours'].mean()), 2),
+            "average_night_hours": round(float(daily['night_hours'].mean()), 2),
+            "average_nap_hours": round(float(daily['nap_hours'].mean()), 2),
+            "average_naps_per_day": round(float(daily['naps'].mean()), 2),
+            "consistency": round(float(daily['total_hours'].std()), 2) if len(daily) > 1 else 0,
+            "first_date": daily['sleep_date'].iloc[0].strftime('%Y-%m-%d'),
+            "last_date": daily['sleep_date'].iloc[-1].strftime('%Y-%m-%d')
+        })
+        return summary
@@ -0,0 +1,56 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # stop nginx-style proxies from buffering the stream
+    "Vary": "Accept-Encoding",
+}
+
+
+def sse_frame(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One server-sent event; unnamed events arrive as plain 'message' events"""
+    payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n" if event else f"data: {payload}\n\n"
+
+
+def encode_events(events: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Turn generation events into SSE frames:
+    'meta' once (sources, context), lean unnamed deltas {"content": ...}, an 'error' {"message": ...}
+    if generation failed, then 'done' with usage.
+    """
+    for event in events:
+        kind = event.get('event')
+        if kind == 'delta':
+            yield sse_frame({'content': event['content']})
+        else:
+            data = {key: value for key, value in event.items() if key != 'event'}
+            if kind == 'done':
+                data['done'] = True
+            yield sse_frame(data, event=kind)
+
+
+def error_frames(message: str) -> Iterator[str]:
+    """A stream that only reports an error (same 'done' frame shape clients already handle)"""
+    yield sse_frame({'content': message, 'done': True, 'error': True}, event='done')
+
+
+def _gzip_frames(frames: Iterable[str]) -> Iterator[bytes]:
+    """Gzip the stream with one shared dictionary, flushing after each frame so it is delivered immediately"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for frame in frames:
+        yield compressor.compress(frame.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def event_stream_response(request: Request, frames: Iterable[str]) -> StreamingResponse:
+    """text/event-stream response, gzip-compressed when the client accepts it"""
+    headers = dict(SSE_HEADERS)
+    if 'gzip' in request.headers.get('accept-encoding', '').lower():
+        headers['Content-Encoding'] = 'gzip'
+        frames = _gzip_frames(frames)
+    return StreamingResponse(frames, media_type="text/event-stream", headers=headers)
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
 from typing import Union
+import base64
 import re
 
 def calculate_age_from_birth_date(birth_date: datetime) -> str:
@@ -79,4 +80,24 @@ def get_age_string_and_months(birth_date: datetime) -> tuple[str, int]:
     """
     age_string = calculate_age_from_birth_date(birth_date)
     age_months = calculate_age_in_months(birth_date)
-    return age_string, age_months
\ No newline at end of file
+    return age_string, age_months
+
+def encode_cursor(created_at: datetime, key) -> str:
+    """
+    Opaque keyset cursor for (created_at, id) ordered pages
+    Returns a URL-safe string
+    """
+    raw = f"{created_at.isoformat()}|{key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Inverse of encode_cursor
+    Returns: (created_at, id as string); raises ValueError for malformed cursors
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, key = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), key
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import users, children, growth, sleep, chat, meal, poop, symptom, reference, analytics, guidance, health_alerts  # ← Make sure health_alerts is here
+from fastapi.middleware.gzip import GZipMiddleware
+from app.services.llm_gateway import get_llm_gateway
+from app.routers import users, children, growth, sleep, chat, meal, poop, symptom, reference, analytics, guidance, health_alerts, events  # ← Make sure health_alerts is here
 
 app = FastAPI()
 
@@ -15,6 +17,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compress JSON responses for clients that accept gzip; SSE streams negotiate their own (see services/sse.py)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Include all routers
 @app.get("/")
 async def root():
@@ -24,6 +29,14 @@ async def root():
 async def health():
     return {"status": "healthy", "service": "main"}
 
+@app.get("/health/llm")
+async def llm_health():
+    """LLM gateway load and per-caller latency, retry and token metrics"""
+    try:
+        return get_llm_gateway().metrics.snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"LLM gateway unavailable: {str(e)}")
+
 app.include_router(users.router)
 app.include_router(children.router)
 app.include_router(growth.router)
@@ -36,6 +49,7 @@ app.include_router(reference.router)
 app.include_router(analytics.router)
 app.include_router(guidance.router)
 app.include_router(health_alerts.router)  # ← Make sure this line exists
+app.include_router(events.router)
 
 # Skip saved_articles for now since you don't have that model yet
 
@@ -0,0 +1,12 @@
+-- Unique key used by INSERT ... ON CONFLICT (child_id, alert_type, analysis_date) in the alert engine.
+-- Duplicates left by the old read-then-write upsert are removed first, keeping the newest row.
+
+DELETE FROM health_alerts a
+USING health_alerts b
+WHERE a.child_id = b.child_id
+  AND a.alert_type = b.alert_type
+  AND a.analysis_date = b.analysis_date
+  AND (a.created_at, a.id::text) < (b.created_at, b.id::text);
+
+ALTER TABLE health_alerts
+    ADD CONSTRAINT uq_health_alerts_child_type_date UNIQUE (child_id, alert_type, analysis_date);
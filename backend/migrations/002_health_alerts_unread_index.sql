@@ -0,0 +1,6 @@
+-- Partial index for unread badge counts: SELECT count(*) ... WHERE child_id = ? AND NOT is_read AND NOT is_deleted
+-- only ever touches the unread rows of a child, and can be answered from the index alone.
+
+CREATE INDEX IF NOT EXISTS ix_health_alerts_unread
+    ON health_alerts (child_id)
+    WHERE NOT is_read AND NOT is_deleted;
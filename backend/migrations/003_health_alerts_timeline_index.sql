@@ -0,0 +1,9 @@
+-- Covering index for the keyset-paginated alert timeline:
+--   WHERE child_id = ? AND NOT is_deleted AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT n
+-- The index is scanned backwards; the summary view's columns are INCLUDEd so it needs no heap access
+-- beyond visibility checks.
+
+CREATE INDEX IF NOT EXISTS ix_health_alerts_timeline
+    ON health_alerts (child_id, created_at, id)
+    INCLUDE (alert_type, title, severity, analysis_date, is_read, read_at)
+    WHERE NOT is_deleted;
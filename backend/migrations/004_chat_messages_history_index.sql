@@ -0,0 +1,5 @@
+-- Index for paging through a chat's messages by (created_at, id) and for the chat list's
+-- per-chat message count and last-message preview.
+
+CREATE INDEX IF NOT EXISTS ix_chat_messages_chat_created
+    ON chat_messages (chat_id, created_at, id);
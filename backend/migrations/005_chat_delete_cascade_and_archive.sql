@@ -0,0 +1,9 @@
+-- Deleting a chat removes its messages in the same statement, and chats can be archived.
+
+ALTER TABLE chat_messages
+    DROP CONSTRAINT IF EXISTS chat_messages_chat_id_fkey,
+    ADD CONSTRAINT chat_messages_chat_id_fkey
+        FOREIGN KEY (chat_id) REFERENCES chatbot_chats (id) ON DELETE CASCADE;
+
+ALTER TABLE chatbot_chats
+    ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ;
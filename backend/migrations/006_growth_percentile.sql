@@ -0,0 +1,17 @@
+-- Stored WHO z-scores and percentiles per growth record, written by app.score_growth_percentiles
+-- and read by the growth alert rule. Scores are removed with their growth record or child.
+
+CREATE TABLE IF NOT EXISTS growth_percentile (
+    growth_id INTEGER PRIMARY KEY REFERENCES growth (id) ON DELETE CASCADE,
+    child_id INTEGER NOT NULL REFERENCES child (id) ON DELETE CASCADE,
+    age_months DOUBLE PRECISION NOT NULL,
+    weight_z DOUBLE PRECISION,
+    weight_percentile DOUBLE PRECISION,
+    height_z DOUBLE PRECISION,
+    height_percentile DOUBLE PRECISION,
+    head_circumference_z DOUBLE PRECISION,
+    head_circumference_percentile DOUBLE PRECISION,
+    scored_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_growth_percentile_child_id ON growth_percentile (child_id);
@@ -0,0 +1,49 @@
+"""
+Pin the WHO LMS reference to values published in the WHO Child Growth Standards
+monthly tables (weight-for-age, length/height-for-age, head circumference-for-age).
+"""
+import numpy as np
+import pytest
+
+from app.services.growth_reference import GrowthReference
+
+# (sex, metric, month, L, M, S) copied from the WHO tables
+PUBLISHED_LMS = [
+    ('male', 'weight', 0, 0.3487, 3.3464, 0.14602),
+    ('male', 'weight', 7, 0.1134, 8.297, 0.10902),
+    ('male', 'weight', 60, -0.1506, 18.3366, 0.13517),
+    ('female', 'weight', 45, -0.3322, 15.524, 0.1363),
+    ('female', 'height', 10, 1, 71.4818, 0.03452),
+    ('male', 'height', 23, 1, 86.941, 0.03445),
+    ('male', 'height', 24, 1, 87.1161, 0.03507),
+    ('male', 'head_circumference', 30, 1, 48.9351, 0.02847),
+    ('female', 'head_circumference', 60, 1, 49.9229, 0.0285),
+]
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return GrowthReference.load()
+
+
+def test_tables_cover_every_month_to_60(reference):
+    ages, _, _, _ = reference.lms[('male', 'weight')]
+    np.testing.assert_array_equal(ages, np.arange(61))
+    assert reference.age_range == (0.0, 60.0)
+
+
+@pytest.mark.parametrize('sex, metric, month, L, M, S', PUBLISHED_LMS)
+def test_lms_matches_published_tables(reference, sex, metric, month, L, M, S):
+    got = [float(value[0]) for value in reference.lms_at(sex, metric, [month])]
+    assert got == [L, M, S]
+
+
+def test_z_scores_of_published_sd_lines(reference):
+    # Girls' length-for-age at 10 months: median 71.4818 cm, published SD 2.4676 cm
+    z = reference.z_scores('female', 'height', [10, 10, 10], [71.4818, 71.4818 + 2 * 2.4676, 71.4818 - 2 * 2.4676])
+    np.testing.assert_allclose(z, [0.0, 2.0, -2.0], atol=1e-3)
+
+
+def test_ages_outside_tables_are_not_scored(reference):
+    z = reference.z_scores('female', 'height', [-1, 61], [50.0, 110.0])
+    assert np.isnan(z).all()
@@ -0,0 +1,65 @@
+// src/composables/useLiveEvents.ts - Push channel for check-in and alert changes (replaces refetch-to-notice)
+import { onBeforeUnmount, watch, type Ref } from 'vue'
+
+export interface LiveEvent {
+  type: 'subscribed' | 'ping' | 'resync' | 'checkin' | 'alert'
+  kind?: string
+  action?: 'created' | 'updated' | 'deleted' | 'upserted' | 'read' | 'unread'
+  child_id?: number
+  id?: number | string
+  data?: any
+  at?: string
+}
+
+const RECONNECT_MIN_MS = 1000
+const RECONNECT_MAX_MS = 30000
+
+/**
+ * Opens a WebSocket to /events/ws for the given children and calls onEvent for every change.
+ * Reconnects with backoff; on reconnect or 'resync' the handler should refetch, since events may have been missed.
+ */
+export function useLiveEvents (childIds: Ref<number[]>, onEvent: (event: LiveEvent) => void) {
+  let socket: WebSocket | null = null
+  let reconnectTimer: ReturnType<typeof setTimeout> | null = null
+  let reconnectDelay = RECONNECT_MIN_MS
+  let stopped = false
+
+  const close = () => {
+    if (reconnectTimer) clearTimeout(reconnectTimer)
+    reconnectTimer = null
+    if (socket) {
+      socket.onclose = null
+      socket.close()
+      socket = null
+    }
+  }
+
+  const connect = () => {
+    close()
+    if (stopped || childIds.value.length === 0) return
+
+    const query = childIds.value.map(id => `child_ids=${id}`).join('&')
+    socket = new WebSocket(`ws://localhost:8000/events/ws?${query}`)
+
+    socket.onmessage = message => {
+      const event: LiveEvent = JSON.parse(message.data)
+      if (event.type === 'ping') return
+      if (event.type === 'subscribed') reconnectDelay = RECONNECT_MIN_MS
+      onEvent(event)
+    }
+
+    socket.onclose = () => {
+      socket = null
+      if (stopped) return
+      reconnectTimer = setTimeout(connect, reconnectDelay)
+      reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_MS)
+    }
+  }
+
+  watch(() => childIds.value.join(','), connect, { immediate: true })
+
+  onBeforeUnmount(() => {
+    stopped = true
+    close()
+  })
+}
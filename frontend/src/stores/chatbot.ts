@@ -15,6 +15,9 @@ export interface Chat {
   title: string | null
   date: string
   messages: ChatMessage[]
+  messagesCursor?: string | null  // cursor for the page of earlier messages, null when fully loaded
+  messageCount?: number
+  lastMessagePreview?: string | null
   created_at?: string
   updated_at?: string
 }
@@ -26,6 +29,13 @@ interface BackendChatbotChat {
   owner_id: number
   created_at: string
   updated_at: string
+  message_count?: number
+  last_message_preview?: string | null
+}
+
+interface BackendMessagePage {
+  items: BackendChatMessage[]
+  next_cursor: string | null
 }
 
 interface BackendChatMessage {
@@ -100,11 +110,20 @@ export const useChatbotStore = defineStore('chatbot', () => {
         sender: msg.sender as 'user' | 'ai',
         timestamp: msg.created_at
       })),
+      messageCount: backendChat.message_count,
+      lastMessagePreview: backendChat.last_message_preview,
       created_at: backendChat.created_at,
       updated_at: backendChat.updated_at
     }
   }
 
+  const transformBackendMessage = (msg: BackendChatMessage): ChatMessage => ({
+    id: msg.id,
+    text: msg.message,
+    sender: msg.sender as 'user' | 'ai',
+    timestamp: msg.created_at
+  })
+
   const getApiUrl = (endpoint: string): string => {
     const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
     return `${baseUrl}${endpoint}`
@@ -170,28 +189,24 @@ export const useChatbotStore = defineStore('chatbot', () => {
     }
   }
 
-  // Load messages for a specific chat
+  // Load the latest page of messages for a specific chat
   const loadMessagesForChat = async (chatId: string) => {
     try {
       isLoadingMessages.value = true
       clearError()
 
-      const messages = await makeApiCall<BackendChatMessage[]>(
+      const page = await makeApiCall<BackendMessagePage>(
         getApiUrl(`/chats/${chatId}/messages`)
       )
 
       // Update the chat with loaded messages
       const chatIndex = chats.value.findIndex(chat => chat.id === chatId)
       if (chatIndex !== -1) {
-        chats.value[chatIndex].messages = messages.map(msg => ({
-          id: msg.id,
-          text: msg.message,
-          sender: msg.sender as 'user' | 'ai',
-          timestamp: msg.created_at
-        }))
+        chats.value[chatIndex].messages = page.items.map(transformBackendMessage)
+        chats.value[chatIndex].messagesCursor = page.next_cursor
       }
 
-      console.log('Messages loaded for chat:', chatId, messages.length)
+      console.log('Messages loaded for chat:', chatId, page.items.length)
 
     } catch (err) {
       console.error('Error loading messages:', err)
@@ -201,6 +216,30 @@ export const useChatbotStore = defineStore('chatbot', () => {
     }
   }
 
+  // Prepend the page of messages before the oldest one loaded
+  const loadOlderMessages = async (chatId: string) => {
+    const chat = chats.value.find(chat => chat.id === chatId)
+    if (!chat?.messagesCursor || isLoadingMessages.value) return
+
+    try {
+      isLoadingMessages.value = true
+      clearError()
+
+      const page = await makeApiCall<BackendMessagePage>(
+        getApiUrl(`/chats/${chatId}/messages?cursor=${encodeURIComponent(chat.messagesCursor)}`)
+      )
+
+      chat.messages = [...page.items.map(transformBackendMessage), ...chat.messages]
+      chat.messagesCursor = page.next_cursor
+
+    } catch (err) {
+      console.error('Error loading older messages:', err)
+      setError(err instanceof Error ? err.message : 'Failed to load messages')
+    } finally {
+      isLoadingMessages.value = false
+    }
+  }
+
   // Create a new chat
   const createNewChat = async (): Promise<string | null> => {
     if (!authStore.userId) {
@@ -271,71 +310,29 @@ export const useChatbotStore = defineStore('chatbot', () => {
         }
       }
 
-      // Save user message to backend
-      const userMessageData = {
-        message: messageText,
-        sender: 'user',
-        created_at: new Date().toISOString()
-      }
-
-      const savedUserMessage = await makeApiCall<BackendChatMessage>(
-        getApiUrl(`/chats/${currentChatId.value}/messages`),
-        {
-          method: 'POST',
-          body: JSON.stringify(userMessageData)
-        }
-      )
-
-      // Update the temporary message with the real ID
-      if (chatIndex !== -1) {
-        const msgIndex = chats.value[chatIndex].messages.findIndex(msg => msg.id === userMessage.id)
-        if (msgIndex !== -1) {
-          chats.value[chatIndex].messages[msgIndex].id = savedUserMessage.id
-        }
-      }
-
-      // Get AI response
-      const aiResponse = await makeApiCall<{ reply: string }>(
+      // Get AI response; the server saves both turns to the chat and returns their ids
+      const aiResponse = await makeApiCall<{ reply: string, user_message_id?: string, reply_message_id?: string }>(
         getApiUrl('/chat/'),
         {
           method: 'POST',
-          body: JSON.stringify({ message: messageText })
+          body: JSON.stringify({ message: messageText, chat_id: currentChatId.value })
         }
       )
 
-      // Add AI response to UI
+      // Replace the temporary user message id with the stored one and add the AI response to UI
       const aiMessage: ChatMessage = {
-        id: `temp-ai-${Date.now()}`,
+        id: aiResponse.reply_message_id || `temp-ai-${Date.now()}`,
         text: aiResponse.reply || 'Sorry, I couldn\'t generate a response.',
         sender: 'ai',
         timestamp: new Date().toISOString()
       }
 
       if (chatIndex !== -1) {
-        chats.value[chatIndex].messages.push(aiMessage)
-      }
-
-      // Save AI message to backend
-      const aiMessageData = {
-        message: aiMessage.text,
-        sender: 'ai',
-        created_at: new Date().toISOString()
-      }
-
-      const savedAiMessage = await makeApiCall<BackendChatMessage>(
-        getApiUrl(`/chats/${currentChatId.value}/messages`),
-        {
-          method: 'POST',
-          body: JSON.stringify(aiMessageData)
-        }
-      )
-
-      // Update the temporary AI message with the real ID
-      if (chatIndex !== -1) {
-        const aiMsgIndex = chats.value[chatIndex].messages.findIndex(msg => msg.id === aiMessage.id)
-        if (aiMsgIndex !== -1) {
-          chats.value[chatIndex].messages[aiMsgIndex].id = savedAiMessage.id
+        const msgIndex = chats.value[chatIndex].messages.findIndex(msg => msg.id === userMessage.id)
+        if (msgIndex !== -1 && aiResponse.user_message_id) {
+          chats.value[chatIndex].messages[msgIndex].id = aiResponse.user_message_id
         }
+        chats.value[chatIndex].messages.push(aiMessage)
       }
 
       console.log('Message sent and AI response received')
@@ -419,6 +416,7 @@ export const useChatbotStore = defineStore('chatbot', () => {
     // Actions
     loadChats,
     loadMessagesForChat,
+    loadOlderMessages,
     createNewChat,
     sendMessage,
     selectChat,
@@ -100,73 +100,57 @@ export const useChildrenStore = defineStore('children', () => {
     try {
       const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
-      // Use auth user ID to get user-specific children
-      const response = await fetch(`${baseUrl}/child-profile/my-children-by-auth/${authStore.user.id}`)
+      // One request returns every child with their latest growth (no per-child fan-out)
+      const response = await fetch(`${baseUrl}/analytics/dashboard/by-auth/${authStore.user.id}`)
 
       if (!response.ok) {
-        console.error('Failed to load user children:', response.statusText)
+        if (response.status === 404) {
+          console.log('No children found for user - using demo children')
+        } else {
+          console.error('Failed to load user children:', response.statusText)
+        }
         children.value = demoChildren
         return
       }
 
       const data = await response.json()
 
-      if (!data || data.length === 0) {
+      if (!data || !data.children || data.children.length === 0) {
         console.log('No children found for user - using demo children')
         children.value = demoChildren
         return
       }
 
-      // Map children and fetch their latest growth data
-      const childrenWithGrowth = await Promise.all(
-        data.map(async (row: any) => {
-           // ⬅️ MAP AVATAR BY CHILD ID FROM DATABASE
-    const getAvatarById = (id: number) => {
-      const avatarMap = {
-        1: new URL('@/assets/puisim.jpg', import.meta.url).href,  // Child ID 1 = Pui Sim
-        2: new URL('@/assets/pang.jpg', import.meta.url).href,    // Child ID 2 = Pang
-        // Add more child IDs as your database grows
+      // ⬅️ MAP AVATAR BY CHILD ID FROM DATABASE
+      const getAvatarById = (id: number) => {
+        const avatarMap = {
+          1: new URL('@/assets/puisim.jpg', import.meta.url).href,  // Child ID 1 = Pui Sim
+          2: new URL('@/assets/pang.jpg', import.meta.url).href,    // Child ID 2 = Pang
+          // Add more child IDs as your database grows
+        }
+        return avatarMap[id] || new URL('@/assets/puisim.jpg', import.meta.url).href // fallback
       }
-      return avatarMap[id] || new URL('@/assets/puisim.jpg', import.meta.url).href // fallback
-    }
-          const child = {
-            id: row.id,
-            name: row.name,
-            age: calcAge(row.birth_date),
-            avatar: getAvatarById(row.id),
-            growth: {
+
+      const childrenWithGrowth: Child[] = data.children.map((row: any) => ({
+        id: row.id,
+        name: row.name,
+        age: calcAge(row.birth_date),
+        avatar: getAvatarById(row.id),
+        growth: row.latest_growth
+          ? {
+              height: row.latest_growth.height,
+              weight: row.latest_growth.weight,
+              headCircumference: row.latest_growth.head_circumference,
+              lastUpdated: new Date(row.latest_growth.check_in),
+            }
+          : {
+              // Keep default values until the first growth check-in
               height: 0,
               weight: 0,
               headCircumference: 0,
               lastUpdated: new Date(row.birth_date),
             },
-          }
-
-          // Fetch latest growth data for this child
-          try {
-            const growthResponse = await fetch(`${baseUrl}/growth/child/${row.id}/latest`)
-            if (growthResponse.ok) {
-              const growthData = await growthResponse.json()
-              child.growth = {
-                height: growthData.height,
-                weight: growthData.weight,
-                headCircumference: growthData.head_circumference,
-                lastUpdated: new Date(growthData.check_in),
-              }
-  } else if (growthResponse.status === 404) {
-    console.log(`No growth endpoint available yet for child ${row.id} - using defaults`)
-    // Keep default values (already set above)
-  } else {
-    console.warn(`Failed to fetch growth data for child ${row.id}: ${growthResponse.status}`)
-  }
-} catch (err) {
-  console.warn(`Failed to load growth data for child ${row.id}:`, err)
-  // Keep default values if growth fetch fails
-}
-
-          return child
-        })
-      )
+      }))
 
       children.value = childrenWithGrowth
 